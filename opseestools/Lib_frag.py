@@ -4,12 +4,11 @@
 
 import numpy as np                                                              # Importa librería estándar para operaciones matematicas.
                                                          # Importa librería estándar de análisis de datos.
-import matplotlib.pyplot as plt                                                 # Importa librería estándar para plotear otras cosasy poder crear figuras.
+import opseestools.plotting as pl                                               # Política de gráficas de opseestools (matplotlib solo se importa si se grafica).
                                        # Importa librería estándar que tiene un conjunto de herramientas para proporcionar una canalización ligera en Python
 # Ajuste de distribuciones
 # ==============================================================================
-from scipy import stats, optimize
-import pandas as pd
+# scipy se importa dentro de cada función para no pagar su costo al importar el módulo
 
 #%% CURVAS DE FRAGILIDAD AJUSTE FUNCIÓN LOGNORMAL
 #-----Example calculations to demonstrate the use of fragility fitting
@@ -23,6 +22,7 @@ import pandas as pd
 
 #-----objective function to be optimized
 def mlefit(theta, num_gmrs, num_collapse, IM):
+    from scipy import stats
     if theta[0]<0:                                                               # don't let median of fragility function go below zero
         theta[0]=0
     #-----estimated probabilities of collapse, given the current fragility functionparameter estimates
@@ -66,6 +66,7 @@ def fn_mle_pc(IM, num_gmrs, num_collapse):
     #-----These initial choices should not need revision in most cases, but they 
     #-----could be altered if needed.
     #x0 = np.array([0.8, 0.4], dtype=float)
+    from scipy import optimize
     x0 = [0.8, 0.4]
     args=(num_gmrs, num_collapse, IM)
     x = optimize.minimize(mlefit,x0,args=args,method='Nelder-Mead',options={'maxiter': 1000}) #Minimization of scalar function of one or more variables con el metodo de Lagarias, J.C., J. A. Reeds, M. H. Wright, and P. E. Wright, "Convergence Properties of the Nelder-Mead Simplex Method in Low Dimensions," SIAM Journal of Optimization, Vol. 9 Number 1, pp. 112-147, 1998.
@@ -74,8 +75,9 @@ def fn_mle_pc(IM, num_gmrs, num_collapse):
     return theta, beta
 
 def plotfrag(theta,beta,x = np.linspace(0,4,100)):
+    from scipy import stats
     y = stats.lognorm.cdf(x,s=beta,scale=theta)
-    plt.plot(x,y)
+    pl.plot(x,y)
     
 def values_in_bins(data, bins='fd'):
     """
@@ -121,7 +123,8 @@ def calculate_fragility(df,limit_name,limits,IM_column,EDP_column,plot=True):
         limit_name: how you want to name your limits
         limits: values to define the limits
         column_limit: dataframe column to check the exceedance of the values in limits
-        plot: by default is True, meaning that it returns the plots. Set to false if you do not want them
+        plot: by default is True, meaning that it returns the plots. Set to false if you do not want them.
+              The plots also follow the policy selected with opseestools.plotting.set_plot_mode
     
     Outputs:
         thetas: median of the lognormal distribution
@@ -141,13 +144,13 @@ def calculate_fragility(df,limit_name,limits,IM_column,EDP_column,plot=True):
         thetas.append(theta)
         betas.append(beta)
         if plot==True:
-            plt.plot(true_counts[IM_column],true_counts[lim]/ngm,'x')
+            pl.plot(true_counts[IM_column],true_counts[lim]/ngm,'x')
             plotfrag(theta, beta)
         
     if plot==True:
-        plt.xlabel('Sa(g)')
-        plt.ylabel('Probability')
-        plt.show()
+        pl.xlabel('Sa(g)')
+        pl.ylabel('Probability')
+        pl.show()
     
     return thetas,betas
 
@@ -173,16 +176,315 @@ def calculate_vulnerability(thetas,betas,ratios=[0.05,0.3,0.65,1.0],x = np.linsp
         vulnerability values
 
     '''
-    dstates = len(thetas)
-    vul = np.zeros(len(x))
-    y = [stats.lognorm.cdf(x,s=betas[i],scale=thetas[i]) for i in range(len(thetas))]
-    for i in range(dstates):
-        if i != dstates-1:
-            vul += (y[i]-y[i+1])*ratios[i]
-        else:
-            vul += (y[i])*ratios[i]
+    vul = vulnerability_curves(thetas,betas,ratios,x)[0]
     return x,vul
 
+def exceedance_probabilities(thetas,betas,x):
+    '''
+    Evaluates the lognormal fragility functions of many assets at once
+
+    Parameters
+    ----------
+    thetas : array
+        medians of the fragility functions. Shape (nassets, nds), a 1D array is taken as a single asset.
+    betas : array
+        lognormal deviations of the fragility functions, same shape as thetas.
+    x : array
+        intensity measure values where the functions are evaluated.
+
+    Returns
+    -------
+    pex : numpy array
+        probability of reaching or exceeding each damage state. Shape (nassets, nds, nim).
+
+    '''
+    from scipy import special
+    thetas = np.atleast_2d(np.asarray(thetas,dtype=float))
+    betas = np.atleast_2d(np.asarray(betas,dtype=float))
+    x = np.asarray(x,dtype=float)
+    with np.errstate(divide='ignore'):
+        lnx = np.log(x)
+    # P(DS >= ds | im) = Phi((ln im - ln theta)/beta), evaluated by broadcasting
+    z = (lnx[None,None,:] - np.log(thetas)[:,:,None])/betas[:,:,None]
+    return special.ndtr(z)
+
+def damage_state_probabilities(thetas,betas,x):
+    '''
+    Calculates the probability of being in each damage state for many assets at once
+
+    Parameters
+    ----------
+    thetas : array
+        medians of the fragility functions. Shape (nassets, nds), ordered from the lightest to the most severe damage state.
+    betas : array
+        lognormal deviations of the fragility functions, same shape as thetas.
+    x : array
+        intensity measure values where the probabilities are evaluated.
+
+    Returns
+    -------
+    pds : numpy array
+        probability of being in each damage state. Shape (nassets, nds, nim).
+
+    '''
+    pex = exceedance_probabilities(thetas,betas,x)
+    pds = pex.copy()
+    pds[:,:-1,:] -= pex[:,1:,:] # P(DS = i) = P(DS >= i) - P(DS >= i+1)
+    return pds
+
+def vulnerability_curves(thetas,betas,ratios=[0.05,0.3,0.65,1.0],x = np.linspace(0,4,100)):
+    '''
+    Calculates the vulnerability functions of many assets at once
+
+    Parameters
+    ----------
+    thetas : array
+        medians of the fragility functions. Shape (nassets, nds).
+    betas : array
+        lognormal deviations of the fragility functions, same shape as thetas.
+    ratios : array, optional
+        loss ratios of the damage states. Shape (nds,) or (nassets, nds). The default is [0.05,0.3,0.65,1.0].
+    x : array, optional
+        intensity measure values. The default is np.linspace(0,4,100).
+
+    Returns
+    -------
+    vul : numpy array
+        mean loss ratio of each asset at each value of x. Shape (nassets, nim).
+
+    '''
+    pds = damage_state_probabilities(thetas,betas,x)
+    ratios = np.broadcast_to(np.asarray(ratios,dtype=float),pds.shape[:2])
+    return np.einsum('ad,adm->am',ratios,pds)
+
+def expected_annual_loss(thetas,betas,ratios,im_hazard,rate_hazard,loss_levels=np.linspace(0,1,101),values=1.0,chunk=10000):
+    '''
+    Integrates the vulnerability of many assets against a hazard curve to obtain
+    the expected annual loss and the loss-exceedance curve of each asset
+
+    Parameters
+    ----------
+    thetas : array
+        medians of the fragility functions. Shape (nassets, nds).
+    betas : array
+        lognormal deviations of the fragility functions, same shape as thetas.
+    ratios : array
+        loss ratios of the damage states. Shape (nds,) or (nassets, nds).
+    im_hazard : array
+        increasing intensity measure values of the hazard curve.
+    rate_hazard : array
+        mean annual rate of exceedance of each value in im_hazard.
+    loss_levels : array, optional
+        loss ratios where the loss-exceedance curve is evaluated. The default is np.linspace(0,1,101).
+    values : float or array, optional
+        replacement value of each asset. The expected annual loss is returned in the same units. The default is 1.0 (loss ratios).
+    chunk : int, optional
+        number of assets processed at once to limit memory use. The default is 10000.
+
+    Returns
+    -------
+    eal : numpy array
+        expected annual loss of each asset. Shape (nassets,).
+    loss_levels : numpy array
+        loss ratios of the loss-exceedance curves.
+    loss_rate : numpy array
+        mean annual rate of exceeding each loss level. Shape (nassets, nlevels).
+
+    '''
+    thetas = np.atleast_2d(np.asarray(thetas,dtype=float))
+    betas = np.atleast_2d(np.asarray(betas,dtype=float))
+    nassets, nds = thetas.shape
+    ratios = np.broadcast_to(np.asarray(ratios,dtype=float),(nassets,nds))
+    im_hazard = np.asarray(im_hazard,dtype=float)
+    rate_hazard = np.asarray(rate_hazard,dtype=float)
+    loss_levels = np.asarray(loss_levels,dtype=float)
+    
+    # tasa de ocurrencia de cada intervalo de IM, evaluada en el punto medio geométrico.
+    # La cola por encima del último IM se asigna al último valor
+    im_mid = np.append(np.sqrt(im_hazard[:-1]*im_hazard[1:]),im_hazard[-1])
+    drate = np.append(rate_hazard[:-1]-rate_hazard[1:],rate_hazard[-1])
+    
+    eal = np.zeros(nassets)
+    loss_rate = np.zeros((nassets,len(loss_levels)))
+    for start in range(0,nassets,chunk):
+        sl = slice(start,start+chunk)
+        pds = damage_state_probabilities(thetas[sl],betas[sl],im_mid)
+        pds_rate = pds@drate # tasa anual de estar en cada estado de daño
+        eal[sl] = np.einsum('ad,ad->a',ratios[sl],pds_rate)
+        exceeds = ratios[sl][:,:,None] > loss_levels[None,None,:]
+        loss_rate[sl] = np.einsum('ad,adl->al',pds_rate,exceeds)
     
+    return eal*np.asarray(values,dtype=float), loss_levels, loss_rate
+
+def tabulate_fragility(thetas,betas,im_range=None,npts=512,tol=1e-4):
+    '''
+    Tabulates lognormal fragility functions on a log-spaced IM grid so they can be
+    evaluated in bulk by interpolation with evaluate_fragility_table. Assets that
+    share the same fragility functions share one row of the table.
+
+    Parameters
+    ----------
+    thetas : array
+        medians of the fragility functions (e.g. from fn_mle_pc or calculate_fragility). Shape (nassets, nds).
+    betas : array
+        lognormal deviations of the fragility functions, same shape as thetas.
+    im_range : list, optional
+        minimum and maximum IM of the grid. The default is None, which covers five
+        lognormal deviations around the smallest and largest medians.
+    npts : int, optional
+        number of points of the grid. The default is 512.
+    tol : float, optional
+        maximum absolute error in probability allowed for the interpolation. The default is 1e-4.
+
+    Returns
+    -------
+    table : dict
+        dictionary with the grid definition ('lnim0', 'dlnim'), the probabilities of
+        exceedance of the unique fragility sets stored as float32 with shape (nsets, npts, nds)
+        ('table'), the row of the table used by each asset ('index') and the maximum
+        interpolation error measured against the exact lognormal CDF ('max_error').
 
+    '''
+    thetas = np.atleast_2d(np.asarray(thetas,dtype=float))
+    betas = np.atleast_2d(np.asarray(betas,dtype=float))
+    nds = thetas.shape[1]
+    params, index = np.unique(np.hstack((thetas,betas)),axis=0,return_inverse=True)
+    uthetas, ubetas = params[:,:nds], params[:,nds:]
+    if im_range is None:
+        bmax = np.max(betas)
+        im_range = [np.min(thetas)*np.exp(-5*bmax), np.max(thetas)*np.exp(5*bmax)]
+    lnim = np.linspace(np.log(im_range[0]),np.log(im_range[1]),npts)
+    dlnim = lnim[1]-lnim[0]
+    table = np.ascontiguousarray(exceedance_probabilities(uthetas,ubetas,np.exp(lnim)).transpose(0,2,1),dtype=np.float32)
     
+    # el mayor error de la interpolación lineal ocurre cerca de la mitad de cada intervalo
+    exact = exceedance_probabilities(uthetas,ubetas,np.exp(lnim[:-1] + dlnim/2)).transpose(0,2,1)
+    approx = 0.5*(table[:,:-1,:].astype(float) + table[:,1:,:])
+    max_error = float(np.max(np.abs(exact-approx)))
+    if max_error > tol:
+        raise ValueError(f"interpolation error {max_error:.2e} exceeds tol={tol:.0e}, increase npts")
+    return {'lnim0':lnim[0], 'dlnim':dlnim, 'table':table, 'index':index.ravel(), 'max_error':max_error}
+
+def evaluate_fragility_table(table,im,assets=None):
+    '''
+    Evaluates tabulated fragility functions by linear interpolation in log(IM)
+
+    Parameters
+    ----------
+    table : dict
+        table created with tabulate_fragility.
+    im : array
+        intensity measure values.
+    assets : array of int, optional
+        index of the asset of each value in im. The default is None, which means that
+        the first dimension of im runs over the assets used to build the table.
+
+    Returns
+    -------
+    pex : numpy array
+        float32 probabilities of exceeding each damage state. Shape im.shape + (nds,).
+        IM values outside the grid take the value of the closest end of the table.
+
+    '''
+    tab = table['table']
+    npts = tab.shape[1]
+    im = np.asarray(im)
+    if assets is None:
+        assets = np.arange(len(table['index'])).reshape((-1,) + (1,)*(im.ndim-1))
+    rows = np.broadcast_to(table['index'][assets],im.shape)
+    with np.errstate(divide='ignore'):
+        u = (np.log(im) - table['lnim0'])/table['dlnim']
+    u = np.clip(u,0,npts-1)
+    i = np.minimum(u.astype(np.intp),npts-2)
+    w = (u-i).astype(np.float32)[...,None]
+    return tab[rows,i]*(1-w) + tab[rows,i+1]*w
+
+def iter_event_losses(im_field,thetas,betas,ratios,values=1.0,seed=None,chunk=1000,table=None):
+    '''
+    Generator that samples damage states and losses for all the assets of a portfolio,
+    one chunk of events at a time, and yields the loss of the portfolio in each event
+
+    Parameters
+    ----------
+    im_field : array
+        intensity measure of each asset in each event, shape (nassets, nevents). Can be a
+        numpy memmap, only one chunk of events is read at a time.
+    thetas : array
+        medians of the fragility functions. Shape (nassets, nds), ordered from the lightest to the most severe damage state.
+    betas : array
+        lognormal deviations of the fragility functions, same shape as thetas.
+    ratios : array
+        loss ratios of the damage states. Shape (nds,) or (nassets, nds).
+    values : float or array, optional
+        replacement value of each asset. The default is 1.0.
+    seed : int or numpy Generator, optional
+        seed of the random number generator. The random numbers are drawn event by event, so
+        with the same seed the losses of each event do not depend on chunk. The default is None.
+    chunk : int, optional
+        number of events processed at once. The default is 1000.
+    table : dict, optional
+        table from tabulate_fragility built with the same thetas and betas. If given,
+        the fragilities are interpolated from it instead of evaluated exactly. The default is None.
+
+    Yields
+    ------
+    events : slice
+        events of the chunk.
+    losses : numpy array
+        total loss of the portfolio in each event of the chunk.
+    counts : numpy array
+        number of assets in each damage state (including no damage) in each event of the chunk. Shape (nevents_chunk, nds+1).
+
+    '''
+    from scipy import special
+    rng = np.random.default_rng(seed)
+    thetas = np.atleast_2d(np.asarray(thetas,dtype=float))
+    betas = np.atleast_2d(np.asarray(betas,dtype=float))
+    nassets, nds = thetas.shape
+    nevents = im_field.shape[1]
+    # la pérdida del estado "sin daño" es cero
+    loss_ds = np.zeros((nassets,nds+1))
+    loss_ds[:,1:] = np.broadcast_to(np.asarray(ratios,dtype=float),(nassets,nds))
+    loss_ds *= np.reshape(np.broadcast_to(np.asarray(values,dtype=float),(nassets,)),(-1,1))
+    lnth = np.log(thetas)[:,None,:]
+    bt = betas[:,None,:]
+    rows = np.arange(nassets)[:,None]
+    
+    for start in range(0,nevents,chunk):
+        events = slice(start,min(start+chunk,nevents))
+        im = np.asarray(im_field[:,events],dtype=float)
+        if table is None:
+            with np.errstate(divide='ignore'):
+                pex = special.ndtr((np.log(im)[:,:,None] - lnth)/bt)
+        else:
+            pex = evaluate_fragility_table(table,im)
+        # el estado de daño es el número de curvas cuya probabilidad supera el número aleatorio;
+        # los números se generan evento por evento para que no dependan del tamaño del bloque
+        u = rng.random(im.shape[::-1],dtype=pex.dtype).T
+        ds = np.count_nonzero(pex > u[:,:,None],axis=2)
+        losses = loss_ds[rows,ds].sum(axis=0)
+        counts = np.stack([np.count_nonzero(ds == k,axis=0) for k in range(nds+1)],axis=1)
+        yield events, losses, counts
+
+def simulate_event_losses(im_field,thetas,betas,ratios,values=1.0,seed=None,chunk=1000,table=None):
+    '''
+    Event-based Monte Carlo simulation of the losses of a portfolio. The losses are aggregated
+    per event as they are computed, so the (assets x events) matrix of losses is never stored.
+    See iter_event_losses for the description of the inputs.
+
+    Returns
+    -------
+    losses : numpy array
+        total loss of the portfolio in each event. Shape (nevents,).
+    counts : numpy array
+        number of assets in each damage state (including no damage) in each event. Shape (nevents, nds+1).
+
+    '''
+    nevents = im_field.shape[1]
+    nds = np.atleast_2d(thetas).shape[1]
+    losses = np.zeros(nevents)
+    counts = np.zeros((nevents,nds+1),dtype=int)
+    for events, loss, count in iter_event_losses(im_field,thetas,betas,ratios,values,seed,chunk,table):
+        losses[events] = loss
+        counts[events] = count
+    return losses, counts
@@ -1,9 +1,8 @@
 # -*- coding: utf-8 -*-
 
 from openseespy.opensees import *
-import matplotlib.pyplot as plt
+import opseestools.plotting as pl
 import numpy as np
-import opseestools.utilidades as ut
 
 # ANALISIS DE GRAVEDAD
 # =============================
@@ -204,10 +203,10 @@ def pushover2(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-8):
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         Vbasal.append(getTime())
         
-    plt.figure()
-    plt.plot(dtecho,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -216,10 +215,10 @@ def pushover2(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-8):
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
     return techo, V
 
@@ -668,10 +667,10 @@ def pushover2Rot(Dmax,Dincr,IDctrlNode,IDctrlDOF,elements,norm=[-1,1],Tol=1e-8,f
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         Vbasal.append(getTime())
         
-    plt.figure()
-    plt.plot(dtecho,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -680,10 +679,10 @@ def pushover2Rot(Dmax,Dincr,IDctrlNode,IDctrlDOF,elements,norm=[-1,1],Tol=1e-8,f
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
     if forces != False:
         return techo, V, Prot,Eds
@@ -786,10 +785,10 @@ def pushover2D(Dmax,Dincr,IDctrlNode,IDctrlDOF,nodes_control,norm=[-1,1],Tol=1e-
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         Vbasal.append(getTime())
         
-    plt.figure()
-    plt.plot(dtecho,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -798,10 +797,10 @@ def pushover2D(Dmax,Dincr,IDctrlNode,IDctrlDOF,nodes_control,norm=[-1,1],Tol=1e-
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
     return techo, V, drift
 
@@ -910,10 +909,10 @@ def pushover2DRot(Dmax,Dincr,IDctrlNode,IDctrlDOF,nodes_control,elements,Tol=1e-
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         Vbasal.append(getTime())
         
-    plt.figure()
-    plt.plot(dtecho,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -1010,10 +1009,10 @@ def pushover2C(displ,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-4):
             Vbasal.append(getTime())
         currdisp = nodeDisp(IDctrlNode,IDctrlDOF) # LINEA NUEVA
         
-    plt.figure()
-    plt.plot(dtecho,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -1022,10 +1021,10 @@ def pushover2C(displ,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-4):
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
     return techo, V
 
@@ -1095,10 +1094,10 @@ def pushover2MP(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-8):
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
     return techo, V
 
@@ -1196,10 +1195,10 @@ def pushover2T(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-8):
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         Vbasal.append(getTime())
         
-    plt.figure()
-    plt.plot(dtecho,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -1209,15 +1208,15 @@ def pushover2T(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-8):
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
-    plt.figure()
-    plt.plot(dtecho,periods)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('Periodo (s)')
+    pl.figure()
+    pl.plot(dtecho,periods)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('Periodo (s)')
     
     return techo, V, PER
 
@@ -1369,10 +1368,10 @@ def pushover3T(Dmax,Dincr,IDctrlNode,IDctrlDOF,elements,norm=[-1,1],Tol=1e-8):
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         Vbasal.append(getTime())
         
-    plt.figure()
-    plt.plot(dtecho,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -1382,15 +1381,15 @@ def pushover3T(Dmax,Dincr,IDctrlNode,IDctrlDOF,elements,norm=[-1,1],Tol=1e-8):
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
-    plt.figure()
-    plt.plot(dtecho,periods)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('Periodo (s)')
+    pl.figure()
+    pl.plot(dtecho,periods)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('Periodo (s)')
     
     return techo, V, PER, Eds, Strains, cStress, sStress
 
@@ -1527,10 +1526,10 @@ def pushover3Tn(Dmax,Dincr,IDctrlNode,IDctrlDOF,elements,norm=[-1,1],Tol=1e-8):
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         Vbasal.append(getTime())
         
-    plt.figure()
-    plt.plot(dtecho,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -1540,15 +1539,15 @@ def pushover3Tn(Dmax,Dincr,IDctrlNode,IDctrlDOF,elements,norm=[-1,1],Tol=1e-8):
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
-    plt.figure()
-    plt.plot(dtecho,periods)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('Periodo (s)')
+    pl.figure()
+    pl.plot(dtecho,periods)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('Periodo (s)')
     
     return techo, V, PER, Eds, Strains, cStress, sStress
 
@@ -1565,6 +1564,7 @@ def pushover3Tn(Dmax,Dincr,IDctrlNode,IDctrlDOF,elements,norm=[-1,1],Tol=1e-8):
 # dinamicoIDA5 es lo mismo que IDA4, pero en lugar del nombre del registro, recibe una lista con las aceleraciones.
 
 def dinamico(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes = [0,2],Kswitch = 1,Tol=1e-4):
+    import opseestools.utilidades as ut
     
     # record es el nombre del registro, incluyendo extensión. P.ej. GM01.txt
     # dtrec es el dt del registro
@@ -1581,7 +1581,7 @@ def dinamico(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes = [
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   1,  '-accel', 1000)
     
     # damping
@@ -1653,10 +1653,10 @@ def dinamico(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes = [
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')  
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')  
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -1670,8 +1670,8 @@ def dinamicoIDA(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
 
     Parameters
     ----------
-    recordName : string
-        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. 
+    recordName : string or numpy array
+        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. An array with the accelerations can be given instead.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -1698,6 +1698,7 @@ def dinamicoIDA(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
     None.
 
     '''
+    import opseestools.utilidades as ut
     # modelName
     # record es el nombre del registro, incluyendo extensión. P.ej. GM01.txt
     # dtrec es el dt del registro
@@ -1714,7 +1715,7 @@ def dinamicoIDA(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   1,  '-accel', 1000)
     
     # damping
@@ -1786,16 +1787,17 @@ def dinamicoIDA(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     # techo = np.array(dtecho)
     # tiempo = np.array(t)
     wipe()
    
 def dinamicoAnim(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes = [0,2],Kswitch = 1,Tol=1e-8):
+    import opseestools.utilidades as ut
     
     # record es el nombre del registro, incluyendo extensión. P.ej. GM01.txt
     # dtrec es el dt del registro
@@ -1812,7 +1814,7 @@ def dinamicoAnim(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   1,  '-accel', 1000)
     
     # damping
@@ -1897,10 +1899,10 @@ def dinamicoAnim(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    plt.figure()
-    plt.plot(t,dtecho)
-    plt.xlabel('tiempo (s)')
-    plt.ylabel('desplazamiento (m)')  
+    pl.figure()
+    pl.plot(t,dtecho)
+    pl.xlabel('tiempo (s)')
+    pl.ylabel('desplazamiento (m)')  
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -1913,8 +1915,8 @@ def dinamicoIDA2(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
 
     Parameters
     ----------
-    recordName : string
-        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. 
+    recordName : string or numpy array
+        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. An array with the accelerations can be given instead.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -1944,6 +1946,7 @@ def dinamicoIDA2(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
         Displacement of the control node.
 
     '''
+    import opseestools.utilidades as ut
     
     
     # PARA SER UTILIZADO PARA CORRER EN PARALELO LOS SISMOS
@@ -1960,7 +1963,7 @@ def dinamicoIDA2(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   1,  '-accel', 1000)
     
     # damping
@@ -2032,10 +2035,10 @@ def dinamicoIDA2(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -2049,8 +2052,8 @@ def dinamicoIDA4(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,eleme
 
     Parameters
     ----------
-    recordName : string
-        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. 
+    recordName : string or numpy array
+        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. An array with the accelerations can be given instead.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -2101,6 +2104,7 @@ def dinamicoIDA4(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,eleme
         Drift at story of the building. Each column correspond to a node and each row to an analysis instant.
 
     '''
+    import opseestools.utilidades as ut
     
     
     
@@ -2122,7 +2126,7 @@ def dinamicoIDA4(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,eleme
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   1,  '-accel', 1000)
     
     # damping
@@ -2253,10 +2257,10 @@ def dinamicoIDA4(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,eleme
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -2272,7 +2276,7 @@ def dinamicoIDA4T(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elem
     Parameters
     ----------
     recordName : string
-        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. 
+        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -2444,10 +2448,10 @@ def dinamicoIDA4T(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elem
         # Tf2.append(Tf)
         
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     eigvalF = eigen(nmodes)
     
     eigF = eigvalF[modes[0]]
@@ -2467,8 +2471,8 @@ def dinamicoIDA4P(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elem
 
     Parameters
     ----------
-    recordName : string
-        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. 
+    recordName : string or numpy array
+        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. An array with the accelerations can be given instead.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -2513,6 +2517,7 @@ def dinamicoIDA4P(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elem
 
 
     '''
+    import opseestools.utilidades as ut
     # PARA SER UTILIZADO PARA CORRER EN PARALELO LOS SISMOS Y EXTRAYENDO LAS FUERZAS DE LOS ELEMENTOS INDICADOS EN ELEMENTS
     
     # record es el nombre del registro, incluyendo extensión. P.ej. GM01.txt
@@ -2531,7 +2536,7 @@ def dinamicoIDA4P(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elem
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   1,  '-accel', 1000)
     
     # damping
@@ -2638,10 +2643,10 @@ def dinamicoIDA4P(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elem
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -2703,11 +2708,12 @@ def dinamicoIDA5(acceleration,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,ele
         Drift at story of the building. Each column correspond to a node and each row to an analysis instant.
 
     '''        
+    import opseestools.utilidades as ut
     maxNumIter = 10
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-values',*acceleration,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,acceleration,dtrec,fact)
     pattern('UniformExcitation',  1000,   1,  '-accel', 1000)
     
     # damping
@@ -2838,10 +2844,10 @@ def dinamicoIDA5(acceleration,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,ele
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -2850,13 +2856,14 @@ def dinamicoIDA5(acceleration,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,ele
 
 def dinamicoIDA2DB(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes = [0,2],Kswitch = 1,Tol=1e-3, odb = 1, odbtag = 1000):
     import opstool as opst
+    import opseestools.utilidades as ut
     '''  
     Performs a dynamic analysis recording the displacement of a user selected node.
     
     Parameters
     ----------
-    recordName : string
-        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. 
+    recordName : string or numpy array
+        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. An array with the accelerations can be given instead.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -2900,7 +2907,7 @@ def dinamicoIDA2DB(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,mod
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
     
     # damping
@@ -2975,10 +2982,10 @@ def dinamicoIDA2DB(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,mod
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -3075,10 +3082,10 @@ def pushover2DB(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-8,odb = 1, od
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         Vbasal.append(getTime())
         
-    plt.figure()
-    plt.plot(dtecho,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -3087,21 +3094,21 @@ def pushover2DB(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-8,odb = 1, od
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     ODB.save_response()
     return techo, V
 
-def dinamicoIDA4PResidual(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elements,nodes_control,modes = [0,2],Kswitch = 1,Tol=1e-4):
+def dinamicoIDA4PResidual(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elements,nodes_control,modes = [0,2],Kswitch = 1,Tol=1e-4,tfree=2.0,decay_tol=None,method='peaks'):
     '''
     Performs a dynamic analysis for a ground motion, recording information about displacements, velocity, accelerations, forces. Only allows elements with six DOF.
 
     Parameters
     ----------
-    recordName : string
-        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. 
+    recordName : string or numpy array
+        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. An array with the accelerations can be given instead.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -3126,6 +3133,12 @@ def dinamicoIDA4PResidual(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrl
         Use it to define which stiffness matrix should be used for the ramping. The default is 1 that uses initial stiffness. Input 2 for current stifness.
     Tol : float, optional
         Tolerance for the analysis. The default is 1e-4 because it uses the NormUnbalance test.
+    tfree : float, optional
+        Maximum duration of the free vibration added after the record to compute the residual drift. The default is 2.0 seconds.
+    decay_tol : float, optional
+        If given, the free vibration stops as soon as the peak-to-peak drift of every story in the last 0.5 s is below this value. The default is None (always runs tfree).
+    method : string, optional
+        Residual drift estimator passed to utilidades.residual_drifts ('peaks' or 'mean'). The default is 'peaks'.
 
     Returns
     -------
@@ -3147,13 +3160,14 @@ def dinamicoIDA4PResidual(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrl
         Numpy array with the forces in the elements (columns and beams). The order is determined by the order used in the input variable elements. The array has three dimensions. The first one is the element, the second one the pushover instant and the third one is the DOF.
        
     residual_drift : numpy array  
-        Residual drift at each story of the building, extracted from the last 2 seconds of free vibration. 
+        Residual drift at each story of the building, extracted from the free vibration. 
         
     node_acel_abs : numpy array  
         Absolute acceleration at each node in nodes_control. 
         
 
     '''
+    import opseestools.utilidades as ut
     # PARA SER UTILIZADO PARA CORRER EN PARALELO LOS SISMOS Y EXTRAYENDO LAS FUERZAS DE LOS ELEMENTOS INDICADOS EN ELEMENTS
     
     # record es el nombre del registro, incluyendo extensión. P.ej. GM01.txt
@@ -3172,7 +3186,7 @@ def dinamicoIDA4PResidual(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrl
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   1,  '-accel', 1000)
     
     # damping
@@ -3208,8 +3222,10 @@ def dinamicoIDA4PResidual(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrl
     algoritmo = {1:'KrylovNewton', 2: 'SecantNewton' , 4: 'RaphsonNewton',5: 'PeriodicNewton', 6: 'BFGS', 7: 'Broyden', 8: 'NewtonLineSearch'}
 
     # rutina del análisis
-    Nsteps_extra = int(2.0 / dtan)    #Numero de pasos extra para deriva residual (2 segundos)
+    Nsteps_extra = int(tfree / dtan)    #Numero de pasos extra para deriva residual (2 segundos por defecto)
     Nsteps =  int(dtrec*nPts/dtan)+Nsteps_extra
+    ncheck = max(int(0.5/dtan),2) # pasos de la ventana usada para revisar si la vibración libre ya decayó
+    nfin = Nsteps + 1 # número de instantes grabados
     dtecho = [nodeDisp(IDctrlNode,IDctrlDOF)]
     t = [getTime()]
     nels = len(elements)
@@ -3227,7 +3243,7 @@ def dinamicoIDA4PResidual(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrl
     accg = np.zeros((Nsteps + 1, nnodos))  #para grabar las aceleraciones del suelo
     
     
-    acc = np.loadtxt(recordName)  #Carga las aceleraciones de cada registro
+    acc = ut.load_record(recordName)  #Carga las aceleraciones de cada registro
        
     if len(acc) < Nsteps:
         acc = np.pad(acc, (0, Nsteps - len(acc)), mode='constant') #Llena de ceross el registro hasta los 2 segundos adicioanles del residual
@@ -3294,16 +3310,26 @@ def dinamicoIDA4PResidual(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrl
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+        # parada temprana cuando la vibración libre ya decayó
+        nfree = k + 1 - (Nsteps - Nsteps_extra)
+        if decay_tol is not None and nfree >= ncheck and nfree % ncheck == 0:
+            if ut.free_vibration_decayed(drift[k+2-ncheck:k+2], decay_tol):
+                nfin = k + 2
+                break
+        
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
     
-    for node_i, node_tag in enumerate(nodes_control):
-        residual_drift[0,node_i-1]=ut.residual_disp(drift[:,node_i-1], Nsteps-Nsteps_extra)  #Se calcula deriva residual usando la funcion de Utilidades
+    Eds = Eds[:,:nfin]
+    node_disp, node_vel, node_acel = node_disp[:nfin], node_vel[:nfin], node_acel[:nfin]
+    drift, accg = drift[:nfin], accg[:nfin]
+    
+    residual_drift[0,:] = ut.residual_drifts(drift, Nsteps-Nsteps_extra, method)  #Se calcula deriva residual de todos los pisos a la vez usando la funcion de Utilidades
     
     node_acel_abs= node_acel +  accg   #Calcula la aceleracion absoluta como la suma de la relativa y la del suelo
     
@@ -3318,8 +3344,8 @@ def dinamicoIDA4R(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,colu
 
     Parameters
     ----------
-    recordName : string
-        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. 
+    recordName : string or numpy array
+        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. An array with the accelerations can be given instead.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -3375,6 +3401,7 @@ def dinamicoIDA4R(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,colu
         Drift at story of the building. Each column correspond to a node and each row to an analysis instant.
 
     '''
+    import opseestools.utilidades as ut
     
     
     # recordName es el nombre del registro, incluyendo extensión. P.ej. GM01.txt
@@ -3397,7 +3424,7 @@ def dinamicoIDA4R(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,colu
     
     # ------------------------- Creación del pattern --------------------------
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   1,  '-accel', 1000)
 
     # -------------------------------- Damping --------------------------------
@@ -5,7 +5,7 @@ Created on Mon Mar 21 17:59:44 2022
 @author: Orlando
 """
 from openseespy.opensees import *
-import matplotlib.pyplot as plt
+import opseestools.plotting as pl
 import numpy as np
 
 # ANALISIS DE GRAVEDAD
@@ -191,10 +191,10 @@ def pushover2(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-4):
         Vbasal.append(getTime())
         print()
         
-    plt.figure()
-    plt.plot(dtecho,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -203,10 +203,10 @@ def pushover2(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-4):
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
     return techo, V
 
@@ -308,10 +308,10 @@ def pushover2BD(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-8):
         dtecho2.append(nodeDisp(IDctrlNode,dir2)) # direccion perpendicular a la de control
         Vbasal.append(getTime()) 
         
-    plt.figure()
-    plt.plot(dtecho1,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho1,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho1)
     techo2 = np.array(dtecho2)
@@ -322,10 +322,10 @@ def pushover2BD(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-8):
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
     return techo, techo2, techoT, V
 
@@ -395,10 +395,10 @@ def pushover2MP(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-8):
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
     return techo, V
 
@@ -493,10 +493,10 @@ def pushover2T(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-8):
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         Vbasal.append(getTime())
         
-    plt.figure()
-    plt.plot(dtecho,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -506,15 +506,15 @@ def pushover2T(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-8):
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
-    plt.figure()
-    plt.plot(dtecho,periods)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('Periodo (s)')
+    pl.figure()
+    pl.plot(dtecho,periods)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('Periodo (s)')
     
     return techo, V, PER
 
@@ -628,10 +628,10 @@ def pushover3T(Dmax,Dincr,IDctrlNode,IDctrlDOF,elements,norm=[-1,1],Tol=1e-8):
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         Vbasal.append(getTime())
         
-    plt.figure()
-    plt.plot(dtecho,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -641,15 +641,15 @@ def pushover3T(Dmax,Dincr,IDctrlNode,IDctrlDOF,elements,norm=[-1,1],Tol=1e-8):
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
-    plt.figure()
-    plt.plot(dtecho,periods)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('Periodo (s)')
+    pl.figure()
+    pl.plot(dtecho,periods)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('Periodo (s)')
     
     return techo, V, PER, Eds, Strains, cStress, sStress
 
@@ -786,10 +786,10 @@ def pushover3Tn(Dmax,Dincr,IDctrlNode,IDctrlDOF,elements,norm=[-1,1],Tol=1e-8):
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         Vbasal.append(getTime())
         
-    plt.figure()
-    plt.plot(dtecho,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -799,15 +799,15 @@ def pushover3Tn(Dmax,Dincr,IDctrlNode,IDctrlDOF,elements,norm=[-1,1],Tol=1e-8):
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
-    plt.figure()
-    plt.plot(dtecho,periods)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('Periodo (s)')
+    pl.figure()
+    pl.plot(dtecho,periods)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('Periodo (s)')
     
     return techo, V, PER, Eds, Strains, cStress, sStress
 
@@ -919,10 +919,10 @@ def pushover2DRot(Dmax,Dincr,IDctrlNode,IDctrlDOF,nodes_control,elements,norm=[-
         Vbasal.append(getTime())
         print()
         
-    # plt.figure()
-    # plt.plot(dtecho,Vbasal)
-    # plt.xlabel('desplazamiento de techo (m)')
-    # plt.ylabel('corte basal (kN)')
+    # pl.figure()
+    # pl.plot(dtecho,Vbasal)
+    # pl.xlabel('desplazamiento de techo (m)')
+    # pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -931,10 +931,10 @@ def pushover2DRot(Dmax,Dincr,IDctrlNode,IDctrlDOF,nodes_control,elements,norm=[-
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        # plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        # pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
     return techo, V,drift,Prot
 
@@ -956,6 +956,7 @@ def pushover2DRot(Dmax,Dincr,IDctrlNode,IDctrlDOF,nodes_control,elements,norm=[-
 # dinamicoIDA6 es lo mismo que IDA4P pero recibe las dos componentes del sismo
 
 def dinamico(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes = [0,2],Kswitch = 1,Tol=1e-4):
+    import opseestools.utilidades as ut
     
     # record es el nombre del registro, incluyendo extensión. P.ej. GM01.txt
     # dtrec es el dt del registro
@@ -972,7 +973,7 @@ def dinamico(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes = [
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
     
     # damping
@@ -1044,10 +1045,10 @@ def dinamico(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes = [
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')  
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')  
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -1062,8 +1063,8 @@ def dinamicoBD(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes =
     
     Parameters
     ----------
-    recordName : string
-        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. 
+    recordName : string or numpy array
+        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. An array with the accelerations can be given instead.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -1097,6 +1098,7 @@ def dinamicoBD(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes =
             Numpy array with the resultant roof displacement recorded during the analysis.
 
     '''
+    import opseestools.utilidades as ut
     # record es el nombre de los registros en una lista, incluyendo extensión. P.ej. GM01.txt
     # dtrec es el dt del registro. Debe ser el mismo para ambos
     # nPts es el número de puntos del análisis. Debe ser el mismo para ambos
@@ -1116,9 +1118,9 @@ def dinamicoBD(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes =
         dir2 = 1
         
     # creación del pattern
-    timeSeries('Path',1000,'-filePath',recordName[0],'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName[0],dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
-    timeSeries('Path',1001,'-filePath',recordName[1],'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1001,recordName[1],dtrec,fact)
     pattern('UniformExcitation',  1001,   dir2,  '-accel', 1001)
     
     # damping
@@ -1208,7 +1210,7 @@ def dinamicoBD2(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,nodes_
     Parameters
     ----------
     recordName : list
-        list with the names of the record pair including file extension (i.e., 'GM01.txt'). It must have one record instant per line and each record. the records must be pairs, so the function expects that they are of the same length. 
+        list with the names of the record pair including file extension (i.e., 'GM01.txt'). It must have one record instant per line and each record. the records must be pairs, so the function expects that they are of the same length. Arrays with the accelerations can be given instead of the names.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -1260,6 +1262,7 @@ def dinamicoBD2(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,nodes_
     Eds:
         Element forces recorded for the element with tags defined in the input variable elements.
     '''
+    import opseestools.utilidades as ut
     
     # Realiza un análisis dinámico aplicando dos componentes ortogonales del terremoto
     # Graba información de elementos y nodos
@@ -1285,9 +1288,9 @@ def dinamicoBD2(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,nodes_
         dir2 = 1
         
     # creación del pattern
-    timeSeries('Path',1000,'-filePath',recordName[0],'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName[0],dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
-    timeSeries('Path',1001,'-filePath',recordName[1],'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1001,recordName[1],dtrec,fact)
     pattern('UniformExcitation',  1001,   dir2,  '-accel', 1001)
     
     # damping
@@ -1400,7 +1403,7 @@ def dinamicoBD3(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,nodes_
     Parameters
     ----------
     recordName : list
-        list with the names of the record pair including file extension (i.e., 'GM01.txt'). It must have one record instant per line and each record. the records must be pairs, so the function expects that they are of the same length. 
+        list with the names of the record pair including file extension (i.e., 'GM01.txt'). It must have one record instant per line and each record. the records must be pairs, so the function expects that they are of the same length. Arrays with the accelerations can be given instead of the names.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -1452,6 +1455,7 @@ def dinamicoBD3(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,nodes_
     Eds:
         Element forces recorded for the element with tags defined in the input variable elements.
     '''
+    import opseestools.utilidades as ut
     
     # Realiza un análisis dinámico aplicando dos componentes ortogonales del terremoto
     # Graba información de elementos y nodos
@@ -1477,9 +1481,9 @@ def dinamicoBD3(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,nodes_
         dir2 = 1
         
     # creación del pattern
-    timeSeries('Path',1000,'-filePath',recordName[0],'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName[0],dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
-    timeSeries('Path',1001,'-filePath',recordName[1],'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1001,recordName[1],dtrec,fact)
     pattern('UniformExcitation',  1001,   dir2,  '-accel', 1001)
     
     # damping
@@ -1598,7 +1602,7 @@ def dinamicoBD3DB(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,node
     Parameters
     ----------
     recordName : list
-        list with the names of the record pair including file extension (i.e., 'GM01.txt'). It must have one record instant per line and each record. the records must be pairs, so the function expects that they are of the same length. 
+        list with the names of the record pair including file extension (i.e., 'GM01.txt'). It must have one record instant per line and each record. the records must be pairs, so the function expects that they are of the same length. Arrays with the accelerations can be given instead of the names.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -1650,6 +1654,7 @@ def dinamicoBD3DB(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,node
     Eds:
         Element forces recorded for the element with tags defined in the input variable elements.
     '''
+    import opseestools.utilidades as ut
     
     # Realiza un análisis dinámico aplicando dos componentes ortogonales del terremoto
     # Graba información de elementos y nodos
@@ -1676,9 +1681,9 @@ def dinamicoBD3DB(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,node
         dir2 = 1
         
     # creación del pattern
-    timeSeries('Path',1000,'-filePath',recordName[0],'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName[0],dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
-    timeSeries('Path',1001,'-filePath',recordName[1],'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1001,recordName[1],dtrec,fact)
     pattern('UniformExcitation',  1001,   dir2,  '-accel', 1001)
     
     # damping
@@ -1794,6 +1799,7 @@ def dinamicoBD3DB(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,node
     return tiempo,techo1,techo2,techoT,node_disp,node_vel,node_acel,node_disp2,node_acel2,Eds,driftX,driftY
      
 def dinamicoIDA(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes = [0,2],Kswitch = 1,Tol=1e-4):
+    import opseestools.utilidades as ut
     
     # modelName
     # record es el nombre del registro, incluyendo extensión. P.ej. GM01.txt
@@ -1811,7 +1817,7 @@ def dinamicoIDA(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
     
     # damping
@@ -1883,16 +1889,17 @@ def dinamicoIDA(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     # techo = np.array(dtecho)
     # tiempo = np.array(t)
     wipe()
    
 def dinamicoAnim(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes = [0,2],Kswitch = 1,Tol=1e-8):
+    import opseestools.utilidades as ut
     
     # record es el nombre del registro, incluyendo extensión. P.ej. GM01.txt
     # dtrec es el dt del registro
@@ -1909,7 +1916,7 @@ def dinamicoAnim(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
     
     # damping
@@ -1994,10 +2001,10 @@ def dinamicoAnim(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    plt.figure()
-    plt.plot(t,dtecho)
-    plt.xlabel('tiempo (s)')
-    plt.ylabel('desplazamiento (m)')  
+    pl.figure()
+    pl.plot(t,dtecho)
+    pl.xlabel('tiempo (s)')
+    pl.ylabel('desplazamiento (m)')  
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -2010,8 +2017,8 @@ def dinamicoIDA2(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
     
     Parameters
     ----------
-    recordName : string
-        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. 
+    recordName : string or numpy array
+        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. An array with the accelerations can be given instead.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -2041,6 +2048,7 @@ def dinamicoIDA2(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
         Displacement of the control node.
 
     '''
+    import opseestools.utilidades as ut
     # PARA SER UTILIZADO PARA CORRER EN PARALELO LOS SISMOS
     
     # record es el nombre del registro, incluyendo extensión. P.ej. GM01.txt
@@ -2055,7 +2063,7 @@ def dinamicoIDA2(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
     
     # damping
@@ -2128,10 +2136,10 @@ def dinamicoIDA2(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -2140,6 +2148,7 @@ def dinamicoIDA2(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes
 
 
 def dinamicoIDA3(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elements,modes = [0,2],Kswitch = 1,Tol=1e-8):
+    import opseestools.utilidades as ut
     
     # PARA SER UTILIZADO PARA CORRER EN PARALELO LOS SISMOS Y EXTRAYENDO LAS FUERZAS DE LOS ELEMENTOS INDICADOS EN ELEMENTS
     
@@ -2159,7 +2168,7 @@ def dinamicoIDA3(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,eleme
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
     
     # damping
@@ -2288,10 +2297,10 @@ def dinamicoIDA3(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,eleme
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -2300,6 +2309,7 @@ def dinamicoIDA3(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,eleme
 
 
 def dinamicoIDA4(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elements,nodes_control,modes = [0,2],Kswitch = 1,Tol=1e-8):
+    import opseestools.utilidades as ut
     
     # PARA SER UTILIZADO PARA CORRER EN PARALELO LOS SISMOS Y EXTRAYENDO LAS FUERZAS DE LOS ELEMENTOS INDICADOS EN ELEMENTS
     
@@ -2319,7 +2329,7 @@ def dinamicoIDA4(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,eleme
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
     
     # damping
@@ -2450,10 +2460,10 @@ def dinamicoIDA4(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,eleme
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -2467,8 +2477,8 @@ def dinamicoIDA4P(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elem
 
     Parameters
     ----------
-    recordName : string
-        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. 
+    recordName : string or numpy array
+        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. An array with the accelerations can be given instead.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -2512,6 +2522,7 @@ def dinamicoIDA4P(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elem
         Drift at story of the building. Each column correspond to a node and each row to an analysis instant.
 
     '''
+    import opseestools.utilidades as ut
     # PARA SER UTILIZADO PARA CORRER EN PARALELO LOS SISMOS Y EXTRAYENDO LAS FUERZAS DE LOS ELEMENTOS INDICADOS EN ELEMENTS
     
     # record es el nombre del registro, incluyendo extensión. P.ej. GM01.txt
@@ -2530,7 +2541,7 @@ def dinamicoIDA4P(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elem
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
     
     # damping
@@ -2624,10 +2635,10 @@ def dinamicoIDA4P(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elem
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -2636,6 +2647,7 @@ def dinamicoIDA4P(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elem
 
 
 def dinamicoIDA4G(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,nodes_control,Tol=1e-3,modes = [0,2],Kswitch = 1):
+    import opseestools.utilidades as ut
     
     # PARA SER UTILIZADO PARA CORRER EN PARALELO LOS SISMOS Y EXTRAYENDO INFORMACIÓN GLOBAL
     
@@ -2654,7 +2666,7 @@ def dinamicoIDA4G(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,node
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
     
     # damping
@@ -2741,10 +2753,10 @@ def dinamicoIDA4G(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,node
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -2752,6 +2764,7 @@ def dinamicoIDA4G(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,node
     return tiempo,techo,node_disp,node_vel,node_acel,drift
 
 def dinamicoIDA5(acceleration,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elements,nodes_control,modes = [0,2],Kswitch = 1,Tol=1e-8):
+    import opseestools.utilidades as ut
     
     # PARA SER UTILIZADO PARA CORRER EN PARALELO LOS SISMOS Y EXTRAYENDO LAS FUERZAS DE LOS ELEMENTOS INDICADOS EN ELEMENTS
     
@@ -2771,7 +2784,7 @@ def dinamicoIDA5(acceleration,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,ele
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-values',*acceleration,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,acceleration,dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
     
     # damping
@@ -2902,10 +2915,10 @@ def dinamicoIDA5(acceleration,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,ele
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -2913,6 +2926,7 @@ def dinamicoIDA5(acceleration,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,ele
     return tiempo,techo,Eds,Strains,cStress,sStress,node_disp,node_vel,node_acel,drift
 
 def dinamicoIDA6(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,elements,nodes_control,modes = [0,2],Kswitch = 1,Tol=1e-8):
+    import opseestools.utilidades as ut
     
     # PARA SER UTILIZADO PARA CORRER EN PARALELO LOS SISMOS Y EXTRAYENDO LAS FUERZAS DE LOS ELEMENTOS INDICADOS EN ELEMENTS
     
@@ -2932,9 +2946,9 @@ def dinamicoIDA6(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,eleme
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName[0],'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName[0],dtrec,fact)
     pattern('UniformExcitation',  1000,   1,  '-accel', 1000)
-    timeSeries('Path',1001,'-filePath',recordName[1],'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1001,recordName[1],dtrec,fact)
     pattern('UniformExcitation',  1001,   2,  '-accel', 1001)
     
     # damping
@@ -3033,10 +3047,10 @@ def dinamicoIDA6(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,eleme
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -3045,13 +3059,14 @@ def dinamicoIDA6(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,eleme
 
 def dinamicoIDA2DB(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,modes = [0,2],Kswitch = 1,Tol=1e-3, odb = 1, odbtag = 1000):
     import opstool as opst
+    import opseestools.utilidades as ut
     '''  
     Performs a dynamic analysis recording the displacement of a user selected node.
     
     Parameters
     ----------
-    recordName : string
-        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. 
+    recordName : string or numpy array
+        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. An array with the accelerations can be given instead.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -3095,7 +3110,7 @@ def dinamicoIDA2DB(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,mod
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
     
     # damping
@@ -3170,10 +3185,10 @@ def dinamicoIDA2DB(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,mod
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -3272,10 +3287,10 @@ def pushover2DB(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-4,odb = 1, od
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         Vbasal.append(getTime())
         
-    plt.figure()
-    plt.plot(dtecho,Vbasal)
-    plt.xlabel('desplazamiento de techo (m)')
-    plt.ylabel('corte basal (kN)')
+    pl.figure()
+    pl.plot(dtecho,Vbasal)
+    pl.xlabel('desplazamiento de techo (m)')
+    pl.ylabel('corte basal (kN)')
     
     techo = np.array(dtecho)
     V = np.array(Vbasal)
@@ -3285,10 +3300,10 @@ def pushover2DB(Dmax,Dincr,IDctrlNode,IDctrlDOF,norm=[-1,1],Tol=1e-4,odb = 1, od
     if norm[0] != -1:
         deriva = techo/norm[0]*100
         VW = V/norm[1]
-        plt.figure()
-        plt.plot(deriva,VW)
-        plt.xlabel('Deriva de techo (%)')
-        plt.ylabel('V/W')
+        pl.figure()
+        pl.plot(deriva,VW)
+        pl.xlabel('Deriva de techo (%)')
+        pl.ylabel('V/W')
     
     return techo, V
 
@@ -3299,7 +3314,7 @@ def dinamicoBDSDOF(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,nod
     Parameters
     ----------
     recordName : list
-        list with the names of the record pair including file extension (i.e., 'GM01.txt'). It must have one record instant per line and each record. the records must be pairs, so the function expects that they are of the same length. 
+        list with the names of the record pair including file extension (i.e., 'GM01.txt'). It must have one record instant per line and each record. the records must be pairs, so the function expects that they are of the same length. Arrays with the accelerations can be given instead of the names.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -3351,6 +3366,7 @@ def dinamicoBDSDOF(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,nod
     abs_accel_srss:
         SRSS computed from the the absolute accelerations
     '''
+    import opseestools.utilidades as ut
     
     # Realiza un análisis dinámico aplicando dos componentes ortogonales del terremoto
     # Graba información de elementos y nodos
@@ -3381,9 +3397,9 @@ def dinamicoBDSDOF(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,nod
     w2 = 2*np.pi/periods[1]
     
     # creación del pattern
-    timeSeries('Path',1000,'-filePath',recordName[0],'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName[0],dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
-    timeSeries('Path',1001,'-filePath',recordName[1],'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1001,recordName[1],dtrec,fact)
     pattern('UniformExcitation',  1001,   dir2,  '-accel', 1001)
     
     # damping
@@ -3472,8 +3488,8 @@ def dinamicoBDSDOF(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,nod
     techoT = np.sqrt(techo1**2+techo2**2)
     tiempo = np.array(t)
     
-    ax = np.loadtxt(recordName[0])*fact
-    ay = np.loadtxt(recordName[1])*fact
+    ax = ut.load_record(recordName[0])*fact
+    ay = ut.load_record(recordName[1])*fact
     ax = np.insert(ax,0,0)
     ay = np.insert(ay,0,0)
     abx = node_acel[:,0] + ax
@@ -3489,7 +3505,7 @@ def dinamicoBD4(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,nodes_
     Parameters
     ----------
     recordName : list
-        list with the names of the record pair including file extension (i.e., 'GM01.txt'). It must have one record instant per line and each record. the records must be pairs, so the function expects that they are of the same length. 
+        list with the names of the record pair including file extension (i.e., 'GM01.txt'). It must have one record instant per line and each record. the records must be pairs, so the function expects that they are of the same length. Arrays with the accelerations can be given instead of the names.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -3548,6 +3564,7 @@ def dinamicoBD4(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,nodes_
         z-rotation at end I, z-rotation at end J, y-rotation at end I, y-rotation at end J, and torsion.
         Only returned if eletype='frame'.
     '''
+    import opseestools.utilidades as ut
     
     # Realiza un análisis dinámico aplicando dos componentes ortogonales del terremoto
     # Graba información de elementos y nodos
@@ -3573,9 +3590,9 @@ def dinamicoBD4(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,nodes_
         dir2 = 1
         
     # creación del pattern
-    timeSeries('Path',1000,'-filePath',recordName[0],'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName[0],dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
-    timeSeries('Path',1001,'-filePath',recordName[1],'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1001,recordName[1],dtrec,fact)
     pattern('UniformExcitation',  1001,   dir2,  '-accel', 1001)
     
     # damping
@@ -3702,8 +3719,8 @@ def dinamicoIDA4PRot(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,e
 
     Parameters
     ----------
-    recordName : string
-        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. 
+    recordName : string or numpy array
+        Name of the record including file extension (i.e., 'GM01.txt'). It must have one record instant per line. An array with the accelerations can be given instead.
     dtrec : float
         time increment of the record.
     nPts : integer
@@ -3747,6 +3764,7 @@ def dinamicoIDA4PRot(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,e
         Drift at story of the building. Each column correspond to a node and each row to an analysis instant.
 
     '''
+    import opseestools.utilidades as ut
     # PARA SER UTILIZADO PARA CORRER EN PARALELO LOS SISMOS Y EXTRAYENDO LAS FUERZAS DE LOS ELEMENTOS INDICADOS EN ELEMENTS
     
     # record es el nombre del registro, incluyendo extensión. P.ej. GM01.txt
@@ -3765,7 +3783,7 @@ def dinamicoIDA4PRot(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,e
     
     # creación del pattern
     
-    timeSeries('Path',1000,'-filePath',recordName,'-dt',dtrec,'-factor',fact)
+    ut.record_timeseries(1000,recordName,dtrec,fact)
     pattern('UniformExcitation',  1000,   IDctrlDOF,  '-accel', 1000)
     
     # damping
@@ -3865,10 +3883,10 @@ def dinamicoIDA4PRot(recordName,dtrec,nPts,dtan,fact,damp,IDctrlNode,IDctrlDOF,e
         dtecho.append(nodeDisp(IDctrlNode,IDctrlDOF))
         t.append(getTime())
         
-    # plt.figure()
-    # plt.plot(t,dtecho)
-    # plt.xlabel('tiempo (s)')
-    # plt.ylabel('desplazamiento (m)')
+    # pl.figure()
+    # pl.plot(t,dtecho)
+    # pl.xlabel('tiempo (s)')
+    # pl.ylabel('desplazamiento (m)')
     
     techo = np.array(dtecho)
     tiempo = np.array(t)
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Plotting policy shared by all the opseestools modules.
+
+The analysis and utility functions draw their figures through this module instead
+of calling matplotlib directly. The policy can be:
+
+    'on'       figures are drawn with matplotlib as soon as they are requested (default).
+    'off'      no figures are created and matplotlib is never imported.
+    'deferred' the plot commands and their data are stored so they can be sent to
+               another process (e.g. from a worker to the parent) and drawn there
+               with render().
+
+The initial policy can be selected with the OPSEESTOOLS_PLOTS environment variable,
+which is inherited by worker processes.
+"""
+import os
+from contextlib import contextmanager
+import numpy as np
+
+_modes = ('off','deferred','on')
+_mode = os.environ.get('OPSEESTOOLS_PLOTS','on').lower()
+if _mode not in _modes:
+    _mode = 'on'
+_deferred = [] # figuras pendientes en modo diferido
+_group = {'open':False} # hay una figura diferida abierta (se cierra con show, como en modo 'on')
+
+def set_plot_mode(mode):
+    '''
+    Selects the plotting policy of opseestools
+
+    Parameters
+    ----------
+    mode : string
+        'off', 'deferred' or 'on'.
+
+    Returns
+    -------
+    None.
+
+    '''
+    global _mode
+    mode = mode.lower()
+    if mode not in _modes:
+        raise ValueError(f"plot mode must be one of {_modes}, got '{mode}'")
+    _mode = mode
+
+def get_plot_mode():
+    '''
+    Returns the current plotting policy ('off', 'deferred' or 'on')
+    '''
+    return _mode
+
+@contextmanager
+def plot_mode(mode):
+    '''
+    Context manager to use a plotting policy temporarily, e.g.:
+
+        with plot_mode('off'):
+            techo, V = an.pushover2(...)
+    '''
+    previous = _mode
+    set_plot_mode(mode)
+    try:
+        yield
+    finally:
+        set_plot_mode(previous)
+
+def get_deferred(clear=True):
+    '''
+    Returns the figures stored in deferred mode
+
+    Parameters
+    ----------
+    clear : bool, optional
+        Removes the figures from the buffer after returning them. The default is True.
+
+    Returns
+    -------
+    figures : list
+        list of figures. Each figure is a list of (command, args, kwargs) tuples that can be pickled; when the
+        figure was opened with figure() its first command is ('figure', args, kwargs).
+
+    '''
+    figures = list(_deferred)
+    if clear:
+        clear_deferred()
+    return figures
+
+def clear_deferred():
+    '''
+    Discards the figures stored in deferred mode
+    '''
+    del _deferred[:]
+    _group['open'] = False
+
+def render(figures, show=False):
+    '''
+    Draws with matplotlib the figures collected in deferred mode (e.g. returned by the workers)
+
+    Parameters
+    ----------
+    figures : list
+        figures as returned by get_deferred.
+    show : bool, optional
+        Calls plt.show() at the end. The default is False.
+
+    Returns
+    -------
+    None.
+
+    '''
+    import matplotlib.pyplot as plt
+    for fig in figures:
+        # se repite la llamada a figure con sus argumentos (figsize, número, ...) si la hubo
+        if not fig or fig[0][0] != 'figure':
+            plt.figure()
+        for name, args, kwargs in fig:
+            _draw(plt, name, args, kwargs)
+    if show:
+        plt.show()
+
+def _draw(plt, name, args, kwargs):
+    if name == 'invert_xaxis':
+        plt.gca().invert_xaxis()
+    else:
+        getattr(plt, name)(*args, **kwargs)
+
+def _command(name, args, kwargs):
+    if _mode == 'off':
+        return
+    if _mode == 'on':
+        import matplotlib.pyplot as plt
+        _draw(plt, name, args, kwargs)
+        return
+    # modo diferido: figure o un comando después de show abren una nueva figura, como en modo 'on'
+    if name == 'figure' or not _group['open']:
+        _deferred.append([])
+        _group['open'] = True
+    # se copian los datos para que no cambien si el usuario modifica sus listas
+    if name != 'figure':
+        args = tuple(np.array(a) if isinstance(a, (list, tuple, np.ndarray)) else a for a in args)
+    _deferred[-1].append((name, args, kwargs))
+
+def figure(*args, **kwargs):
+    _command('figure', args, kwargs)
+
+def plot(*args, **kwargs):
+    _command('plot', args, kwargs)
+
+def xlabel(*args, **kwargs):
+    _command('xlabel', args, kwargs)
+
+def ylabel(*args, **kwargs):
+    _command('ylabel', args, kwargs)
+
+def xlim(*args, **kwargs):
+    _command('xlim', args, kwargs)
+
+def ylim(*args, **kwargs):
+    _command('ylim', args, kwargs)
+
+def axis(*args, **kwargs):
+    _command('axis', args, kwargs)
+
+def axhline(*args, **kwargs):
+    _command('axhline', args, kwargs)
+
+def axvline(*args, **kwargs):
+    _command('axvline', args, kwargs)
+
+def invert_xaxis():
+    _command('invert_xaxis', (), {})
+
+def show(*args, **kwargs):
+    # en modo diferido la figura se cierra y se muestra cuando se llama render en el proceso principal
+    if _mode == 'on':
+        import matplotlib.pyplot as plt
+        plt.show(*args, **kwargs)
+    elif _mode == 'deferred':
+        _group['open'] = False
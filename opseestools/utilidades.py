@@ -1,14 +1,13 @@
 # -*- coding: utf-8 -*-
 
 from openseespy.opensees import *
-import matplotlib.pyplot as plt
+import opseestools.plotting as pl
 import numpy as np
-from scipy.signal import argrelextrema
-from scipy.stats import gmean
-from scipy.fft import fft, ifft
-from scipy.integrate import cumulative_trapezoid
-import pandas as pd
 import itertools
+import os
+from functools import lru_cache
+from contextlib import contextmanager
+# scipy y pandas se importan dentro de las funciones que los usan para reducir el tiempo de importación
 
 def MomentCurvature(secTag, axialLoad, maxK, numIncr=300):
     '''
@@ -108,14 +107,88 @@ def MomentCurvature(secTag, axialLoad, maxK, numIncr=300):
         analyze(1)
         curv.append(nodeDisp(n2,3))
         M.append(getTime())
-    plt.figure()
-    plt.plot(curv,M)
-    plt.xlabel('Curvatura')
-    plt.ylabel('Momento (kN-m)')
+    pl.figure()
+    pl.plot(curv,M)
+    pl.xlabel('Curvatura')
+    pl.ylabel('Momento (kN-m)')
     # wipe()
     nodes = [n1,n2]
     return M,curv
 
+def _MomentCurvature_task(section,secTag,axialLoad,maxK,numIncr):
+    # construye la sección en un dominio limpio del proceso y calcula una curva
+    import io
+    from contextlib import redirect_stdout
+    try:
+        with pl.plot_mode('off'), redirect_stdout(io.StringIO()):
+            wipe()
+            model('basic','-ndm',2,'-ndf',3)
+            if callable(section):
+                section()
+            else:
+                replay_model(section,wipe_model=False)
+            M, curv = MomentCurvature(secTag,axialLoad,maxK,numIncr)
+        result = (np.array(M,dtype=float),np.array(curv,dtype=float),'')
+    except (Exception, SystemExit) as e:
+        result = (np.full(numIncr+1,np.nan),np.full(numIncr+1,np.nan),f'{type(e).__name__}: {e}')
+    wipe()
+    return result
+
+def MomentCurvature_family(section,secTags,axialLoads,maxK,numIncr=300,nworkers=1):
+    '''
+    Computes with MomentCurvature a family of moment-curvature curves (several sections and axial loads). Each
+    curve runs in a separate process with its own OpenSees domain, so the model loaded in the current process
+    is not modified, and with nworkers > 1 the curves are computed in parallel. As the workers import the
+    calling script again on Windows and macOS, the call must be under if __name__ == '__main__': (even with
+    nworkers=1, since a worker process is always used), e.g.:
+
+        if __name__ == '__main__':
+            with ut.capture_model() as snapshot:
+                noconf, conf, acero = ut.col_materials(28,420)
+                ut.create_rect_RC_section(101,0.5,0.5,0.05,conf,noconf,acero,4,As,4,As,4,As)
+            mc = ut.MomentCurvature_family(snapshot,101,[-500,-1000,-2000],0.05,nworkers=3)
+
+    Parameters
+    ----------
+    section : callable, list or string
+        function without arguments that defines the materials and the sections (defined at module level when
+        nworkers > 1), snapshot of capture_model or name of a file saved with save_model.
+    secTags : int or list
+        tag of the section or list of tags.
+    axialLoads : float or list
+        axial load or list of axial loads, applied to every section.
+    maxK : float or list
+        max curvature, one value or one per section.
+    numIncr : int, optional
+        number of steps for the calculation. The default is 300.
+    nworkers : int, optional
+        number of processes. The default is 1.
+
+    Returns
+    -------
+    mc : dict
+        'curvature', 'M' and 'error' (empty when the curve was computed, NaN curves otherwise). The arrays have
+        shape (number of sections, number of axial loads, numIncr+1); the section axis is omitted for one
+        section and the load axis for one axial load.
+
+    '''
+    from concurrent.futures import ProcessPoolExecutor
+    tags = np.atleast_1d(secTags).tolist()
+    loads = np.atleast_1d(np.asarray(axialLoads,dtype=float)).tolist()
+    maxKs = np.broadcast_to(np.asarray(maxK,dtype=float),(len(tags),)).tolist()
+    if isinstance(section,str):
+        section = load_model(section)
+    tasks = [(tag,P,k) for tag,k in zip(tags,maxKs) for P in loads]
+    n = len(tasks)
+    # se usan procesos también con un solo worker para no tocar el dominio del proceso actual
+    with ProcessPoolExecutor(nworkers) as executor:
+        results = list(executor.map(_MomentCurvature_task,[section]*n,*zip(*tasks),[numIncr]*n,
+                                    chunksize=max(1,n//(4*nworkers))))
+    shape = (() if np.ndim(secTags) == 0 else (len(tags),)) + (() if np.ndim(axialLoads) == 0 else (len(loads),))
+    M, curv, error = zip(*results)
+    return {'curvature':np.array(curv).reshape(shape+(numIncr+1,)), 'M':np.array(M).reshape(shape+(numIncr+1,)),
+            'error':np.array(error,dtype=object).reshape(shape)}
+
 def testMaterial(matTag,displ):
     '''
     
@@ -198,10 +271,10 @@ def testMaterial(matTag,displ):
     else:
         print('Analisis completo')
     
-    plt.figure()
-    plt.plot(Disp,F)
-    plt.xlabel('deformación unitaria (m/m)')
-    plt.ylabel('esfuerzo (kPa)')
+    pl.figure()
+    pl.plot(Disp,F)
+    pl.xlabel('deformación unitaria (m/m)')
+    pl.ylabel('esfuerzo (kPa)')
     return Disp,F
     
 def BuildRCSection(ID,HSec,BSec,coverH,coverB,coreID,coverID,steelID,numBarsTop,barAreaTop,numBarsBot,barAreaBot,numBarsIntTot,barAreaInt,nfCoreY,nfCoreZ,nfCoverY,nfCoverZ,GJ=1e6):
@@ -280,7 +353,14 @@ def BuildRCSection(ID,HSec,BSec,coverH,coverB,coreID,coverID,steelID,numBarsTop,
 	#    nfCoreZ - number of fibers in the core patch in the z direction
 	#    nfCoverY - number of fibers in the cover patches with long sides in the y direction
 	#    nfCoverZ - number of fibers in the cover patches with long sides in the z direction
-    
+    params = (ID,HSec,BSec,coverH,coverB,coreID,coverID,steelID,numBarsTop,barAreaTop,numBarsBot,barAreaBot,numBarsIntTot,barAreaInt,nfCoreY,nfCoreZ,nfCoverY,nfCoverZ,GJ)
+    _emit(_cached_definition('rect_RC_section',_rect_RC_section_commands,params,_RECT_RC_TAGS))
+
+_RECT_RC_TAGS = (0,5,6,7) # posiciones de los tags en los parámetros de _rect_RC_section_commands
+
+def _rect_RC_section_commands(ID,HSec,BSec,coverH,coverB,coreID,coverID,steelID,numBarsTop,barAreaTop,numBarsBot,barAreaBot,numBarsIntTot,barAreaInt,nfCoreY,nfCoreZ,nfCoverY,nfCoverZ,GJ):
+    # comandos section, patch y layer de BuildRCSection
+    cmds = []
     coverY = HSec/2.0
     coverZ = BSec/2.0
     coreY = coverY - coverH
@@ -291,23 +371,32 @@ def BuildRCSection(ID,HSec,BSec,coverH,coverB,coreID,coverID,steelID,numBarsTop,
     a = HSec - 2*coverH
     b = a/nespacios
         
-    section('Fiber',ID,'-GJ',GJ)
-    patch('quad',coreID,nfCoreZ,nfCoreY,-coreY,coreZ,-coreY,-coreZ,coreY,-coreZ,coreY,coreZ)
-    patch('quad',coverID,2,nfCoverY,-coverY,coverZ,-coreY,coreZ,coreY,coreZ,coverY,coverZ)
-    patch('quad',coverID,2,nfCoverY,-coreY,-coreZ,-coverY,-coverZ,coverY,-coverZ,coreY,-coreZ)
-    patch('quad',coverID,nfCoverZ,2,-coverY,coverZ,-coverY,-coverZ,-coreY,-coreZ,-coreY,coreZ)
-    patch('quad',coverID,nfCoverZ,2,coreY,coreZ,coreY,-coreZ,coverY,-coverZ,coverY,coverZ)    
-    layer('straight',steelID,numBarsInt,barAreaInt,-coreY+b,coreZ,coreY-b,coreZ) # este
-    layer('straight',steelID,numBarsInt,barAreaInt,-coreY+b,-coreZ,coreY-b,-coreZ) # y este
-    layer('straight',steelID,numBarsTop,barAreaTop,coreY,coreZ,coreY,-coreZ)
-    layer('straight',steelID,numBarsBot,barAreaBot,-coreY,coreZ,-coreY,-coreZ)
-    
+    cmds.append(('section',('Fiber',ID,'-GJ',GJ)))
+    cmds.append(('patch',('quad',coreID,nfCoreZ,nfCoreY,-coreY,coreZ,-coreY,-coreZ,coreY,-coreZ,coreY,coreZ)))
+    cmds.append(('patch',('quad',coverID,2,nfCoverY,-coverY,coverZ,-coreY,coreZ,coreY,coreZ,coverY,coverZ)))
+    cmds.append(('patch',('quad',coverID,2,nfCoverY,-coreY,-coreZ,-coverY,-coverZ,coverY,-coverZ,coreY,-coreZ)))
+    cmds.append(('patch',('quad',coverID,nfCoverZ,2,-coverY,coverZ,-coverY,-coverZ,-coreY,-coreZ,-coreY,coreZ)))
+    cmds.append(('patch',('quad',coverID,nfCoverZ,2,coreY,coreZ,coreY,-coreZ,coverY,-coverZ,coverY,coverZ)))
+    cmds.append(('layer',('straight',steelID,numBarsInt,barAreaInt,-coreY+b,coreZ,coreY-b,coreZ))) # este
+    cmds.append(('layer',('straight',steelID,numBarsInt,barAreaInt,-coreY+b,-coreZ,coreY-b,-coreZ))) # y este
+    cmds.append(('layer',('straight',steelID,numBarsTop,barAreaTop,coreY,coreZ,coreY,-coreZ)))
+    cmds.append(('layer',('straight',steelID,numBarsBot,barAreaBot,-coreY,coreZ,-coreY,-coreZ)))
+    return cmds
+
 def BuildRCCircSection(ID,radius,cover,nbars,abar,coreID,coverID,steelID,GJ=1e6):
+    params = (ID,radius,cover,nbars,abar,coreID,coverID,steelID,GJ)
+    _emit(_cached_definition('circ_RC_section',_circ_RC_section_commands,params,_CIRC_RC_TAGS))
+
+_CIRC_RC_TAGS = (0,5,6,7)
+
+def _circ_RC_section_commands(ID,radius,cover,nbars,abar,coreID,coverID,steelID,GJ):
+    # comandos section, patch y layer de BuildRCCircSection
     radio_int = radius-cover
-    section('Fiber',ID,'-GJ',GJ)
-    patch('circ', coverID, 16, 1, *[0,0],*[radio_int,radius],*[0,360])
-    patch('circ', coreID, 16, 10, *[0,0],*[0,radio_int],*[0,360])
-    layer('circ', steelID, nbars, abar, *[0,0],radio_int)
+    cmds = [('section',('Fiber',ID,'-GJ',GJ))]
+    cmds.append(('patch',('circ', coverID, 16, 1, *[0,0],*[radio_int,radius],*[0,360])))
+    cmds.append(('patch',('circ', coreID, 16, 10, *[0,0],*[0,radio_int],*[0,360])))
+    cmds.append(('layer',('circ', steelID, nbars, abar, *[0,0],radio_int)))
+    return cmds
     
         
 
@@ -636,9 +725,538 @@ def spectrum4(GM,dt,xi=0.05,rango=[0.02,3.0],N=300):
 
 # T,Sa = espectroNSR(0.15, 0.2, 2.1, 3.2, 1.0)
 
-# plt.plot(T,Sa)
+# pl.plot(T,Sa)
+
+# comandos de OpenSees que definen el modelo y que se graban en capture_model
+_MODEL_COMMANDS = ('wipe','model','node','fix','fixX','fixY','fixZ','mass','equalDOF','rigidDiaphragm','rigidLink',
+                   'uniaxialMaterial','nDMaterial','section','fiber','patch','layer','geomTransf','beamIntegration',
+                   'element','timeSeries','pattern','load','eleLoad','sp','region','rayleigh')
+_SNAPSHOT_VERSION = 1
+
+@contextmanager
+def capture_model(namespaces=None,commands=_MODEL_COMMANDS):
+    '''
+    Records the OpenSees commands that define a model while it is built, e.g.:
+
+        with ut.capture_model([globals()]) as snapshot:
+            ut.creategrid3D(...)
+            ut.col_materials(...)
+            ...
+        ut.save_model(snapshot,'model.npz')
+
+    The commands called through openseespy.opensees, through the opseestools modules and through
+    the given namespaces are executed normally and appended to the snapshot.
+
+    Parameters
+    ----------
+    namespaces : list, optional
+        dictionaries where the OpenSees functions were imported with from openseespy.opensees import *
+        (e.g. globals() of the user script). The default is None.
+    commands : tuple, optional
+        names of the commands to record. The default is the model definition commands
+        (nodes, elements, materials, sections, constraints, masses and loads).
+
+    Yields
+    ------
+    snapshot : list
+        list of (command, arguments) tuples in the order they were called.
+
+    '''
+    import sys
+    import openseespy.opensees as ops
+    snapshot = []
+    targets = [vars(ops)] + [vars(sys.modules[m]) for m in ('opseestools.utilidades','opseestools.analisis','opseestools.analisis3D') if m in sys.modules]
+    targets += list(namespaces or [])
+    originals = []
+    def wrap(name,func):
+        def recorded(*args):
+            snapshot.append((name,args))
+            return func(*args)
+        return recorded
+    wrappers = {name: wrap(name,getattr(ops,name)) for name in commands}
+    for ns in targets:
+        for name in commands:
+            if name in ns and ns[name] is getattr(ops,name):
+                originals.append((ns,name,ns[name]))
+    try:
+        for ns,name,func in originals:
+            ns[name] = wrappers[name]
+        yield snapshot
+    finally:
+        for ns,name,func in originals:
+            ns[name] = func
+
+def save_model(snapshot,filename):
+    '''
+    Saves a snapshot of capture_model in a compact binary file (numpy .npz). The arguments of all the
+    commands are stored in one array, with the command names and strings in separate tables.
+
+    Parameters
+    ----------
+    snapshot : list
+        snapshot from capture_model.
+    filename : string
+        name of the file.
+
+    Returns
+    -------
+    None.
+
+    '''
+    names = sorted({name for name,args in snapshot})
+    index = {name:i for i,name in enumerate(names)}
+    strings = {}
+    kinds, values = [], []
+    for name,args in snapshot:
+        for a in args:
+            if isinstance(a,(str,np.str_)):
+                kinds.append(2)
+                values.append(strings.setdefault(str(a),len(strings)))
+            elif isinstance(a,(int,np.integer)) and not isinstance(a,bool):
+                if abs(a) >= 2**53:
+                    raise ValueError(f'integer argument {a} of {name} is too large to be saved')
+                kinds.append(0)
+                values.append(a)
+            elif isinstance(a,(float,np.floating)):
+                kinds.append(1)
+                values.append(a)
+            else:
+                raise ValueError(f'argument {a!r} of {name} cannot be saved, only numbers and strings are supported')
+    np.savez_compressed(filename,
+                        version=np.array(_SNAPSHOT_VERSION),
+                        names=np.array(names,dtype=str),
+                        command=np.array([index[name] for name,args in snapshot],dtype=np.int16),
+                        nargs=np.array([len(args) for name,args in snapshot],dtype=np.int32),
+                        kinds=np.array(kinds,dtype=np.int8),
+                        values=np.array(values,dtype=float),
+                        strings=np.array(list(strings),dtype=str))
+
+def load_model(filename):
+    '''
+    Reads a model saved with save_model and returns the snapshot (list of (command, arguments) tuples)
+    '''
+    with np.load(filename) as data:
+        version = int(data['version'])
+        if version > _SNAPSHOT_VERSION:
+            raise ValueError(f'{filename} was saved with snapshot version {version}, this version of opseestools reads up to {_SNAPSHOT_VERSION}')
+        names = data['names'].tolist()
+        strings = data['strings'].tolist()
+        kinds = data['kinds']
+        values = data['values']
+        command = data['command'].tolist()
+        nargs = data['nargs']
+    # se convierten todos los argumentos a tipos de Python de una vez
+    args = np.empty(len(values),dtype=object)
+    args[kinds == 0] = values[kinds == 0].astype(np.int64).tolist()
+    args[kinds == 1] = values[kinds == 1].tolist()
+    args[kinds == 2] = [strings[int(i)] for i in values[kinds == 2]]
+    args = args.tolist()
+    bounds = np.concatenate(([0],np.cumsum(nargs))).tolist()
+    return [(names[c],tuple(args[bounds[k]:bounds[k+1]])) for k,c in enumerate(command)]
+
+def replay_model(snapshot,wipe_model=True):
+    '''
+    Rebuilds a model from a snapshot of capture_model or from a file of save_model, e.g. in the
+    workers of a parallel IDA, without running the script that created it
+
+    Parameters
+    ----------
+    snapshot : list or string
+        snapshot from capture_model or load_model, or name of a file saved with save_model.
+    wipe_model : bool, optional
+        calls wipe() before rebuilding the model. The default is True.
+
+    Returns
+    -------
+    None.
+
+    '''
+    import openseespy.opensees as ops
+    if isinstance(snapshot,str):
+        snapshot = load_model(snapshot)
+    if wipe_model:
+        ops.wipe()
+    funcs = {name:getattr(ops,name) for name in {name for name,args in snapshot}}
+    for name,args in snapshot:
+        funcs[name](*args)
+
+# caché de definiciones de materiales y secciones: (función, parámetros sin los tags) -> comandos (command, args)
+_DEFINITION_CACHE = {}
+_DEFINITION_STATS = {'hits':0, 'misses':0}
+
+def _plain(values):
+    # convierte los escalares de numpy a tipos de Python para que las llaves y los archivos sean exactos
+    return tuple(v.item() if isinstance(v,np.generic) else v for v in values)
+
+def _cached_definition(name,build,params,tags=()):
+    # devuelve los comandos guardados para estos parámetros o los calcula una sola vez. Los tags (posiciones
+    # de params indicadas en tags) no son parte de la llave: los comandos se guardan con marcadores que se
+    # reemplazan por los tags de cada llamada, así una definición repetida con otros tags reutiliza la entrada
+    params = _plain(params)
+    marks = {k:f'<tag{i}>' for i,k in enumerate(tags)}
+    generic = tuple(marks.get(k,v) for k,v in enumerate(params))
+    key = (name,)+generic
+    cmds = _DEFINITION_CACHE.get(key)
+    if cmds is None:
+        cmds = tuple((cname,_plain(cargs)) for cname,cargs in build(*generic))
+        _DEFINITION_CACHE[key] = cmds
+        _DEFINITION_STATS['misses'] += 1
+    else:
+        _DEFINITION_STATS['hits'] += 1
+    values = {marks[k]:params[k] for k in tags}
+    return tuple((cname,tuple(values.get(a,a) if isinstance(a,str) else a for a in cargs)) for cname,cargs in cmds)
+
+def _emit(cmds):
+    # los comandos se buscan en el módulo al llamarlos para que capture_model los registre
+    g = globals()
+    for name,args in cmds:
+        g[name](*args)
+
+def definition_cache_info():
+    '''
+    Returns the state of the material and section cache used by col_materials, BuildRCSection,
+    BuildRCCircSection, create_rect_RC_section and create_circ_RC_section
+
+    Returns
+    -------
+    info : dict
+        entries (number of cached definitions), hits and misses.
+
+    '''
+    return {'entries':len(_DEFINITION_CACHE), **_DEFINITION_STATS}
+
+def clear_definition_cache():
+    '''
+    Empties the material and section cache
+    '''
+    _DEFINITION_CACHE.clear()
+    _DEFINITION_STATS.update(hits=0, misses=0)
+
+def save_definition_cache(filename):
+    '''
+    Saves the material and section cache in a .npz file (same format as save_model)
+
+    Parameters
+    ----------
+    filename : string
+        name of the file.
+
+    Returns
+    -------
+    None.
+
+    '''
+    snapshot = []
+    for key,cmds in _DEFINITION_CACHE.items():
+        snapshot.append(('__key__',key))
+        snapshot.extend(cmds)
+    save_model(snapshot,filename)
+
+def load_definition_cache(filename):
+    '''
+    Adds to the material and section cache the definitions saved with save_definition_cache
+
+    Parameters
+    ----------
+    filename : string
+        name of the file.
+
+    Returns
+    -------
+    n : int
+        number of definitions read.
+
+    '''
+    entries = {}
+    for name,args in load_model(filename):
+        if name == '__key__':
+            cmds = entries.setdefault(args,[])
+        else:
+            cmds.append((name,args))
+    _DEFINITION_CACHE.update({key:tuple(cmds) for key,cmds in entries.items()})
+    return len(entries)
+
+@contextmanager
+def definition_cache(filename):
+    '''
+    Reuses the material and section definitions between runs, e.g. in a parametric study:
+
+        with ut.definition_cache('definitions.npz'):
+            for params in table:
+                ...build and analyze the model...
+
+    The cache is read from the file (if it exists) at the beginning and saved at the end. Worker processes
+    started inside the block inherit the cache when the platform uses fork. The material and section tags
+    are not part of the cached parameters, so a definition is reused when it is repeated with other tags
+    (e.g. archetypes rebuilt with offset tags).
+
+    Parameters
+    ----------
+    filename : string
+        name of the .npz file.
 
-def creategrid(xloc,yloc):
+    '''
+    if not filename.endswith('.npz'):
+        filename += '.npz'
+    if os.path.exists(filename):
+        load_definition_cache(filename)
+    try:
+        yield
+    finally:
+        save_definition_cache(filename)
+
+def _node_tags(idx,shape,scheme):
+    # tag de los nodos a partir de sus índices en la grilla. 'encoded' es la numeración de creategrid y
+    # creategrid3D; 'sequential' numera en el orden de creación, después de los nodos maestros de los diafragmas
+    if scheme == 'encoded':
+        if len(shape) == 2:
+            return 1000*(idx[0]+1)+idx[1]
+        return 10000*(idx[0]+1)+100*idx[1]+idx[2]
+    if scheme == 'sequential':
+        start = 1 if len(shape) == 2 else shape[2]
+        return np.ravel_multi_index(tuple(idx),shape)+start
+    raise ValueError(f"scheme must be 'encoded' or 'sequential', got '{scheme}'")
+
+def grid_nodes(xloc,yloc,zloc=None,scheme='encoded'):
+    '''
+    Computes the tags and coordinates of the nodes of a rectangular grid with the numbering of
+    creategrid (2D, tag = 1000*(i+1)+j) or creategrid3D (3D, tag = 10000*(i+1)+100*j+z),
+    without creating them in OpenSees
+
+    Parameters
+    ----------
+    xloc : list
+        List with the x coordinates.
+    yloc : list
+        List with the y coordinates.
+    zloc : list, optional
+        List with the z coordinates. The default is None for a 2D grid.
+    scheme : string, optional
+        'encoded' for the numbering above or 'sequential' to number the nodes consecutively in the
+        order they are created (starting after the diaphragm master nodes in 3D), which has no
+        limit on the number of axes or floors. The default is 'encoded'.
+
+    Returns
+    -------
+    nodes : dict
+        dictionary of numpy arrays: 'tag', 'coords' (one row per node) and the grid indexes
+        'ix', 'iy' (and 'iz' in 3D) of each node, in the order the nodes are created.
+
+    '''
+    locs = [np.asarray(c) for c in ((xloc,yloc) if zloc is None else (xloc,yloc,zloc))]
+    shape = tuple(len(c) for c in locs)
+    idx = [a.ravel() for a in np.meshgrid(*[np.arange(n) for n in shape],indexing='ij')]
+    nodes = {'tag':_node_tags(idx,shape,scheme),'coords':np.column_stack([c[k] for c,k in zip(locs,idx)])}
+    nodes.update(zip(('ix','iy','iz'),idx))
+    return nodes
+
+def frame_connectivity(nx,ny,nz=None,scheme='encoded',start=1):
+    '''
+    Computes the tags and end nodes of the columns and beams of a frame with the numbering of
+    create_elements (2D) or create_elements3D2 (3D), without creating them in OpenSees
+
+    Parameters
+    ----------
+    nx : int
+        number of coordinates in X.
+    ny : int
+        number of coordinates in Y (floors in 2D).
+    nz : int, optional
+        number of coordinates in Z for a 3D frame. The default is None.
+    scheme : string, optional
+        'encoded' for the numbering of create_elements and create_elements3D2, or 'sequential' to
+        number the elements consecutively (columns, then beams) with the nodes of grid_nodes
+        with the same scheme. The default is 'encoded'.
+    start : int, optional
+        first element tag of the 'sequential' scheme. The default is 1.
+
+    Returns
+    -------
+    elements : dict
+        'columns' and 'beams' in 2D, or 'columns', 'beamsX' and 'beamsY' in 3D. Each one is a
+        dictionary of numpy arrays: 'tag', 'nodes' (node I and J of each element) and the grid
+        indexes 'ix', 'iy' (and 'iz') of node I, in the order the elements are created.
+
+    '''
+    shape = (nx,ny) if nz is None else (nx,ny,nz)
+    def group(tag,idx,step):
+        # step es el desplazamiento en la grilla entre el nodo I y el nodo J
+        idxJ = [a+d for a,d in zip(idx,step)]
+        d = {'tag':tag,'nodes':np.column_stack((_node_tags(idx,shape,scheme),_node_tags(idxJ,shape,scheme)))}
+        d.update(zip(('ix','iy','iz'),idx))
+        return d
+    if nz is None:
+        # columnas por piso y luego por eje, vigas por piso y luego por vano
+        iy, ix = [a.ravel() for a in np.meshgrid(np.arange(ny-1),np.arange(nx),indexing='ij')]
+        cols = group(100*(ix+1)+iy,(ix,iy),(0,1))
+        iy, ix = [a.ravel() for a in np.meshgrid(np.arange(1,ny),np.arange(nx-1),indexing='ij')]
+        beams = group(10000*(ix+1)+iy,(ix,iy),(1,0))
+        elems = {'columns':cols,'beams':beams}
+    else:
+        ix, iy, iz = [a.ravel() for a in np.meshgrid(np.arange(nx),np.arange(ny),np.arange(nz-1),indexing='ij')]
+        cols = group(10000*(iz+1)+100*ix+iy,(ix,iy,iz),(0,0,1))
+        iz, ix, iy = [a.ravel() for a in np.meshgrid(np.arange(1,nz),np.arange(nx-1),np.arange(ny),indexing='ij')]
+        beamsX = group(-(1000000*iz+10000*(iy+1)+100*ix),(ix,iy,iz),(1,0,0))
+        iz, ix, iy = [a.ravel() for a in np.meshgrid(np.arange(1,nz),np.arange(nx),np.arange(ny-1),indexing='ij')]
+        beamsY = group(10000000*iz+10000*(ix+1)+100*iy,(ix,iy,iz),(0,1,0))
+        elems = {'columns':cols,'beamsX':beamsX,'beamsY':beamsY}
+    if scheme == 'sequential':
+        for g in elems.values():
+            g['tag'] = np.arange(start,start+len(g['tag']))
+            start += len(g['tag'])
+    return elems
+
+def slab_connectivity(nx,ny,nz,starttag=0,scheme='encoded',start=1):
+    '''
+    Computes the tags and the four nodes of the slabs of a 3D grid with the numbering of
+    create_slabs, without creating them in OpenSees. Returns a dictionary of numpy arrays
+    with 'tag', 'nodes' and the grid indexes 'ix', 'iy', 'iz' of the first node.
+    With scheme = 'sequential' the slabs are numbered consecutively from start and the nodes
+    follow the 'sequential' scheme of grid_nodes.
+    '''
+    shape = (nx,ny,nz)
+    iz, ix, iy = [a.ravel() for a in np.meshgrid(np.arange(1,nz),np.arange(nx-1),np.arange(ny-1),indexing='ij')]
+    if scheme == 'sequential':
+        tag = np.arange(start,start+len(iz))
+    else:
+        k = np.tile(np.arange((nx-1)*(ny-1)),nz-1) # consecutivo dentro de cada piso
+        tag = -(1045*iz+starttag)+k
+    nodes = np.column_stack([_node_tags((ix+a,iy+b,iz),shape,scheme) for a,b in ((0,0),(1,0),(1,1),(0,1))])
+    return {'tag':tag,'nodes':nodes,'ix':ix,'iy':iy,'iz':iz}
+
+def model_registry(coordx,coordy,coordz=None,scheme='encoded',slabs=False):
+    '''
+    Creates a registry with the tags of the nodes and elements of a grid model and their floor and
+    axis indexes, to find them by floor, axis or type without decoding the tags. The registry can
+    also be passed to the model builders (creategrid, creategrid3D, create_elements,
+    create_elements3D2, create_slabs) so that they use its numbering.
+
+    Parameters
+    ----------
+    coordx : list
+        coordinates in X direction.
+    coordy : list
+        coordinates in Y direction (floors in 2D).
+    coordz : list, optional
+        coordinates in Z direction for 3D models. The default is None.
+    scheme : string, optional
+        'encoded' for the numbering of the builders, or 'sequential' for consecutive tags without
+        limits on the number of axes or floors. The default is 'encoded'.
+    slabs : bool, optional
+        include the slabs of create_slabs (3D only). The default is False.
+
+    Returns
+    -------
+    registry : dict
+        'nodes', 'columns', 'beams' (2D) or 'beamsX' and 'beamsY' (3D) and optionally 'slabs', each one
+        a dictionary of numpy arrays with 'tag', the grid indexes 'ix', 'iy', 'iz' and 'floor'
+        (the floor of the node or element; the top floor for columns). Use registry_tags and
+        registry_position to query it.
+
+    '''
+    nx, ny = len(coordx), len(coordy)
+    nz = None if coordz is None else len(coordz)
+    reg = {'ndm':2 if nz is None else 3,'scheme':scheme,'shape':(nx,ny) if nz is None else (nx,ny,nz),
+           'nodes':grid_nodes(coordx,coordy,coordz,scheme)}
+    elems = frame_connectivity(nx,ny,nz,scheme)
+    reg.update(elems)
+    if slabs:
+        if nz is None:
+            raise ValueError('slabs are only available in 3D models')
+        last = max(g['tag'].max() for g in elems.values())
+        reg['slabs'] = slab_connectivity(nx,ny,nz,scheme=scheme,start=last+1)
+    fl = 'iy' if nz is None else 'iz'
+    groups = [k for k in ('nodes','columns','beams','beamsX','beamsY','slabs') if k in reg]
+    reg['groups'] = groups
+    reg['lookup'] = {}
+    reg['position'] = {}
+    for k in groups:
+        g = reg[k]
+        g['floor'] = g[fl]+1 if k == 'columns' else g[fl]
+        # índices de cada piso, eje y vano calculados una sola vez
+        reg['lookup'][k] = {key:_group_rows(g[key]) for key in ('floor','ix','iy','iz') if key in g}
+        reg['position'][k] = dict(zip(g['tag'].tolist(),range(len(g['tag']))))
+    return reg
+
+def _registry_for(registry,shape):
+    # verifica que el registro corresponda a la grilla que se está creando
+    if registry['shape'] != tuple(shape):
+        raise ValueError(f"the registry was created for a grid of {registry['shape']} coordinates, not {tuple(shape)}")
+    return registry
+
+def _group_rows(values):
+    # diccionario valor -> filas donde aparece, en orden
+    order = np.argsort(values,kind='stable')
+    keys, first = np.unique(values[order],return_index=True)
+    return dict(zip(keys.tolist(),np.split(order,first[1:])))
+
+def registry_tags(registry,group,floor=None,ix=None,iy=None,iz=None):
+    '''
+    Returns the tags of a group of the registry ('nodes', 'columns', 'beams', 'beamsX', 'beamsY' or 'slabs'),
+    optionally only the ones on a floor and/or an axis (grid indexes ix, iy, iz starting at 0)
+
+    Example: registry_tags(reg,'nodes',floor=3,ix=0) returns the leftmost node of the third floor of a 2D frame.
+    '''
+    if group not in registry['groups']:
+        raise ValueError(f"group must be one of {registry['groups']}, got '{group}'")
+    g = registry[group]
+    rows = None
+    for key,value in (('floor',floor),('ix',ix),('iy',iy),('iz',iz)):
+        if value is None:
+            continue
+        r = registry['lookup'][group][key].get(value,np.array([],dtype=int))
+        rows = r if rows is None else np.intersect1d(rows,r)
+    return g['tag'] if rows is None else g['tag'][np.sort(rows)]
+
+def registry_position(registry,tag):
+    '''
+    Returns the group and the grid indexes of a node or element tag as a dictionary,
+    e.g. {'group': 'columns', 'floor': 2, 'ix': 0, 'iy': 1}
+    '''
+    for group in registry['groups']:
+        row = registry['position'][group].get(tag)
+        if row is not None:
+            g = registry[group]
+            out = {'group':group}
+            out.update({key:int(g[key][row]) for key in ('floor','ix','iy','iz') if key in g})
+            return out
+    raise ValueError(f'tag {tag} is not in the registry')
+
+def check_model(node_tags,*element_groups):
+    '''
+    Validates a model description before creating it in OpenSees: node and element tags must be
+    unique and fit in a 32-bit integer, and the elements must connect existing, distinct nodes.
+    Raises ValueError otherwise (e.g. when a grid is too large for the tag numbering scheme).
+
+    Parameters
+    ----------
+    node_tags : numpy array
+        tags of the nodes (e.g. grid_nodes(...)['tag']).
+    *element_groups : dict
+        element groups as returned by frame_connectivity or slab_connectivity.
+
+    Returns
+    -------
+    None.
+
+    '''
+    node_tags = np.asarray(node_tags)
+    if len(np.unique(node_tags)) != len(node_tags):
+        raise ValueError('repeated node tags: the grid is too large for the node numbering scheme')
+    if len(element_groups) == 0:
+        return
+    tags = np.concatenate([g['tag'] for g in element_groups])
+    if len(np.unique(tags)) != len(tags):
+        raise ValueError('repeated element tags: the grid is too large for the element numbering scheme')
+    if np.abs(np.concatenate((tags,node_tags))).max() >= 2**31:
+        raise ValueError('tags larger than the maximum integer of OpenSees')
+    for g in element_groups:
+        if not np.isin(g['nodes'],node_tags).all():
+            raise ValueError('elements connected to nodes that are not in the grid')
+        if np.any(g['nodes'][:,:1] == g['nodes'][:,1:]):
+            raise ValueError('elements connecting a node with itself')
+
+def creategrid(xloc,yloc,registry=None):
     '''
     Function that creates a rectangular 2D grid based on specified x and y coordinates
 
@@ -648,6 +1266,8 @@ def creategrid(xloc,yloc):
         List with the x coordinates.
     yloc : list
         List with the y coordinates.
+    registry : dict, optional
+        registry from model_registry with the same coordinates. If given its numbering is used. The default is None.
 
     Returns
     -------
@@ -656,15 +1276,13 @@ def creategrid(xloc,yloc):
     '''
     
     
-    ny = len(yloc)
-    nx = len(xloc)
+    nodes = grid_nodes(xloc,yloc) if registry is None else _registry_for(registry,(len(xloc),len(yloc)))['nodes']
+    check_model(nodes['tag'])
     # ----------------------Crear nodos de la estructura----------------------|
-    for i in range(nx):
-        for j in range(ny):
-            nnode = 1000*(i+1)+j
-            node(nnode,xloc[i],yloc[j])
+    for nnode, xyz in zip(nodes['tag'].tolist(),nodes['coords'].tolist()):
+        node(nnode,*xyz)
 
-def creategrid3D(xloc,yloc,zloc,dia=1,floor_mass=[1.0]):
+def creategrid3D(xloc,yloc,zloc,dia=1,floor_mass=[1.0],registry=None):
     '''
     Creates a three-dimensional grid of points.
     
@@ -682,6 +1300,8 @@ def creategrid3D(xloc,yloc,zloc,dia=1,floor_mass=[1.0]):
         List with the masses per floor starting from the first floor to the roof. It must have one less than zloc.
     floor_inertia : list, optional
         List with the inertia per floor starting from the first floor to the roof. It must have one less than zloc.
+    registry : dict, optional
+        registry from model_registry with the same coordinates. If given its numbering is used. The default is None.
 
     Returns
     -------
@@ -689,25 +1309,20 @@ def creategrid3D(xloc,yloc,zloc,dia=1,floor_mass=[1.0]):
         Dataframe with the information of the created points.
 
     '''
-    ny = len(yloc)
-    nx = len(xloc)
-    nz = len(zloc)
-    coord = []
+    import pandas as pd
+    nodes = grid_nodes(xloc,yloc,zloc) if registry is None else _registry_for(registry,(len(xloc),len(yloc),len(zloc)))['nodes']
+    check_model(nodes['tag'])
     
     # ----------------------Crear nodos de la estructura----------------------|
-    for i in range(nx):
-        for j in range(ny):
-            for z in range(nz):
-                nnode = 10000*(i+1)+100*(j)+z
-                node(nnode,xloc[i],yloc[j],zloc[z])
-                coord.append([nnode,xloc[i],yloc[j],zloc[z],z])
+    for nnode, xyz in zip(nodes['tag'].tolist(),nodes['coords'].tolist()):
+        node(nnode,*xyz)
 
-    df = pd.DataFrame(coord, columns=['nlabel','x','y','z','floor'])
+    xyz = [np.asarray(c)[nodes[k]] for c,k in zip((xloc,yloc,zloc),('ix','iy','iz'))]
+    df = pd.DataFrame({'nlabel':nodes['tag'],'x':xyz[0],'y':xyz[1],'z':xyz[2],'floor':nodes['iz']})
     if dia == 1:
         for z in range(1,len(zloc)):
             node(z,np.max(xloc)/2,np.max(yloc)/2,zloc[z])
-            nfloor = df[df['floor']==z]
-            nodes_floor = nfloor.nlabel.to_list()            
+            nodes_floor = nodes['tag'][nodes['iz'] == z].tolist()
             fix(z,0,0,1,1,1,0)
             mass(z,floor_mass[z-1],floor_mass[z-1],floor_mass[z-1],0.0,0.0,floor_mass[z-1]*((np.max(xloc)**2 + np.max(yloc)**2)/12))
             rigidDiaphragm(3,z,*nodes_floor)
@@ -746,6 +1361,13 @@ def BuildISection(secID,matID,d,tw,bf,tf,nfdw,nftw,nfbf,nftf):
     .
 
     '''
+    params = (secID,matID,d,tw,bf,tf,nfdw,nftw,nfbf,nftf)
+    _emit(_cached_definition('I_section',_I_section_commands,params,_I_SECTION_TAGS))
+
+_I_SECTION_TAGS = (0,1)
+
+def _I_section_commands(secID,matID,d,tw,bf,tf,nfdw,nftw,nfbf,nftf):
+    # comandos section y patch de BuildISection
     dw = d-2*tf
     y1 = -d/2
     y2 = -dw/2 
@@ -757,10 +1379,551 @@ def BuildISection(secID,matID,d,tw,bf,tf,nfdw,nftw,nfbf,nftf):
     z3 = tw/2 
     z4 = bf/2 
     GJ = 1e6
-    section('Fiber',secID,'-GJ',GJ)
-    patch('quad',matID,nfbf,nftf,y1,z4,y1,z1,y2,z1,y2,z4)
-    patch('quad',matID,nftw,nfdw,y2,z3,y2,z2,y3,z2,y3,z3)
-    patch('quad',matID,nfbf,nftf,y3,z4,y3,z1,y4,z1,y4,z4)
+    cmds = [('section',('Fiber',secID,'-GJ',GJ))]
+    cmds.append(('patch',('quad',matID,nfbf,nftf,y1,z4,y1,z1,y2,z1,y2,z4)))
+    cmds.append(('patch',('quad',matID,nftw,nfdw,y2,z3,y2,z2,y3,z2,y3,z3)))
+    cmds.append(('patch',('quad',matID,nfbf,nftf,y3,z4,y3,z1,y4,z1,y4,z4)))
+    return cmds
+
+# Discretización de secciones en fibras con numpy
+# =============================
+
+def _quad_fibers(mat,nIJ,nJK,vertices):
+    # celdas de un patch quad en coordenadas naturales (igual que QuadPatch de OpenSees), centroide y área exactos de cada cuadrilátero
+    v = np.asarray(vertices,dtype=float).reshape(4,2)
+    xi = -1.0 + (2.0/nIJ)*np.arange(nIJ+1)
+    eta = -1.0 + (2.0/nJK)*np.arange(nJK+1)
+    XI, ETA = np.meshgrid(xi,eta)
+    N = np.stack(((1-XI)*(1-ETA),(1+XI)*(1-ETA),(1+XI)*(1+ETA),(1-XI)*(1+ETA)))/4
+    P = np.tensordot(N,v,axes=(0,0)) # (nJK+1, nIJ+1, 2)
+    pts = np.stack((P[:-1,:-1],P[:-1,1:],P[1:,1:],P[1:,:-1]))
+    x, y = pts[...,0], pts[...,1]
+    x1, y1 = np.roll(x,-1,axis=0), np.roll(y,-1,axis=0)
+    cross = x*y1 - x1*y
+    A = cross.sum(0)/2
+    yc = ((x+x1)*cross).sum(0)/(6*A)
+    zc = ((y+y1)*cross).sum(0)/(6*A)
+    return yc.ravel(), zc.ravel(), np.abs(A).ravel(), np.full(A.size,mat)
+
+def _circ_fibers(mat,nCirc,nRad,yC,zC,intRad,extRad,startAng=0.0,endAng=360.0):
+    # sectores de corona circular con el centroide exacto (CircSectionCell de OpenSees)
+    dr = (extRad-intRad)/nRad
+    dth = np.radians(endAng-startAng)/nCirc
+    r1 = intRad + dr*np.arange(nRad)[:,None]
+    r2 = r1 + dr
+    th = np.radians(startAng) + dth*(np.arange(nCirc)[None,:]+0.5)
+    A = dth/2*(r2**2-r1**2)
+    rc = 2/3*np.sin(dth/2)/(dth/2)*(r2**3-r1**3)/(r2**2-r1**2)
+    A, rc, th = np.broadcast_arrays(A,rc,th)
+    return (yC+rc*np.cos(th)).ravel(), (zC+rc*np.sin(th)).ravel(), A.ravel().copy(), np.full(A.size,mat)
+
+def _layer_fibers(kind,mat,n,area,*args):
+    # barras de los comandos layer straight y circ
+    if kind == 'straight':
+        yS, zS, yE, zE = args
+        t = np.array([0.5]) if n == 1 else np.arange(n)/(n-1)
+        y, z = yS+(yE-yS)*t, zS+(zE-zS)*t
+    elif kind == 'circ':
+        yC, zC, r = args[:3]
+        a0, a1 = args[3:5] if len(args) > 3 else (0.0, 360.0-360.0/n)
+        th = np.radians(a0 + (np.arange(n)*(a1-a0)/(n-1) if n > 1 else np.zeros(1)))
+        y, z = yC+r*np.cos(th), zC+r*np.sin(th)
+    else:
+        raise ValueError(f"layer type must be 'straight' or 'circ', got '{kind}'")
+    return y, z, np.full(n,float(area)), np.full(n,mat)
+
+def fiber_mesh(commands):
+    '''
+    Discretizes a fiber section with numpy from its patch, layer and fiber commands, with the same
+    fiber positions and areas that OpenSees creates
+
+    Parameters
+    ----------
+    commands : list
+        list of (command, arguments) tuples, e.g. [('patch',('quad',1,10,10,...)), ('layer',('straight',3,4,5e-4,...))].
+        Supports patch quad, rect and circ, layer straight and circ, and fiber. Other commands (e.g. section) are ignored,
+        so a snapshot of capture_model can be used.
+
+    Returns
+    -------
+    fibers : dict
+        dictionary of numpy arrays with one value per fiber: 'y' and 'z' (coordinates), 'A' (area) and 'mat' (material tag).
+
+    '''
+    parts = []
+    for name,args in commands:
+        if name == 'patch':
+            kind, mat, n1, n2 = args[:4]
+            coords = [float(a) for a in args[4:]]
+            if kind == 'quad':
+                parts.append(_quad_fibers(mat,int(n1),int(n2),coords))
+            elif kind == 'rect':
+                yI, zI, yJ, zJ = coords
+                parts.append(_quad_fibers(mat,int(n1),int(n2),[yI,zI,yJ,zI,yJ,zJ,yI,zJ]))
+            elif kind == 'circ':
+                parts.append(_circ_fibers(mat,int(n1),int(n2),*coords))
+            else:
+                raise ValueError(f"patch type must be 'quad', 'rect' or 'circ', got '{kind}'")
+        elif name == 'layer':
+            kind, mat, n, area = args[:4]
+            parts.append(_layer_fibers(kind,mat,int(n),area,*[float(a) for a in args[4:]]))
+        elif name == 'fiber':
+            y, z, A, mat = args
+            parts.append((np.array([y],dtype=float),np.array([z],dtype=float),np.array([A],dtype=float),np.array([mat])))
+    if not parts:
+        return {'y':np.zeros(0),'z':np.zeros(0),'A':np.zeros(0),'mat':np.zeros(0,dtype=int)}
+    y, z, A, mat = (np.concatenate(c) for c in zip(*parts))
+    return {'y':y,'z':z,'A':A,'mat':mat.astype(int)}
+
+def rect_RC_fibers(HSec,BSec,cover,coreID,coverID,steelID,numBarsTop,barAreaTop,numBarsBot,barAreaBot,numBarsIntTot=2,barAreaInt=1e-10,nfCoreY=10,nfCoreZ=10,nfCoverY=8,nfCoverZ=8):
+    '''
+    Fibers of the rectangular RC section of create_rect_RC_section (BuildRCSection), computed without OpenSees.
+    The arguments are the same as create_rect_RC_section without the section tag. See fiber_mesh for the output.
+    '''
+    params = (0,HSec,BSec,cover,cover,coreID,coverID,steelID,numBarsTop,barAreaTop,numBarsBot,barAreaBot,numBarsIntTot,barAreaInt,nfCoreY,nfCoreZ,nfCoverY,nfCoverZ,1e6)
+    return fiber_mesh(_cached_definition('rect_RC_section',_rect_RC_section_commands,params,_RECT_RC_TAGS))
+
+def circ_RC_fibers(radius,cover,nbars,abar,coreID,coverID,steelID):
+    '''
+    Fibers of the circular RC section of create_circ_RC_section (BuildRCCircSection), computed without OpenSees.
+    The arguments are the same as create_circ_RC_section without the section tag. See fiber_mesh for the output.
+    '''
+    params = (0,radius,cover,nbars,abar,coreID,coverID,steelID,1e6)
+    return fiber_mesh(_cached_definition('circ_RC_section',_circ_RC_section_commands,params,_CIRC_RC_TAGS))
+
+def I_section_fibers(matID,d,tw,bf,tf,nfdw,nftw,nfbf,nftf):
+    '''
+    Fibers of the I section of BuildISection, computed without OpenSees.
+    The arguments are the same as BuildISection without the section tag. See fiber_mesh for the output.
+    '''
+    params = (0,matID,d,tw,bf,tf,nfdw,nftw,nfbf,nftf)
+    return fiber_mesh(_cached_definition('I_section',_I_section_commands,params,_I_SECTION_TAGS))
+
+def create_fiber_section(secTag,fibers,GJ=1e6):
+    '''
+    Creates in OpenSees a fiber section with one fiber command per fiber
+
+    Parameters
+    ----------
+    secTag : int
+        tag of the section.
+    fibers : dict
+        fibers from fiber_mesh, rect_RC_fibers, circ_RC_fibers or I_section_fibers.
+    GJ : float, optional
+        torsional stiffness. The default is 1e6.
+
+    Returns
+    -------
+    None.
+
+    '''
+    section('Fiber',secTag,'-GJ',GJ)
+    for y,z,A,mat in zip(fibers['y'].tolist(),fibers['z'].tolist(),fibers['A'].tolist(),fibers['mat'].tolist()):
+        fiber(y,z,A,mat)
+
+def section_properties(fibers,E=None):
+    '''
+    Computes the properties of a fiber section from its fiber arrays
+
+    Parameters
+    ----------
+    fibers : dict
+        fibers from fiber_mesh, rect_RC_fibers, circ_RC_fibers or I_section_fibers.
+    E : float or dict, optional
+        modulus of elasticity, one value for all the fibers or a dictionary {material tag: E}. If given, the centroid
+        and the inertias are computed with the transformed section and the rigidities are also returned. The default is None.
+
+    Returns
+    -------
+    props : dict
+        'A' (area), 'area_mat' (area of each material), 'yc' and 'zc' (centroid), 'Iz', 'Iy' and 'Iyz' (inertias about the
+        centroid, Iz is about the z axis). With E also 'EA', 'EIz', 'EIy' and 'EIyz' and the inertias are of the transformed
+        section (EI/E of the first material).
+
+    '''
+    y, z, A, mat = fibers['y'], fibers['z'], fibers['A'], fibers['mat']
+    mats, inv = np.unique(mat,return_inverse=True)
+    props = {'A':A.sum(), 'area_mat':dict(zip(mats.tolist(),np.bincount(inv,weights=A).tolist()))}
+    if E is None:
+        w = A
+    else:
+        if isinstance(E,dict):
+            missing = set(mats.tolist()) - set(E)
+            if missing:
+                raise ValueError(f'E is missing for materials {sorted(missing)}')
+            Emat = np.array([E[m] for m in mats.tolist()],dtype=float)
+        else:
+            Emat = np.full(len(mats),float(E))
+        w = A*Emat[inv]
+    W = w.sum()
+    yc, zc = (w*y).sum()/W, (w*z).sum()/W
+    dy, dz = y-yc, z-zc
+    props.update(yc=yc, zc=zc)
+    EI = {'Iz':(w*dy**2).sum(), 'Iy':(w*dz**2).sum(), 'Iyz':(w*dy*dz).sum()}
+    if E is None:
+        props.update(EI)
+    else:
+        props['EA'] = W
+        props.update({'E'+k:v for k,v in EI.items()})
+        props.update({k:v/Emat[0] for k,v in EI.items()})
+    return props
+
+def uniaxial_law(args):
+    '''
+    Monotonic stress-strain law (envelope) of an OpenSees uniaxialMaterial, to evaluate it with numpy (see material_stress)
+
+    Parameters
+    ----------
+    args : tuple
+        arguments of the uniaxialMaterial command, e.g. ('Concrete01', 101, fcc, ecc, fccu, eccu) with the values from mander.
+        Supports Elastic, Concrete01, Concrete02, Steel01, Hysteretic and HystereticSM.
+
+    Returns
+    -------
+    law : dict
+        'type' ('elastic', 'concrete', 'bilinear' or 'multilinear') and the parameters of the law.
+
+    '''
+    mattype, vals = args[0], list(args[2:])
+    if mattype == 'Elastic':
+        E = float(vals[0])
+        return {'type':'elastic', 'E':E, 'Eneg':float(vals[2]) if len(vals) > 2 else E}
+    if mattype in ('Concrete01','Concrete02'):
+        # la compresión es negativa aunque el material se defina con valores positivos (como Concrete01)
+        fc, ec, fcu, ecu = (-abs(float(v)) for v in vals[:4])
+        ft, Ets = (float(vals[5]), float(vals[6])) if mattype == 'Concrete02' else (0.0, 0.0)
+        return {'type':'concrete', 'fc':fc, 'ec':ec, 'fcu':fcu, 'ecu':ecu, 'ft':ft, 'Ets':Ets}
+    if mattype == 'Steel01':
+        return {'type':'bilinear', 'fy':float(vals[0]), 'E':float(vals[1]), 'b':float(vals[2])}
+    if mattype == 'Hysteretic':
+        npts = 3 if len(vals) >= 16 else 2
+        pos = np.array(vals[:2*npts],dtype=float).reshape(-1,2)
+        neg = np.array(vals[2*npts:4*npts],dtype=float).reshape(-1,2)
+    elif mattype == 'HystereticSM':
+        flags = [i for i,v in enumerate(vals) if isinstance(v,str)] + [len(vals)]
+        env = {vals[i]:np.array(vals[i+1:j],dtype=float).reshape(-1,2) for i,j in zip(flags[:-1],flags[1:]) if vals[i] in ('-posEnv','-negEnv')}
+        pos = env['-posEnv']
+        neg = env.get('-negEnv',-pos)
+    else:
+        raise ValueError(f'uniaxialMaterial {mattype} is not supported')
+    # envolvente multilineal (esfuerzo, deformación); como en OpenSees, después del último punto sigue la
+    # última rama si su pendiente es positiva (endurecimiento) y el esfuerzo es constante si no
+    points = np.vstack((neg[::-1],[[0.0,0.0]],pos))
+    slopes = np.diff(points[:,0])/np.diff(points[:,1])
+    return {'type':'multilinear', 'strain':points[:,1], 'stress':points[:,0],
+            'end_slopes':(max(slopes[0],0.0),max(slopes[-1],0.0))}
+
+def material_laws(commands):
+    '''
+    Monotonic laws of the uniaxialMaterial commands in a list of (command, arguments) tuples (e.g. a snapshot of capture_model)
+
+    Returns
+    -------
+    laws : dict
+        {material tag: law} (see uniaxial_law).
+
+    '''
+    return {int(args[1]):uniaxial_law(args) for name,args in commands if name == 'uniaxialMaterial'}
+
+def col_material_laws(fcn=28,fy=420,detailing='DES',tension = 'tension',steeltag = int(100), unctag = int(102), conftag = int(101), nps = 4):
+    '''
+    Monotonic laws of the materials of col_materials, computed without OpenSees. The arguments are the same as col_materials.
+
+    Returns
+    -------
+    laws : dict
+        {material tag: law} (see uniaxial_law).
+
+    '''
+    params = (fcn,fy,detailing,tension,steeltag,unctag,conftag,nps)
+    return material_laws(_cached_definition('col_materials',_col_materials_commands,params,_COL_MATERIALS_TAGS))
+
+def mander_law(fcc,ecc,ecu,Ec):
+    '''
+    Monotonic law of confined concrete of Mander et al. (Popovics curve), e.g. with the results of mander:
+
+        ecc, fcc, ecu, fccu = ut.mander(...)
+        law = ut.mander_law(fcc,ecc,ecu,Ec)
+
+    Parameters
+    ----------
+    fcc : float
+        confined concrete strength (positive).
+    ecc : float
+        strain at fcc (positive).
+    ecu : float
+        ultimate strain (positive). The stress is zero after it (crushing).
+    Ec : float
+        modulus of elasticity of the concrete, in the units of fcc.
+
+    Returns
+    -------
+    law : dict
+        law to use with material_stress, interaction_diagram and moment_curvature. It has no tension.
+
+    '''
+    fcc, ecc, ecu = -abs(fcc), -abs(ecc), -abs(ecu)
+    r = Ec/(Ec-fcc/ecc)
+    if r <= 1:
+        raise ValueError('Ec must be larger than the secant modulus fcc/ecc')
+    return {'type':'mander', 'fcc':fcc, 'ecc':ecc, 'ecu':ecu, 'r':r}
+
+def material_stress(law,eps,tangent=False):
+    '''
+    Evaluates a monotonic material law for an array of strains
+
+    Parameters
+    ----------
+    law : dict
+        law from uniaxial_law, material_laws, col_material_laws or mander_law.
+    eps : array
+        strains (compression is negative).
+    tangent : bool, optional
+        also returns the tangent modulus. The default is False.
+
+    Returns
+    -------
+    sig : array
+        stresses.
+    Et : array
+        tangent modulus (only with tangent=True).
+
+    '''
+    eps = np.asarray(eps,dtype=float)
+    kind = law['type']
+    E = None
+    if kind == 'elastic':
+        E = np.where(eps < 0,law['Eneg'],law['E'])
+        sig = E*eps
+    elif kind == 'bilinear':
+        fy, E0, b = law['fy'], law['E'], law['b']
+        ey = fy/E0
+        # rama elástica hasta ey y endurecimiento b*E0 después
+        sig = E0*np.clip(eps,-ey,ey) + b*E0*(eps-np.clip(eps,-ey,ey))
+        if tangent:
+            E = np.where(np.abs(eps) <= ey,E0,b*E0)
+    elif kind == 'multilinear':
+        e, f = law['strain'], law['stress']
+        Eneg, Epos = law.get('end_slopes',(0.0,0.0))
+        sig = np.interp(eps,e,f) + Eneg*np.minimum(eps-e[0],0.0) + Epos*np.maximum(eps-e[-1],0.0)
+        if tangent:
+            slopes = np.concatenate(([Eneg],np.diff(f)/np.diff(e),[Epos]))
+            E = slopes[np.searchsorted(e,eps)]
+    elif kind == 'mander':
+        fcc, ecc, ecu, r = (law[k] for k in ('fcc','ecc','ecu','r'))
+        x = np.clip(eps,ecu,0.0)/ecc
+        xr = x**r
+        active = (eps < 0) & (eps >= ecu)
+        sig = np.where(active,fcc*x*r/(r-1+xr),0.0)
+        if tangent:
+            E = np.where(active,fcc/ecc*r*(r-1)*(1-xr)/(r-1+xr)**2,0.0)
+    elif kind == 'concrete':
+        fc, ec, fcu, ecu, ft, Ets = (law[k] for k in ('fc','ec','fcu','ecu','ft','Ets'))
+        Ec = 2*fc/ec
+        et = ft/Ec
+        soft = (fcu-fc)/(ecu-ec)
+        # parábola hasta ec, rama lineal hasta ecu y esfuerzo residual fcu; en tensión rama lineal hasta ft y ablandamiento
+        x = np.clip(eps,ec,0.0)/ec
+        sig = fc*x*(2-x) + soft*(np.clip(eps,ecu,ec)-ec) + np.maximum(Ec*np.clip(eps,0.0,et) - Ets*np.maximum(eps-et,0.0),0.0)
+        if tangent:
+            conds = [eps > et, eps >= 0, eps >= ec, eps > ecu]
+            E = np.select(conds,[np.where(ft-Ets*(eps-et) > 0,-Ets,0.0), Ec, Ec*(1-x), soft],0.0)
+    else:
+        raise ValueError(f"unknown law type '{kind}'")
+    if tangent:
+        return sig, np.broadcast_to(E,eps.shape)
+    return sig
+
+def _fiber_stresses(mat,laws,eps):
+    # esfuerzos de todas las fibras (última dimensión de eps) con las fibras ordenadas por material,
+    # así cada material es un bloque contiguo y se evalúa sin copiar
+    sig = np.empty_like(eps)
+    mats, start = np.unique(mat,return_index=True)
+    bounds = np.append(start,len(mat)).tolist()
+    for m,i,j in zip(mats.tolist(),bounds[:-1],bounds[1:]):
+        if m not in laws:
+            raise ValueError(f'there is no law for material {m}')
+        sig[...,i:j] = material_stress(laws[m],eps[...,i:j])
+    return sig
+
+def interaction_diagram(fibers,laws,eps_cu=-0.003,eps_su=0.01,npts=50,angles=None,ref=None):
+    '''
+    Axial load - moment interaction diagram (or biaxial P-My-Mz surface) of a fiber section by strain compatibility.
+    All the strain profiles and neutral-axis directions are evaluated at once with numpy, without OpenSees. E.g.:
+
+        fibers = ut.rect_RC_fibers(0.5,0.5,0.05,conf,noconf,acero,4,As,4,As,4,As)
+        laws = ut.col_material_laws(28,420)
+        di = ut.interaction_diagram(fibers,laws)
+
+    Parameters
+    ----------
+    fibers : dict
+        fibers from fiber_mesh, rect_RC_fibers, circ_RC_fibers or I_section_fibers.
+    laws : dict
+        {material tag: law} from col_material_laws, material_laws or uniaxial_law (e.g. with the mander parameters).
+    eps_cu : float, optional
+        strain of the most compressed fiber at failure. The default is -0.003.
+    eps_su : float, optional
+        largest tensile strain of the most stretched fiber. The default is 0.01.
+    npts : int, optional
+        number of strain profiles of each branch: the most compressed fiber at eps_cu with the opposite fiber going from
+        eps_cu to eps_su, and then the opposite fiber at eps_su with the compressed one going up to eps_su (pure tension).
+        The default is 50.
+    angles : list, optional
+        directions (in degrees, measured from the y axis towards z) of the most compressed side of the section. The default
+        is None, which uses [0, 180]: bending about z with compression on the +y and -y sides.
+    ref : tuple, optional
+        (y, z) point about which the moments are computed. The default is None, which uses the centroid of the fiber areas.
+
+    Returns
+    -------
+    diagram : dict
+        'P', 'Mz' and 'My' (arrays of shape (number of angles, 2*npts-1)), 'angles' and the strains of the most compressed
+        and most stretched fibers 'eps_top' and 'eps_bot' of each profile. P is negative in compression; Mz = -sum(sig*A*y)
+        and My = sum(sig*A*z) as in OpenSees.
+
+    '''
+    order = np.argsort(fibers['mat'],kind='stable')
+    y, z, A, mat = (fibers[k][order] for k in ('y','z','A','mat'))
+    angles = np.atleast_1d(np.asarray([0.0,180.0] if angles is None else angles,dtype=float))
+    if ref is None:
+        ref = ((A*y).sum()/A.sum(),(A*z).sum()/A.sum())
+    # perfiles de deformación: rama con el borde comprimido en eps_cu y rama con el borde opuesto en eps_su
+    ramp = np.linspace(eps_cu,eps_su,npts)
+    eps_top = np.concatenate((np.full(npts,eps_cu),ramp[1:]))
+    eps_bot = np.concatenate((ramp,np.full(npts-1,eps_su)))
+    th = np.radians(angles)
+    proj = np.cos(th)[:,None]*y[None,:] + np.sin(th)[:,None]*z[None,:]
+    top, bottom = proj.max(axis=1,keepdims=True), proj.min(axis=1,keepdims=True)
+    ratio = (top-proj)/(top-bottom) # 0 en la fibra más comprimida y 1 en la opuesta
+    eps = eps_top[None,:,None] + (eps_bot-eps_top)[None,:,None]*ratio[:,None,:]
+    sig = _fiber_stresses(mat,laws,eps)
+    P = sig @ A
+    Mz = -(sig @ (A*(y-ref[0])))
+    My = sig @ (A*(z-ref[1]))
+    return {'P':P, 'Mz':Mz, 'My':My, 'angles':angles, 'eps_top':eps_top, 'eps_bot':eps_bot}
+
+def moment_curvature(fibers,laws,P,max_curvature,nsteps=300,tol=1e-12,maxiter=25):
+    '''
+    Moment-curvature of fiber sections with monotonic material laws, solved with numpy without the OpenSees domain.
+    As in MomentCurvature the section is first loaded axially with zero moment (so asymmetric sections start with
+    some curvature) and then the curvature is increased in nsteps equal increments; for every step the axial strain
+    that balances the axial load is found with Newton iterations vectorized over all the sections and axial loads
+    of the batch. E.g.:
+
+        fibers = ut.rect_RC_fibers(0.5,0.5,0.05,conf,noconf,acero,4,As,4,As,4,As)
+        mc = ut.moment_curvature(fibers,ut.col_material_laws(28,420),[-500,-1000,-2000],0.05)
+
+    Parameters
+    ----------
+    fibers : dict or list
+        fibers of one section (from fiber_mesh, rect_RC_fibers, circ_RC_fibers or I_section_fibers) or a list of sections.
+    laws : dict or list
+        {material tag: law} (from col_material_laws, material_laws, uniaxial_law or mander_law), shared by all the
+        sections, or a list with one dictionary per section.
+    P : float or list
+        axial load or list of axial loads (negative in compression), applied to every section.
+    max_curvature : float or list
+        maximum curvature increment from the axially loaded state, one value or one per section.
+    nsteps : int, optional
+        number of curvature increments, as numIncr in MomentCurvature. The default is 300.
+    tol : float, optional
+        tolerance in the axial strain increment of the Newton iterations. The default is 1e-12.
+    maxiter : int, optional
+        maximum number of Newton iterations per step. The default is 25.
+
+    Returns
+    -------
+    mc : dict
+        'curvature', 'M' (moment, -sum(sig*A*y) about y = 0 as in OpenSees), 'eps0' (axial strain at y = 0) and
+        'converged' (bool). The arrays have shape (number of sections, number of axial loads, nsteps+1); the section
+        axis is omitted for one section and the load axis for one axial load.
+
+    '''
+    single = isinstance(fibers,dict)
+    sections = [fibers] if single else list(fibers)
+    nsec = len(sections)
+    laws_list = [laws]*nsec if isinstance(laws,dict) else list(laws)
+    if len(laws_list) != nsec:
+        raise ValueError('there must be one dictionary of laws per section')
+    Ps = np.atleast_1d(np.asarray(P,dtype=float))
+    nP = len(Ps)
+    kmax = np.broadcast_to(np.asarray(max_curvature,dtype=float),(nsec,))
+    # fibras agrupadas por ley: un bloque denso por ley con las fibras de todas las secciones (rellenas con área cero)
+    unique_laws, ids, members = [], {}, []
+    for k,(f,ls) in enumerate(zip(sections,laws_list)):
+        for m in np.unique(f['mat']).tolist():
+            if m not in ls:
+                raise ValueError(f'there is no law for material {m} in section {k}')
+            if id(ls[m]) not in ids:
+                ids[id(ls[m])] = len(unique_laws)
+                unique_laws.append(ls[m])
+                members.append({})
+            mask = f['mat'] == m
+            mem = members[ids[id(ls[m])]].setdefault(k,([],[]))
+            mem[0].append(f['y'][mask])
+            mem[1].append(f['A'][mask])
+    blocks = []
+    for law,mem in zip(unique_laws,members):
+        mem = {k:(np.concatenate(y),np.concatenate(a)) for k,(y,a) in mem.items()}
+        nk = max(len(a) for y,a in mem.values())
+        Yk, Ak = np.zeros((nsec,nk)), np.zeros((nsec,nk))
+        for k,(y,a) in mem.items():
+            Yk[k,:len(y)], Ak[k,:len(a)] = y, a
+        # un caso por sección y carga axial
+        blocks.append((law,np.repeat(Yk,nP,axis=0),np.repeat(Ak,nP,axis=0)))
+    Pc = np.tile(Ps,nsec)
+    dk = np.repeat(kmax,nP)/nsteps
+    ncase = len(Pc)
+    def resultants(rows,ea,kap):
+        # fuerza axial, momento y rigideces tangentes de los casos indicados
+        out = np.zeros((6,len(ea)))
+        for law,Yk,Ak in blocks:
+            y, a = Yk[rows], Ak[rows]
+            sig, Et = material_stress(law,ea[:,None]-y*kap[:,None],tangent=True)
+            Ea = Et*a
+            out += ((sig*a).sum(1),-(sig*a*y).sum(1),Ea.sum(1),(Ea*y).sum(1),(Ea*y*y).sum(1),np.zeros(len(ea)))
+        return out
+    allrows = slice(None)
+    K0 = resultants(allrows,np.zeros(ncase),np.zeros(ncase))[2]
+    curv = np.zeros((ncase,nsteps+1))
+    M, eps0 = np.zeros_like(curv), np.zeros_like(curv)
+    conv = np.zeros(curv.shape,dtype=bool)
+    # estado inicial con la carga axial y momento nulo (como MomentCurvature, la sección puede rotar)
+    ea, kap = Pc/K0, np.zeros(ncase)
+    for it in range(maxiter):
+        N, Mo, EA, ES, EI, _ = resultants(allrows,ea,kap)
+        det = EA*EI-ES**2
+        dea = ((Pc-N)*EI-Mo*ES)/det
+        dka = ((Pc-N)*ES-Mo*EA)/det
+        ea, kap = ea+dea, kap+dka
+        done = (np.abs(dea) <= tol) & (np.abs(dka) <= tol)
+        if done.all():
+            break
+    curv[:,0], eps0[:,0], conv[:,0] = kap, ea, done
+    kap0, prev = kap, ea.copy()
+    for step in range(1,nsteps+1):
+        kap = kap0 + dk*step
+        # predictor lineal con los dos pasos anteriores
+        ea_step = 2*ea-prev if step > 1 else ea.copy()
+        prev = ea
+        ea = ea_step
+        act = np.arange(ncase)
+        for it in range(maxiter):
+            rows = allrows if len(act) == ncase else act
+            N, Mo, EA = resultants(rows,ea[act],kap[act])[:3]
+            M[act,step] = Mo
+            # tangente axial limitada para que la iteración siga en las ramas de ablandamiento
+            d = (Pc[act]-N)/np.maximum(EA,0.01*K0[act])
+            ea[act] += d
+            small = np.abs(d) <= tol
+            conv[act[small],step] = True
+            act = act[~small]
+            if len(act) == 0:
+                break
+        curv[:,step], eps0[:,step] = kap, ea
+    shape = (() if single else (nsec,)) + (() if np.ndim(P) == 0 else (nP,)) + (nsteps+1,)
+    return {'curvature':curv.reshape(shape), 'M':M.reshape(shape), 'eps0':eps0.reshape(shape), 'converged':conv.reshape(shape)}
 
 def plot_Wall_T_BE(matConf, matInco, bW, bF, BEU, BED, BEL, BER, Lww, LwF, nMax, nMin):
     
@@ -793,18 +1956,18 @@ def plot_Wall_T_BE(matConf, matInco, bW, bF, BEU, BED, BEL, BER, Lww, LwF, nMax,
          ['layer','straight',SteelTag,13,area_malla7,2.475-cover,2.50-cover-BEf,2.475-cover,2.50+cover-BEf-Flange],    #superior
          ['layer','straight',SteelTag,13,area_malla7,2.375+cover,2.50-cover-BEf,2.375+cover,2.50+cover-BEf-Flange]]      #inferior
  
-    # plt.gca().invert_xaxis()
+    # pl.invert_xaxis()
    
     return fib_sec_1
   
     matcolor = ['r', 'lightgrey', 'gold', 'w', 'w', 'w']
     opsv.plot_fiber_section(fib_sec_1, matcolor=matcolor)
-    plt.axis('equal')
-    plt.axhline(y=0, color='r', lw = 0.5)
-    plt.axvline(x=0, color='r', lw = 0.5)
-    # plt.ylim(0,14)
-    # plt.xlim(-6,6)
-    plt.gca().invert_xaxis()
+    pl.axis('equal')
+    pl.axhline(y=0, color='r', lw = 0.5)
+    pl.axvline(x=0, color='r', lw = 0.5)
+    # pl.ylim(0,14)
+    # pl.xlim(-6,6)
+    pl.invert_xaxis()
     
 def dackal(Fyy, Fuu, eyy, ehh, euu, Lb, Db):
     #Fy = esfuerzo de fluencia del acero [MPa]
@@ -893,6 +2056,7 @@ def residual_disp(drifts,npts):
         Este algoritmo requiere que se haya corrido un periodo de vibración libre luego del final del registro
         
     '''
+    from scipy.signal import argrelextrema
     freevib = drifts[npts:-1] # extrae los valores de drifts a partir de donde comenzó la vibración libre
     peaks_ind = argrelextrema(freevib, np.greater) # calcula los indices de los puntos de los máximos
     peaks_ind = peaks_ind[0]
@@ -902,109 +2066,1065 @@ def residual_disp(drifts,npts):
     drifts2 = np.abs(freevib[valleys_ind]) # identifica los drifts de los valles
     resdrift = np.mean(np.concatenate((drifts1,drifts2))) # promedia los drifts de picos y valles
     return resdrift
+
+def residual_drifts(drifts,npts,method='peaks',window=None):
+    '''
+    Calculates the residual drift of all the stories at once from the drift history
+    recorded with a free vibration period after the end of the record
+
+    Parameters
+    ----------
+    drifts : numpy array
+        drift history. Each row is an analysis instant and each column a story.
+    npts : int
+        analysis step where the free vibration starts.
+    method : string, optional
+        'peaks' averages the absolute drift at the peaks and valleys of the free vibration, as residual_disp does.
+        'mean' uses the absolute value of the mean drift of the free vibration (a low-pass estimate of the permanent offset).
+        The default is 'peaks'.
+    window : int, optional
+        number of final steps used by the 'mean' method. The default is None, which uses all the free vibration.
+
+    Returns
+    -------
+    resdrift : numpy array
+        residual drift of each story. With the 'peaks' method, stories without peaks or valleys use the 'mean' estimate.
+
+    '''
+    drifts = np.asarray(drifts,dtype=float)
+    if drifts.ndim == 1:
+        drifts = drifts[:,None]
+    freevib = drifts[npts:-1] # extrae los valores de drifts a partir de donde comenzó la vibración libre
+    tail = freevib if window is None else freevib[-window:]
+    resmean = np.abs(np.mean(tail,axis=0))
+    if method == 'mean':
+        return resmean
+    elif method != 'peaks':
+        raise ValueError(f"method must be 'peaks' or 'mean', got '{method}'")
+    # picos y valles estrictos (igual que argrelextrema) para todos los pisos a la vez
+    mid = freevib[1:-1]
+    extremes = ((mid > freevib[:-2]) & (mid > freevib[2:])) | ((mid < freevib[:-2]) & (mid < freevib[2:]))
+    count = np.count_nonzero(extremes,axis=0)
+    total = np.sum(np.abs(mid)*extremes,axis=0)
+    with np.errstate(invalid='ignore',divide='ignore'):
+        resdrift = np.where(count > 0, total/count, resmean)
+    return resdrift
+
+def free_vibration_decayed(drifts,tol):
+    '''
+    Checks whether the free vibration has decayed, i.e. the peak-to-peak drift of
+    every story in the given window is below the tolerance
+
+    Parameters
+    ----------
+    drifts : numpy array
+        last steps of the drift history. Each row is an analysis instant and each column a story.
+    tol : float
+        maximum peak-to-peak drift allowed.
+
+    Returns
+    -------
+    bool
+        True if the free vibration of all the stories has decayed.
+
+    '''
+    drifts = np.asarray(drifts)
+    return bool(np.all(np.ptp(drifts,axis=0) <= tol))
                        
 def Sa_avg(T,Sa,T2 = np.linspace(0.02,3,299)):
     '''
-    Calculates the average spectral acceleration for a record
+    Calculates the average spectral acceleration for a record
+
+    Parameters
+    ----------
+    T : numpy array
+        Period range of the spectrum of the record.
+    Sa : numpy array
+        pseudo-acceleration of the record.
+    T2 : numpy array, optional
+        Period range to calculate the Sa average. The default is np.linspace(0.02,3,299).
+
+    Returns
+    -------
+    T2 : numpy array
+        Period range to calculate the Sa average.
+    sa_avg : numpy array
+        average pseudo-acceleration of the record..
+
+    '''
+    
+    
+    from scipy.stats import gmean
+    sa_avg = np.zeros(len(T2))
+    # sa_avg2 = np.zeros(len(T2)) # en casi que queramos definir con media aritmetica
+    for ind,tt in enumerate(T2):
+        ta = 0.2*tt # entre 0.2T
+        tb = 2.5*tt # y 2.5T
+        periods = np.linspace(ta,tb,int(np.ceil((tb-ta)/0.01))) # intervalos de 0.1
+        Sas2 = np.interp(periods,T,Sa)
+        sa_avg[ind] = gmean(Sas2)
+        # sa_avg2[ind] = np.mean(Sas2) # definir con media aritmetica
+    return T2,sa_avg
+
+
+def EAF(t,a):
+    '''
+    Calculates the fourier spectrum of a signal
+    
+    Parameters
+    ----------
+    t : numpy array
+        array with the time of the ground motion.
+    a : numpy array
+        array with the ground motion acceleration.
+
+    Returns
+    -------
+    T : numpy array
+        array with the periods.
+    A:  numpy array
+        array with the fourier amplitud.
+
+    '''
+    
+    
+    from scipy.fft import fft
+    N = len(a)
+    td = t[-1]
+    # dt = td/N
+    dw = 2*np.pi/td
+    Nf = int(N/2 + 1)
+    NT = np.linspace(0,Nf-1,Nf)
+    W = NT*dw
+    
+    TF = fft(a)/N*td
+    TF1 = TF[0:Nf]
+    A = np.zeros(Nf)
+    for i in range(Nf):
+        A[i] = np.linalg.norm(TF1[i])
+    
+    T = 2*np.pi*np.reciprocal(W[1::])
+    # F = W/(2*np.pi)
+    return T,A[1::]
+
+
+def cumAI(tiempo,sismo1,plot=1,cum=[0.05,0.95]):
+    '''  
+    Parameters
+    ----------
+    tiempo : time of the seismic record
+    sismo1 : history of accelerations
+    plot : optional
+        Select 1 if you want the plot. The default is 1.
+    cum : optional
+        Range of the . The default is [0.05,0.95].
+
+    Returns
+    -------
+    a2 : cumulative of the arias intensity.
+    t1 : start and end time where the record is between the percentages specified in cum.
+
+    '''
+  
+    from scipy.integrate import cumulative_trapezoid
+    a = np.pi/(2)*cumulative_trapezoid(sismo1**2,tiempo)
+    IA = a[-1] # la intensidad de Arias total es el último valor de la integral acumulada
+    a2 = np.hstack((0,a/IA))
+    t1 = np.interp(cum, a2, tiempo)
+    if plot == 1:
+        pl.plot(tiempo,a2)
+        pl.plot(t1,cum,'ro')
+        pl.show()
+    return a2,t1
+
+def pad_records(records):
+    '''
+    Stores a list of records with different lengths in a 2D array padded with zeros
+
+    Parameters
+    ----------
+    records : list
+        list of 1D arrays with the accelerations of each record. A 2D array is returned unchanged.
+
+    Returns
+    -------
+    acc : numpy array
+        accelerations. Each row is a record.
+    lengths : numpy array
+        number of points of each record.
+
+    '''
+    if isinstance(records,np.ndarray) and records.ndim == 2:
+        return records, np.full(records.shape[0],records.shape[1])
+    lengths = np.array([len(r) for r in records])
+    acc = np.zeros((len(records),lengths.max()))
+    for i,r in enumerate(records):
+        acc[i,:lengths[i]] = r
+    return acc, lengths
+
+def _crossing_times(curves,levels,dt):
+    # instante en que cada curva creciente (una por fila) alcanza cada nivel, interpolando linealmente
+    curves = np.asarray(curves)
+    rows = np.arange(curves.shape[0])[:,None]
+    idx = np.argmax(curves[:,None,:] >= np.asarray(levels)[None,:,None],axis=2)
+    idx = np.maximum(idx,1)
+    h0 = curves[rows,idx-1]
+    h1 = curves[rows,idx]
+    with np.errstate(invalid='ignore',divide='ignore'):
+        frac = np.where(h1 > h0,(np.asarray(levels)[None,:]-h0)/(h1-h0),0.0)
+    return (idx-1+np.clip(frac,0,1))*np.reshape(dt,(-1,1))
+
+def cumAI_batch(records,dt,lengths=None):
+    '''
+    Calculates the Arias intensity, the normalized Husid curve and the D5-75 and D5-95
+    significant durations of a suite of records in one vectorized pass
+
+    Parameters
+    ----------
+    records : list or numpy array
+        list of acceleration arrays or 2D array with one record per row padded with zeros.
+    dt : float or array
+        time increment of the records (one per record if they differ).
+    lengths : array, optional
+        number of points of each record when a padded 2D array is given. The default is None, which uses
+        the lengths of the records in the list (or the full rows of a 2D array).
+
+    Returns
+    -------
+    IA : numpy array
+        Arias intensity of each record, computed as cumAI does (pi/2 times the integral of the squared acceleration).
+    husid : numpy array
+        normalized cumulative Arias intensity. Each row is a record, the values after the end of a record are 1.
+    D575 : numpy array
+        significant duration between 5% and 75% of the Arias intensity.
+    D595 : numpy array
+        significant duration between 5% and 95% of the Arias intensity.
+
+    '''
+    acc, n = pad_records(records)
+    if lengths is not None:
+        n = np.asarray(lengths)
+    k = np.arange(acc.shape[1])[None,:]
+    acc = np.where(k < n[:,None],acc,0.0)
+    dt = np.broadcast_to(np.asarray(dt,dtype=float),(acc.shape[0],))
+    a2 = acc**2
+    # los tramos después del último punto de cada registro (hacia los ceros de relleno) no se integran
+    inc = np.where(k[:,1:] < n[:,None],0.5*(a2[:,1:]+a2[:,:-1]),0.0)
+    husid = np.zeros_like(a2)
+    husid[:,1:] = np.cumsum(inc,axis=1)*(np.pi/2*dt[:,None])
+    IA = husid[:,-1].copy()
+    with np.errstate(invalid='ignore',divide='ignore'):
+        husid /= IA[:,None]
+    t5, t75, t95 = _crossing_times(husid,[0.05,0.75,0.95],dt).T
+    return IA, husid, t75-t5, t95-t5
+
+def _tukey_window(k,n,taper):
+    # ventana de Tukey en los puntos k de registros de n puntos: coseno en una fracción taper de la longitud, mitad en cada extremo
+    m = np.maximum(np.floor(taper*(n-1)/2),1)
+    r = n-1-k
+    w = np.where(k < m,0.5*(1-np.cos(np.pi*k/m)),1.0)
+    return np.where(r < m,0.5*(1-np.cos(np.pi*np.maximum(r,0)/m)),w)
+
+def correct_records(records,dt,fmin=0.1,fmax=25.0,order=4,taper=0.05,detrend='linear',lengths=None):
+    '''
+    Baseline correction and band-pass filtering of a suite of records in one vectorized pass:
+    detrend -> cosine taper -> Butterworth filter (zero phase) -> integration
+
+    Parameters
+    ----------
+    records : list or numpy array
+        list of acceleration arrays or 2D array with one record per row padded with zeros.
+    dt : float or array
+        time increment of the records (one per record if they differ).
+    fmin : float, optional
+        high-pass corner frequency (Hz). None to skip the high-pass. The default is 0.1.
+    fmax : float, optional
+        low-pass corner frequency (Hz). None, or a value above the Nyquist frequency, skips the low-pass. The default is 25.0.
+    order : int, optional
+        order of the Butterworth filter. The default is 4.
+    taper : float, optional
+        fraction of the record length tapered with a cosine (half at each end, as a Tukey window). The default is 0.05.
+    detrend : string, optional
+        'linear', 'constant' or None. The default is 'linear'.
+    lengths : array, optional
+        number of points of each record when a padded 2D array is given. The default is None.
+
+    Returns
+    -------
+    acc : numpy array
+        corrected accelerations. Each row is a record, padded with zeros after its end.
+    vel : numpy array
+        velocities.
+    disp : numpy array
+        displacements.
+    lengths : numpy array
+        number of points of each record.
+
+    '''
+    from scipy.signal import butter, sosfiltfilt
+    acc, n = pad_records(records)
+    acc = np.array(acc,dtype=float)
+    if lengths is not None:
+        n = np.asarray(lengths)
+    nrec, npts = acc.shape
+    dt = np.broadcast_to(np.asarray(dt,dtype=float),(nrec,))
+    k = np.arange(npts,dtype=float)[None,:]
+    nn = n[:,None].astype(float)
+    mask = k < nn
+    acc *= mask
+
+    # corrección de línea base por mínimos cuadrados usando solo los puntos de cada registro
+    if detrend == 'constant':
+        acc -= (acc.sum(axis=1,keepdims=True)/nn)*mask
+    elif detrend == 'linear':
+        Sx = nn*(nn-1)/2
+        Sxx = (nn-1)*nn*(2*nn-1)/6
+        Sy = acc.sum(axis=1,keepdims=True)
+        Sxy = (acc*k).sum(axis=1,keepdims=True)
+        with np.errstate(invalid='ignore',divide='ignore'):
+            b = np.nan_to_num((nn*Sxy-Sx*Sy)/(nn*Sxx-Sx**2))
+        acc -= ((Sy-b*Sx)/nn+b*k)*mask
+    elif detrend is not None:
+        raise ValueError(f"detrend must be 'linear', 'constant' or None, got '{detrend}'")
+
+    # ventana de Tukey con la longitud de cada registro
+    if taper > 0:
+        acc *= _tukey_window(k,nn,taper)*mask
+
+    # filtro Butterworth de fase cero en secciones de segundo orden, un filtro por cada dt
+    for d in np.unique(dt):
+        nyq = 0.5/d
+        hp = fmin is not None and fmin > 0
+        lp = fmax is not None and fmax < nyq
+        if not (hp or lp):
+            continue
+        if hp and lp:
+            sos = butter(order,[fmin,fmax],btype='bandpass',fs=1/d,output='sos')
+        elif hp:
+            sos = butter(order,fmin,btype='highpass',fs=1/d,output='sos')
+        else:
+            sos = butter(order,fmax,btype='lowpass',fs=1/d,output='sos')
+        rows = dt == d
+        acc[rows] = sosfiltfilt(sos,acc[rows],axis=1)
+    acc *= mask
+
+    vel = np.zeros_like(acc)
+    vel[:,1:] = np.cumsum(0.5*(acc[:,1:]+acc[:,:-1]),axis=1)*dt[:,None]
+    vel *= mask
+    disp = np.zeros_like(acc)
+    disp[:,1:] = np.cumsum(0.5*(vel[:,1:]+vel[:,:-1]),axis=1)*dt[:,None]
+    disp *= mask
+    return acc, vel, disp, n
+
+def _process_batch(records,names,dt,output_dir,fmt,kwargs):
+    # corrige un lote de registros (nombres de archivo o arreglos) y opcionalmente lo escribe en disco
+    records = [load_record(r) for r in records]
+    acc, vel, disp, n = correct_records(records,dt,**kwargs)
+    out = []
+    for i,name in enumerate(names):
+        series = {'acc':acc[i,:n[i]],'vel':vel[i,:n[i]],'disp':disp[i,:n[i]]}
+        if output_dir is None:
+            out.append(series)
+            continue
+        files = {}
+        for key,values in series.items():
+            fname = os.path.join(output_dir,f'{name}_{key}.{fmt}')
+            if fmt == 'npy':
+                np.save(fname,values)
+            else:
+                np.savetxt(fname,values,fmt='%.8e') # un valor por línea, como lo lee timeSeries('Path')
+            files[key] = fname
+        out.append(files)
+    return out
+
+def process_records(records,dt,output_dir=None,fmt='txt',batch=50,nworkers=1,**kwargs):
+    '''
+    Reads, corrects (see correct_records) and optionally writes a record database in batches.
+    Each record is read and written once, and the batches can run in parallel processes. With
+    nworkers > 1 the workers import the calling script again on Windows and macOS, so the call must
+    be under if __name__ == '__main__':, e.g.:
+
+        if __name__ == '__main__':
+            files = ut.process_records(names,0.01,output_dir='corrected',nworkers=4,fmin=0.1,fmax=25)
+
+    Parameters
+    ----------
+    records : list
+        list of .txt file names with the records (one or several points per line) or of acceleration arrays.
+    dt : float or list
+        time increment of the records (one per record if they differ).
+    output_dir : string, optional
+        folder where the corrected acceleration, velocity and displacement are written as
+        <name>_acc.txt, <name>_vel.txt and <name>_disp.txt. None returns the arrays. The default is None.
+    fmt : string, optional
+        'txt' writes one value per line, ready for timeSeries('Path',...,'-filePath',...).
+        'npy' writes compact binary files to load with np.load. The default is 'txt'.
+    batch : int, optional
+        number of records corrected together in each vectorized pass. The default is 50.
+    nworkers : int, optional
+        number of processes. The default is 1.
+    **kwargs :
+        options of correct_records (fmin, fmax, order, taper, detrend).
+
+    Returns
+    -------
+    out : list
+        one dictionary per record with keys 'acc', 'vel' and 'disp'. The values are the
+        arrays, or the file names if output_dir is given.
+
+    '''
+    if fmt not in ('txt','npy'):
+        raise ValueError(f"fmt must be 'txt' or 'npy', got '{fmt}'")
+    nrec = len(records)
+    dt = np.broadcast_to(np.asarray(dt,dtype=float),(nrec,))
+    names = [os.path.splitext(os.path.basename(r))[0] if isinstance(r,str) else f'record{i}' for i,r in enumerate(records)]
+    if output_dir is not None:
+        os.makedirs(output_dir,exist_ok=True)
+    jobs = [(list(records[i:i+batch]),names[i:i+batch],dt[i:i+batch],output_dir,fmt,kwargs) for i in range(0,nrec,batch)]
+    if nworkers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(nworkers) as executor:
+            results = list(executor.map(_process_batch,*zip(*jobs)))
+    else:
+        results = [_process_batch(*job) for job in jobs]
+    return [r for res in results for r in res]
+
+def load_record(record):
+    '''
+    Returns the accelerations of a record given as the name of a .txt file (one or several
+    points per line) or as an array
+    '''
+    if isinstance(record,str):
+        return np.loadtxt(record).ravel()
+    return np.asarray(record,dtype=float).ravel()
+
+def record_timeseries(tag,record,dtrec,fact):
+    '''
+    Defines the Path timeSeries of a record given as a file name or as an array with the accelerations.
+    Arrays are passed from memory with '-values', so no temporary files are needed.
+
+    Parameters
+    ----------
+    tag : int
+        tag of the timeSeries.
+    record : string or numpy array
+        name of the record including file extension (i.e., 'GM01.txt') or array with the accelerations.
+    dtrec : float
+        time increment of the record.
+    fact : float
+        scale factor of the record.
+
+    Returns
+    -------
+    None.
+
+    '''
+    if isinstance(record,str):
+        timeSeries('Path',tag,'-filePath',record,'-dt',dtrec,'-factor',fact)
+    else:
+        timeSeries('Path',tag,'-values',*load_record(record),'-dt',dtrec,'-factor',fact)
+
+def resample_record(acc,dt,dt_new,antialias=True,order=8):
+    '''
+    Resamples a record (or the rows of a 2D array of records with the same dt) to a new time increment
+
+    When the record is coarsened a zero-phase low-pass filter at 80% of the new Nyquist frequency
+    is applied first to avoid aliasing. When it is refined the points are interpolated linearly,
+    which is what timeSeries('Path') does at each analysis step.
+
+    Parameters
+    ----------
+    acc : numpy array
+        accelerations of the record, or 2D array with one record per row.
+    dt : float
+        time increment of the record.
+    dt_new : float
+        new time increment (e.g. the analysis dtan).
+    antialias : bool, optional
+        use False to skip the low-pass filter when coarsening. The default is True.
+    order : int, optional
+        order of the Butterworth anti-alias filter. The default is 8.
+
+    Returns
+    -------
+    acc_new : numpy array
+        resampled accelerations.
+
+    '''
+    acc = np.asarray(acc,dtype=float)
+    if dt_new <= 0:
+        raise ValueError(f'dt_new must be positive, got {dt_new}')
+    if np.isclose(dt_new,dt):
+        return acc.copy()
+    npts = acc.shape[-1]
+    if dt_new > dt and antialias:
+        from scipy.signal import butter, sosfiltfilt
+        sos = butter(order,0.8*0.5/dt_new,btype='lowpass',fs=1/dt,output='sos')
+        acc = sosfiltfilt(sos,acc,axis=-1)
+    t = np.arange(npts)*dt
+    t_new = np.arange(int(np.floor(t[-1]/dt_new+1e-9))+1)*dt_new
+    if acc.ndim == 1:
+        return np.interp(t_new,t,acc)
+    return np.array([np.interp(t_new,t,a) for a in acc])
+
+def trim_record(acc,dt,start=0.05,end=0.95):
+    '''
+    Trims a record to the interval between two fractions of its Arias intensity
+    (by default the D5-95 significant duration) to reduce the number of analysis steps
+
+    Parameters
+    ----------
+    acc : numpy array
+        accelerations of the record.
+    dt : float
+        time increment of the record.
+    start : float, optional
+        fraction of the Arias intensity where the trimmed record begins. The default is 0.05.
+    end : float, optional
+        fraction of the Arias intensity where the trimmed record ends. The default is 0.95.
+
+    Returns
+    -------
+    acc_trim : numpy array
+        trimmed accelerations, starting at time zero.
+    t0 : float
+        time of the original record where the trimmed record begins.
+
+    '''
+    if not 0 <= start < end <= 1:
+        raise ValueError(f'start and end must satisfy 0 <= start < end <= 1, got {start} and {end}')
+    acc = np.asarray(acc,dtype=float)
+    IA, husid, _, _ = cumAI_batch(acc[None,:],dt)
+    i0 = max(int(np.searchsorted(husid[0],start,side='right'))-1,0)
+    i1 = min(int(np.searchsorted(husid[0],end,side='left')),len(acc)-1)
+    return acc[i0:i1+1].copy(), i0*dt
+
+def prepare_record(record,dtrec,dtan,trim=None,antialias=True,taper=0.05):
+    '''
+    Prepares a record at the analysis time increment ahead of the analysis, so it can be passed
+    from memory with timeSeries('Path',tag,'-values',*values,'-dt',dtan) and OpenSees does not
+    read the file nor interpolate the record at each step.
+
+    Parameters
+    ----------
+    record : string or numpy array
+        name of the .txt file with the record or array with the accelerations.
+    dtrec : float
+        time increment of the record.
+    dtan : float
+        time increment of the analysis.
+    trim : list, optional
+        [start, end] fractions of the Arias intensity to trim the record (see trim_record),
+        e.g. [0.05, 0.95]. The default is None (no trimming).
+    antialias : bool, optional
+        apply the anti-alias filter when dtan is larger than dtrec. The default is True.
+    taper : float, optional
+        only with trim: fraction of the trimmed record tapered with a cosine (half at each end, as in
+        correct_records), so it starts and ends at zero instead of with an abrupt acceleration. 0 keeps
+        the trimmed values unchanged. The default is 0.05.
+
+    Returns
+    -------
+    values : numpy array
+        accelerations at dtan.
+    nPts : int
+        number of points of values.
+    t0 : float
+        only returned with trim: time of the original record where values begins.
+
+    '''
+    acc = load_record(record)
+    if trim is None:
+        values = resample_record(acc,dtrec,dtan,antialias)
+        return values, len(values)
+    acc, t0 = trim_record(acc,dtrec,*trim)
+    if taper > 0:
+        acc = acc*_tukey_window(np.arange(len(acc)),len(acc),taper)
+    values = resample_record(acc,dtrec,dtan,antialias)
+    return values, len(values), t0
+
+def _gamma_modulation(Ia,D595,tmid):
+    # parámetros de la función de modulación q(t) = a1*t^(a2-1)*exp(-a3*t) de Rezaeian y Der Kiureghian
+    # q^2 es proporcional a una distribución gamma de forma k = 2*a2-1 y tasa 2*a3, así que la curva de
+    # Husid es su función de distribución. k se obtiene de la relación D5-95/tmid (tabla interpolada)
+    from scipy.special import gammaincinv, gammaln
+    k = np.logspace(-1,3,2000)
+    ratio = (gammaincinv(k,0.95)-gammaincinv(k,0.05))/gammaincinv(k,0.45) # decreciente con k
+    r = D595/tmid
+    if np.any(r > ratio[0]) or np.any(r < ratio[-1]):
+        raise ValueError(f'D595/tmid must be between {ratio[-1]:.3f} and {ratio[0]:.3f}')
+    k = np.exp(np.interp(np.log(r),np.log(ratio[::-1]),np.log(k[::-1])))
+    rate = gammaincinv(k,0.45)/tmid # 2*a3
+    a1 = np.sqrt(2*Ia/np.pi*np.exp(k*np.log(rate)-gammaln(k)))
+    return a1, (k+1)/2, rate/2, k, rate
+
+def simulate_records(n,dt,Ia,D595,tmid,fmid,fslope,zeta,fc=0.2,duration=None,seed=None):
+    '''
+    Generates synthetic ground motions with the filtered and modulated white noise model of
+    Rezaeian and Der Kiureghian (2010). All the records are generated together in one vectorized batch.
+
+    The model parameters can be scalars or arrays with one value per record (e.g. sampled from
+    predictive equations for a scenario).
+
+    Parameters
+    ----------
+    n : int
+        number of records.
+    dt : float
+        time increment of the records.
+    Ia : float or array
+        Arias intensity as in cumAI_batch (pi/2 times the integral of the squared acceleration), in the units of the records.
+    D595 : float or array
+        significant duration between 5% and 95% of the Arias intensity (s).
+    tmid : float or array
+        time when 45% of the Arias intensity is reached (s).
+    fmid : float or array
+        predominant frequency of the filter at tmid (Hz).
+    fslope : float or array
+        rate of change of the filter frequency (Hz/s).
+    zeta : float or array
+        damping ratio of the filter.
+    fc : float, optional
+        corner frequency (Hz) of the high-pass filter applied to the records. None to skip. The default is 0.2.
+    duration : float, optional
+        duration of the records. The default is None (time at 99.9% of the Arias intensity of the longest record).
+    seed : int, optional
+        seed of the random number generator, for reproducible suites. The default is None.
+
+    Returns
+    -------
+    t : numpy array
+        time.
+    acc : numpy array
+        accelerations. Each row is a record that can be passed to dinamicoIDA5 or to any dynamic function.
+
+    '''
+    from scipy.special import gammaincinv
+    Ia, D595, tmid, fmid, fslope, zeta = [np.broadcast_to(np.asarray(x,dtype=float),(n,)) for x in (Ia,D595,tmid,fmid,fslope,zeta)]
+    a1, a2, a3, k, rate = _gamma_modulation(Ia,D595,tmid)
+    if duration is None:
+        duration = np.max(gammaincinv(k,0.999)/rate)
+    npts = int(np.ceil(duration/dt))+1
+    t = np.arange(npts)*dt
+    rng = np.random.default_rng(seed)
+
+    # filtro lineal variable en el tiempo excitado por impulsos de ruido blanco, integrado de forma exacta
+    # en cada paso. La varianza del filtro se propaga con la misma recursión para normalizar la respuesta
+    x = np.zeros((n,npts))
+    u = np.zeros(n)
+    v = np.zeros(n)
+    Puu = np.zeros(n)
+    Puv = np.zeros(n)
+    Pvv = np.zeros(n)
+    sq = np.sqrt(1-zeta**2)
+    for i in range(npts-1):
+        w = 2*np.pi*np.maximum(fmid+fslope*(t[i]-tmid),0.1) # frecuencia del filtro, al menos 0.1 Hz
+        wd = w*sq
+        e = np.exp(-zeta*w*dt)
+        c = np.cos(wd*dt)
+        s = np.sin(wd*dt)
+        A11 = e*(c+zeta*w/wd*s)
+        A12 = e*s/wd
+        A21 = -w**2*A12
+        A22 = e*(c-zeta*w/wd*s)
+        v = v+w**2*rng.standard_normal(n)
+        Pvv = Pvv+w**4
+        u, v = A11*u+A12*v, A21*u+A22*v
+        Puu, Puv, Pvv = (A11**2*Puu+2*A11*A12*Puv+A12**2*Pvv,
+                         A11*A21*Puu+(A11*A22+A12*A21)*Puv+A12*A22*Pvv,
+                         A21**2*Puu+2*A21*A22*Puv+A22**2*Pvv)
+        x[:,i+1] = u/np.sqrt(Puu)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        q = np.where(t[None,:] > 0,a1[:,None]*t[None,:]**(a2[:,None]-1)*np.exp(-a3[:,None]*t[None,:]),0.0)
+    acc = q*x
+    if fc is not None:
+        acc = correct_records(acc,dt,fmin=fc,fmax=None,taper=0,detrend=None)[0]
+    return t, acc
+
+def _sdof_peaks(acc,mask,dt,periods,xi):
+    # desplazamiento relativo máximo de osciladores lineales (filas: registros, columnas: periodos)
+    # usando la solución exacta para carga lineal por tramos (discretización 'foh' del oscilador),
+    # que se aplica a todos los registros a la vez con lfilter
+    from scipy.signal import cont2discrete, lfilter
+    umax = np.zeros((acc.shape[0],len(periods)))
+    full = mask.all()
+    for j,per in enumerate(periods):
+        w = 2*np.pi/per
+        num, den, _ = cont2discrete(([-1.0],[1.0,2*xi*w,w**2]),dt,method='foh')
+        u = lfilter(np.ravel(num),den,acc,axis=1)
+        np.abs(u,out=u)
+        if not full: # la vibración libre después del final de cada registro no se cuenta
+            u *= mask
+        umax[:,j] = u.max(axis=1)
+    return umax
+
+def spectra(records,dt,periods,xi=0.05,factor=1.0,lengths=None):
+    '''
+    Calculates the pseudo-acceleration spectra of a suite of records, e.g. to build the
+    spectra matrix of a record database for select_records
 
     Parameters
     ----------
-    T : numpy array
-        Period range of the spectrum of the record.
-    Sa : numpy array
-        pseudo-acceleration of the record.
-    T2 : numpy array, optional
-        Period range to calculate the Sa average. The default is np.linspace(0.02,3,299).
+    records : list or numpy array
+        list of acceleration arrays, list of .txt file names with the records, or 2D array with one record per row padded with zeros.
+    dt : float or array
+        time increment of the records (one per record if they differ).
+    periods : numpy array
+        periods of the spectra.
+    xi : float, optional
+        percent of critical damping as float (i.e. use 0.05 for 5%). The default is 0.05.
+    factor : float, optional
+        scale factor applied to the records. The default is 1.0.
+    lengths : array, optional
+        number of points of each record when a padded 2D array is given. The default is None.
 
     Returns
     -------
-    T2 : numpy array
-        Period range to calculate the Sa average.
-    sa_avg : numpy array
-        average pseudo-acceleration of the record..
+    Sa : numpy array
+        spectral pseudo-acceleration. Each row is a record and each column a period.
 
     '''
-    
-    
-    sa_avg = np.zeros(len(T2))
-    # sa_avg2 = np.zeros(len(T2)) # en casi que queramos definir con media aritmetica
-    for ind,tt in enumerate(T2):
-        ta = 0.2*tt # entre 0.2T
-        tb = 2.5*tt # y 2.5T
-        periods = np.linspace(ta,tb,int(np.ceil((tb-ta)/0.01))) # intervalos de 0.1
-        Sas2 = np.interp(periods,T,Sa)
-        sa_avg[ind] = gmean(Sas2)
-        # sa_avg2[ind] = np.mean(Sas2) # definir con media aritmetica
-    return T2,sa_avg
+    if not isinstance(records,np.ndarray):
+        records = [load_record(r) for r in records]
+    acc, n = pad_records(records)
+    if lengths is None:
+        lengths = n
+    acc = acc*factor
+    dt = np.broadcast_to(np.asarray(dt,dtype=float),(acc.shape[0],))
+    mask = np.arange(acc.shape[1])[None,:] < np.reshape(lengths,(-1,1))
+    Tall, inv = np.unique(np.round(np.atleast_1d(periods),10),return_inverse=True)
+    Sa = np.zeros((acc.shape[0],len(Tall)))
+    for d in np.unique(dt): # los registros con el mismo dt se filtran juntos
+        rows = dt == d
+        Sa[rows] = _sdof_peaks(acc[rows],mask[rows],d,Tall,xi)*(2*np.pi/Tall)**2
+    return Sa[:,np.ravel(inv)]
+
+def compute_ims(records,dt,T1=None,periods=None,fas_freqs=None,xi=0.05,factor=1.0,names=None):
+    '''
+    Calculates the intensity measures of a suite of records in one pass. The velocity and
+    displacement histories, the squared acceleration integral and the spectra are computed
+    once and shared among the intensity measures.
 
+    Parameters
+    ----------
+    records : list or numpy array
+        list of acceleration arrays, list of .txt file names with the records, or 2D array with one record per row padded with zeros.
+    dt : float or array
+        time increment of the records (one per record if they differ).
+    T1 : float, optional
+        fundamental period of the structure. If given, Sa(T1) and Sa_avg(T1) are computed. The default is None.
+    periods : list, optional
+        additional periods where the spectral pseudo-acceleration is reported. The default is None.
+    fas_freqs : list, optional
+        frequencies (Hz) where the Fourier amplitude is reported. The default is None.
+    xi : float, optional
+        percent of critical damping for the spectra. The default is 0.05.
+    factor : float, optional
+        scale factor applied to the records (e.g. 9.81 to convert from g to m/s2). The default is 1.0.
+    names : list, optional
+        names of the records for the index of the table. The default is the file names or the record number.
+
+    Returns
+    -------
+    ims : DataFrame
+        one row per record with columns PGA, PGV, PGD, IA, CAV, D575, D595 and, depending on the
+        inputs, Sa(T1), Sa_avg, Sa(T) for each period and FAS(f) for each frequency.
+        Sa_avg is the geometric mean of Sa between 0.2T1 and 2.5T1 as in Sa_avg.
 
-def EAF(t,a):
     '''
-    Calculates the fourier spectrum of a signal
-    
+    import pandas as pd
+    if names is None and not isinstance(records,np.ndarray) and all(isinstance(r,str) for r in records):
+        names = list(records)
+    if not isinstance(records,np.ndarray):
+        records = [load_record(r) for r in records]
+    acc, lengths = pad_records(records)
+    acc = acc*factor
+    nrec, npts = acc.shape
+    dt = np.broadcast_to(np.asarray(dt,dtype=float),(nrec,)).copy()
+    mask = np.arange(npts)[None,:] < lengths[:,None]
+    acc = np.where(mask,acc,0.0)
+
+    # historias de velocidad y desplazamiento (regla del trapecio) compartidas por PGV, PGD y CAV
+    vel = np.zeros_like(acc)
+    vel[:,1:] = np.cumsum(0.5*(acc[:,1:]+acc[:,:-1]),axis=1)*dt[:,None]
+    disp = np.zeros_like(acc)
+    disp[:,1:] = np.cumsum(0.5*(vel[:,1:]+vel[:,:-1]),axis=1)*dt[:,None]
+    IA, husid, D575, D595 = cumAI_batch(acc,dt,lengths)
+    absacc = np.abs(acc)
+    data = {'PGA': absacc.max(axis=1),
+            'PGV': np.max(np.abs(np.where(mask,vel,0.0)),axis=1),
+            'PGD': np.max(np.abs(np.where(mask,disp,0.0)),axis=1),
+            'IA': IA,
+            'CAV': np.sum(np.where(mask[:,1:],0.5*(absacc[:,1:]+absacc[:,:-1]),0.0),axis=1)*dt,
+            'D575': D575,
+            'D595': D595}
+
+    # periodos del espectro: los pedidos más los necesarios para Sa_avg
+    Tsa = [] if periods is None else list(np.atleast_1d(periods))
+    if T1 is not None:
+        ta, tb = 0.2*T1, 2.5*T1
+        Tavg = np.linspace(ta,tb,int(np.ceil((tb-ta)/0.01)))
+        Tsa = Tsa + [T1] + list(Tavg)
+    if len(Tsa) > 0:
+        Sa = spectra(acc,dt,Tsa,xi,lengths=lengths)
+        nper = 0 if periods is None else len(np.atleast_1d(periods))
+        if T1 is not None:
+            data['Sa(T1)'] = Sa[:,nper]
+            data['Sa_avg'] = np.exp(np.mean(np.log(Sa[:,nper+1:]),axis=1))
+        for j in range(nper):
+            data[f'Sa({Tsa[j]:g})'] = Sa[:,j]
+
+    # amplitudes de Fourier, |FFT|*dt como en EAF
+    if fas_freqs is not None:
+        fas_freqs = np.atleast_1d(fas_freqs)
+        FAS = np.zeros((nrec,len(fas_freqs)))
+        for d in np.unique(dt):
+            rows = dt == d
+            amp = np.abs(np.fft.rfft(acc[rows],axis=1))*d
+            freqs = np.fft.rfftfreq(npts,d)
+            FAS[rows] = np.array([np.interp(fas_freqs,freqs,a) for a in amp])
+        for j,f in enumerate(fas_freqs):
+            data[f'FAS({f:g})'] = FAS[:,j]
+    return pd.DataFrame(data,index=names)
+
+def _suite_score(S1,S2,k,Y,Y2,YY,lntarget,target_std,w_std):
+    # error del espectro medio (en logaritmo) y de la desviación estándar al agregar cada candidato
+    # (filas de Y) a un conjunto de k-1 registros con sumas S1 y S2 de ln(Sa) y ln(Sa)^2
+    a = S1-k*lntarget
+    err = (YY+2*(Y@a)+a@a)/k**2 # suma de ((S1+Y)/k-lntarget)^2 sin crear matrices temporales
+    if target_std is not None and k > 1:
+        m = Y+S1
+        m /= k
+        m **= 2
+        var = Y2+S2
+        var /= k
+        var -= m
+        np.maximum(var,0.0,out=var)
+        var *= k/(k-1)
+        np.sqrt(var,out=var)
+        var -= target_std
+        var **= 2
+        err = err + w_std*var.sum(axis=1)
+    return err
+
+def select_records(Sa_db,T,target,n,T_range=None,target_std=None,w_std=1.0,scale=True,max_scale=None,min_scale=None,npasses=3,factors=None):
+    '''
+    Selects and scales n records from a database so that the suite matches a target spectrum
+    in mean and, optionally, in standard deviation (both in logarithmic scale)
+
+    The scale factor of each record minimizes the mismatch of its own spectrum with the target.
+    The suite is built with a greedy search, where all the candidates are scored at once, followed
+    by swap passes that replace each record by the best candidate while the mismatch decreases.
+
     Parameters
     ----------
-    t : numpy array
-        array with the time of the ground motion.
-    a : numpy array
-        array with the ground motion acceleration.
+    Sa_db : numpy array
+        spectra of the database (e.g. from spectra). Each row is a record and each column a period in T.
+    T : numpy array
+        periods of the columns of Sa_db.
+    target : numpy array
+        target spectrum in the periods T (e.g. from espectroNSR interpolated in T).
+    n : int
+        number of records to select.
+    T_range : list, optional
+        range of periods [Ta,Tb] where the mismatch is measured. The default is None (all the periods).
+    target_std : float or numpy array, optional
+        target standard deviation of ln(Sa) in the periods T. The default is None (only the mean is matched).
+    w_std : float, optional
+        weight of the standard deviation mismatch relative to the mean mismatch. The default is 1.0.
+    scale : bool, optional
+        use False to select the records without scaling them. The default is True.
+    max_scale : float, optional
+        maximum scale factor. The default is None.
+    min_scale : float, optional
+        minimum scale factor. The default is None.
+    npasses : int, optional
+        maximum number of swap passes over the suite. The default is 3.
+    factors : numpy array, optional
+        scale factor of each record of the database (e.g. to match Sa at a conditioning period).
+        If given, it replaces the least squares factors. The default is None.
 
     Returns
     -------
-    T : numpy array
-        array with the periods.
-    A:  numpy array
-        array with the fourier amplitud.
+    idx : numpy array
+        rows of Sa_db of the selected records.
+    factors : numpy array
+        scale factor of each selected record.
+    score : float
+        sum of squared errors of the mean ln(Sa) of the suite (plus the weighted standard deviation errors).
 
     '''
-    
-    
-    N = len(a)
-    td = t[-1]
-    # dt = td/N
-    dw = 2*np.pi/td
-    Nf = int(N/2 + 1)
-    NT = np.linspace(0,Nf-1,Nf)
-    W = NT*dw
-    
-    TF = fft(a)/N*td
-    TF1 = TF[0:Nf]
-    A = np.zeros(Nf)
-    for i in range(Nf):
-        A[i] = np.linalg.norm(TF1[i])
-    
-    T = 2*np.pi*np.reciprocal(W[1::])
-    # F = W/(2*np.pi)
-    return T,A[1::]
+    Sa_db = np.atleast_2d(np.asarray(Sa_db,dtype=float))
+    T = np.asarray(T,dtype=float)
+    nrec = Sa_db.shape[0]
+    if Sa_db.shape[1] != len(T):
+        raise ValueError(f'Sa_db has {Sa_db.shape[1]} columns but {len(T)} periods were given')
+    if not 0 < n <= nrec:
+        raise ValueError(f'n must be between 1 and the number of records ({nrec}), got {n}')
+    cols = np.ones(len(T),dtype=bool) if T_range is None else (T >= T_range[0]) & (T <= T_range[1])
+    if not cols.any():
+        raise ValueError(f'no periods of T within T_range {T_range}')
+    lntarget = np.log(np.broadcast_to(target,T.shape)[cols])
+    if target_std is not None:
+        target_std = np.broadcast_to(target_std,T.shape)[cols]
+    with np.errstate(divide='ignore'):
+        lnSa = np.log(Sa_db[:,cols])
+
+    # factor de escala de cada registro (mínimos cuadrados en logaritmo)
+    lnf = np.zeros(nrec)
+    if factors is not None:
+        with np.errstate(divide='ignore'):
+            lnf = np.log(np.broadcast_to(np.asarray(factors,dtype=float),(nrec,)))
+    elif scale:
+        lnf = np.mean(lntarget-lnSa,axis=1)
+    if scale or factors is not None:
+        lnf = np.clip(lnf,-np.inf if min_scale is None else np.log(min_scale),np.inf if max_scale is None else np.log(max_scale))
+    Y = lnSa + lnf[:,None]
+    Y[~np.isfinite(Y).all(axis=1)] = 1e3 # registros con ordenadas o factores nulos no se seleccionan
+    Y2 = Y**2
+    YY = Y2.sum(axis=1)
+
+    # búsqueda voraz: se agrega el registro que más reduce el error del conjunto
+    idx = []
+    free = np.ones(nrec,dtype=bool)
+    S1 = np.zeros(len(lntarget))
+    S2 = np.zeros(len(lntarget))
+    for k in range(1,n+1):
+        err = _suite_score(S1,S2,k,Y,Y2,YY,lntarget,target_std,w_std)
+        err[~free] = np.inf
+        best = int(np.argmin(err))
+        idx.append(best)
+        free[best] = False
+        S1 += Y[best]
+        S2 += Y2[best]
+    score = float(err[best])
+
+    # intercambios: cada registro se reemplaza por el mejor candidato si el error disminuye
+    for p in range(npasses):
+        improved = False
+        for i in range(n):
+            old = idx[i]
+            R1 = S1-Y[old]
+            R2 = S2-Y2[old]
+            err = _suite_score(R1,R2,n,Y,Y2,YY,lntarget,target_std,w_std)
+            err[~free] = np.inf
+            best = int(np.argmin(err))
+            if err[best] < score*(1-1e-12):
+                idx[i] = best
+                free[old], free[best] = True, False
+                S1, S2 = R1+Y[best], R2+Y2[best]
+                score = float(err[best])
+                improved = True
+        if not improved:
+            break
+    idx = np.array(idx)
+    return idx, np.exp(lnf[idx]), score
+
+def baker_jayaram_correlation(T1,T2):
+    '''
+    Correlation of the epsilons of ln(Sa) at two periods per Baker and Jayaram (2008).
+    T1 and T2 can be arrays that broadcast against each other.
+    '''
+    T1, T2 = np.broadcast_arrays(np.asarray(T1,dtype=float),np.asarray(T2,dtype=float))
+    Tmin = np.minimum(T1,T2)
+    Tmax = np.maximum(T1,T2)
+    C1 = 1-np.cos(np.pi/2-0.366*np.log(Tmax/np.maximum(Tmin,0.109)))
+    with np.errstate(over='ignore'):
+        C2 = np.where(Tmax < 0.2,1-0.105*(1-1/(1+np.exp(100*Tmax-5)))*(Tmax-Tmin)/(Tmax-0.0099),0.0)
+    C3 = np.where(Tmax < 0.109,C2,C1)
+    C4 = C1+0.5*(np.sqrt(C3)-C3)*(1+np.cos(np.pi*Tmin/0.109))
+    rho = np.where(Tmax < 0.109,C2,np.where(Tmin > 0.109,C1,np.where(Tmax < 0.2,np.minimum(C2,C4),C4)))
+    return rho
+
+@lru_cache(maxsize=32)
+def _correlation_cached(periods):
+    T = np.array(periods)
+    rho = baker_jayaram_correlation(T[:,None],T[None,:])
+    rho.setflags(write=False)
+    return rho
+
+def correlation_matrix(T):
+    '''
+    Baker and Jayaram (2008) correlation matrix on a period grid. The matrix is computed once
+    per grid and reused in later calls (the returned array is read-only).
+    '''
+    return _correlation_cached(tuple(np.round(np.asarray(T,dtype=float),10)))
 
+def conditional_spectrum(T,median,sigma,T_star,eps=None,Sa_star=None):
+    '''
+    Conditional mean spectrum and conditional standard deviation given Sa at T_star
 
-def cumAI(tiempo,sismo1,plot=1,cum=[0.05,0.95]):
-    '''  
     Parameters
     ----------
-    tiempo : time of the seismic record
-    sismo1 : history of accelerations
-    plot : optional
-        Select 1 if you want the plot. The default is 1.
-    cum : optional
-        Range of the . The default is [0.05,0.95].
+    T : numpy array
+        periods.
+    median : numpy array
+        median Sa in the periods T (e.g. from a ground motion model).
+    sigma : numpy array
+        standard deviation of ln(Sa) in the periods T.
+    T_star : float
+        conditioning period (e.g. the fundamental period of the structure).
+    eps : float, optional
+        epsilon at T_star. The default is None.
+    Sa_star : float, optional
+        target Sa at T_star, used to compute eps if eps is not given (e.g. from espectroNSR). The default is None.
 
     Returns
     -------
-    a2 : cumulative of the arias intensity.
-    t1 : start and end time where the record is between the percentages specified in cum.
+    cms : numpy array
+        conditional mean spectrum (median Sa) in the periods T.
+    sigma_c : numpy array
+        conditional standard deviation of ln(Sa) in the periods T.
+    cov_c : numpy array
+        conditional covariance matrix of ln(Sa) in the periods T.
 
     '''
-  
-    IA = np.pi/(2)*np.trapz(sismo1**2,tiempo)
-    a = np.pi/(2)*cumulative_trapezoid(sismo1**2,tiempo)/IA
-    a2 = np.hstack((0,a))
-    t1 = np.interp(cum, a2, tiempo)
-    if plot == 1:
-        plt.plot(tiempo,a2)
-        plt.plot(t1,[0.05,0.95],'ro')
-        plt.show()
-    return a2,t1
+    T = np.asarray(T,dtype=float)
+    lnmed = np.log(np.broadcast_to(median,T.shape))
+    sigma = np.broadcast_to(np.asarray(sigma,dtype=float),T.shape)
+    if eps is None:
+        if Sa_star is None:
+            raise ValueError('either eps or Sa_star must be given')
+        eps = (np.log(Sa_star)-np.interp(T_star,T,lnmed))/np.interp(T_star,T,sigma)
+    rho_star = baker_jayaram_correlation(T,T_star)
+    cms = np.exp(lnmed+rho_star*eps*sigma)
+    cov_c = (correlation_matrix(T)-np.outer(rho_star,rho_star))*np.outer(sigma,sigma)
+    sigma_c = np.sqrt(np.maximum(np.diag(cov_c),0.0))
+    return cms, sigma_c, cov_c
+
+def select_records_cs(Sa_db,T,median,sigma,T_star,n,eps=None,Sa_star=None,T_range=None,w_std=1.0,max_scale=None,npasses=3):
+    '''
+    Selects a suite of records that matches the conditional spectrum (mean and standard deviation)
+    for the conditioning period T_star. Each record is scaled to the conditional mean at T_star.
+    The parameters are those of conditional_spectrum and select_records.
+
+    Returns
+    -------
+    idx : numpy array
+        rows of Sa_db of the selected records.
+    factors : numpy array
+        scale factor of each selected record.
+    score : float
+        mismatch of the suite as in select_records.
+    cms : numpy array
+        conditional mean spectrum in the periods T.
+    sigma_c : numpy array
+        conditional standard deviation of ln(Sa) in the periods T.
+
+    '''
+    T = np.asarray(T,dtype=float)
+    cms, sigma_c, _ = conditional_spectrum(T,median,sigma,T_star,eps,Sa_star)
+    if T_range is None:
+        T_range = [0.2*T_star,2.0*T_star]
+    # Sa de cada registro en T_star interpolando entre columnas
+    Sa_db = np.atleast_2d(np.asarray(Sa_db,dtype=float))
+    j = np.clip(np.searchsorted(T,T_star)-1,0,len(T)-2)
+    w = np.clip((T_star-T[j])/(T[j+1]-T[j]),0.0,1.0)
+    sa_star = (1-w)*Sa_db[:,j]+w*Sa_db[:,j+1]
+    with np.errstate(divide='ignore'):
+        factors = np.interp(T_star,T,cms)/sa_star
+    idx, f, score = select_records(Sa_db,T,cms,n,T_range,sigma_c,w_std,max_scale=max_scale,npasses=npasses,factors=factors)
+    return idx, f, score, cms, sigma_c
 
 def e20Lobatto(Gfc,Lel,npint,fc,E,e0):
     '''
@@ -1087,8 +3207,18 @@ def col_materials(fcn=28,fy=420,detailing='DES',tension = 'tension',steeltag = i
         List with the material tags for the unconfined concrete, confined concrete and reinforcement steel.
 
     '''
+    # los parámetros de los materiales se calculan una sola vez para cada combinación (ver definition_cache)
+    params = (fcn,fy,detailing,tension,steeltag,unctag,conftag,nps)
+    _emit(_cached_definition('col_materials',_col_materials_commands,params,_COL_MATERIALS_TAGS))
+    return [unctag,conftag,steeltag]
+
+_COL_MATERIALS_TAGS = (4,5,6)
+
+def _col_materials_commands(fcn,fy,detailing,tension,steeltag,unctag,conftag,nps):
+    # comandos uniaxialMaterial de col_materials
     
     
+    cmds = []
     # Steel properties
     fy_1 = fy                                                              # fy del acero
     fu_1 = fy_1*1.4 # aprox considerando los valores reportados por Julian                                                       
@@ -1107,10 +3237,9 @@ def col_materials(fcn=28,fy=420,detailing='DES',tension = 'tension',steeltag = i
     ecu = e20_c
     
     if tension == 'tension':
-        uniaxialMaterial('Concrete02', unctag, -fc, -ec, -fcu, -ecu, 0.1, 0.1*fc,0.1*Ec)
+        cmds.append(('uniaxialMaterial',('Concrete02', unctag, -fc, -ec, -fcu, -ecu, 0.1, 0.1*fc,0.1*Ec)))
     else:
-        uniaxialMaterial('Concrete01', unctag, fc, ec, fcu, ecu)
-    
+        cmds.append(('uniaxialMaterial',('Concrete01', unctag, fc, ec, fcu, ecu)))
     if detailing == 'DMO':
         D = 12
         L = 8*D
@@ -1119,10 +3248,9 @@ def col_materials(fcn=28,fy=420,detailing='DES',tension = 'tension',steeltag = i
         s1p1, s2p1, s3p1, s4p1, e1p1, e2p1, e3p1, e4p1 = s_steel1[0], s_steel1[1], s_steel1[2], s_steel1[3],e_steel1[0], e_steel1[1], e_steel1[2], e_steel1[3]
         s1n1, s2n1, s3n1, s4n1, e1n1, e2n1, e3n1, e4n1 = s_steel1[4], s_steel1[5], s_steel1[6], s_steel1[7],e_steel1[4], e_steel1[5], e_steel1[6], e_steel1[7]
         if nps == 4:
-            uniaxialMaterial('HystereticSM',steeltag,'-posEnv',s1p1,e1p1,s2p1,e2p1,s3p1,e3p1,s4p1,e4p1,'-negEnv',s1n1,e1n1,s2n1,e2n1,s3n1,e3n1,s4n1,e4n1)
+            cmds.append(('uniaxialMaterial',('HystereticSM',steeltag,'-posEnv',s1p1,e1p1,s2p1,e2p1,s3p1,e3p1,s4p1,e4p1,'-negEnv',s1n1,e1n1,s2n1,e2n1,s3n1,e3n1,s4n1,e4n1)))
         else:
-            uniaxialMaterial('Hysteretic',steeltag,s1p1,e1p1,s3p1,e3p1,s4p1,e4p1,s1n1,e1n1,s2n1,e2n1,s4n1,e4n1,1.0,1.0,0.0,0.0)
-
+            cmds.append(('uniaxialMaterial',('Hysteretic',steeltag,s1p1,e1p1,s3p1,e3p1,s4p1,e4p1,s1n1,e1n1,s2n1,e2n1,s4n1,e4n1,1.0,1.0,0.0,0.0)))
         # Para el concreto confinado
         k=1.25
         
@@ -1133,10 +3261,9 @@ def col_materials(fcn=28,fy=420,detailing='DES',tension = 'tension',steeltag = i
         e20_cc = e20Lobatto2(2*fcn*k, 3000, 5, fcn*k, Ec/1000, ecc)
         eucc=e20_cc
         if tension == 'tension':
-            uniaxialMaterial('Concrete02', conftag, -fcc, -ecc, -fucc, -eucc, 0.1, 0.1*fcc,0.1*Ec)
+            cmds.append(('uniaxialMaterial',('Concrete02', conftag, -fcc, -ecc, -fucc, -eucc, 0.1, 0.1*fcc,0.1*Ec)))
         else:
-            uniaxialMaterial('Concrete01', conftag, fcc, ecc, fucc, eucc) 
-    
+            cmds.append(('uniaxialMaterial',('Concrete01', conftag, fcc, ecc, fucc, eucc)))
     elif detailing == 'PreCode':
         D = 12
         #L = 8*D
@@ -1145,10 +3272,9 @@ def col_materials(fcn=28,fy=420,detailing='DES',tension = 'tension',steeltag = i
         s1p1, s2p1, s3p1, s4p1, e1p1, e2p1, e3p1, e4p1 = s_steel1[0], s_steel1[1], s_steel1[2], s_steel1[3],e_steel1[0], e_steel1[1], e_steel1[2], e_steel1[3]
         s1n1, s2n1, s3n1, s4n1, e1n1, e2n1, e3n1, e4n1 = s_steel1[4], s_steel1[5], s_steel1[6], s_steel1[7],e_steel1[4], e_steel1[5], e_steel1[6], e_steel1[7]
         if nps == 4:
-            uniaxialMaterial('HystereticSM',steeltag,'-posEnv',s1p1,e1p1,s2p1,e2p1,s3p1,e3p1,s4p1,e4p1,'-negEnv',s1n1,e1n1,s2n1,e2n1,s3n1,e3n1,s4n1,e4n1)
+            cmds.append(('uniaxialMaterial',('HystereticSM',steeltag,'-posEnv',s1p1,e1p1,s2p1,e2p1,s3p1,e3p1,s4p1,e4p1,'-negEnv',s1n1,e1n1,s2n1,e2n1,s3n1,e3n1,s4n1,e4n1)))
         else:
-            uniaxialMaterial('Hysteretic',steeltag,s1p1,e1p1,s3p1,e3p1,s4p1,e4p1,s1n1,e1n1,s2n1,e2n1,s4n1,e4n1,1.0,1.0,0.0,0.0)
-
+            cmds.append(('uniaxialMaterial',('Hysteretic',steeltag,s1p1,e1p1,s3p1,e3p1,s4p1,e4p1,s1n1,e1n1,s2n1,e2n1,s4n1,e4n1,1.0,1.0,0.0,0.0)))
         # Para el concreto confinado
         k=1.25
         k=1.01
@@ -1159,10 +3285,9 @@ def col_materials(fcn=28,fy=420,detailing='DES',tension = 'tension',steeltag = i
         e20_cc = e20Lobatto2(2*fcn*k, 3000, 5, fcn*k, Ec/1000, ecc)
         eucc=e20_cc
         if tension == 'tension':
-            uniaxialMaterial('Concrete02', conftag, -fcc, -ecc, -fucc, -eucc, 0.1, 0.1*fcc,0.1*Ec)
+            cmds.append(('uniaxialMaterial',('Concrete02', conftag, -fcc, -ecc, -fucc, -eucc, 0.1, 0.1*fcc,0.1*Ec)))
         else:
-            uniaxialMaterial('Concrete01', conftag, fcc, ecc, fucc, eucc) 
-    
+            cmds.append(('uniaxialMaterial',('Concrete01', conftag, fcc, ecc, fucc, eucc)))
     elif detailing =='DES':
         D = 12
         L = 6*D
@@ -1170,9 +3295,9 @@ def col_materials(fcn=28,fy=420,detailing='DES',tension = 'tension',steeltag = i
         s1p1, s2p1, s3p1, s4p1, e1p1, e2p1, e3p1, e4p1 = s_steel1[0], s_steel1[1], s_steel1[2], s_steel1[3],e_steel1[0], e_steel1[1], e_steel1[2], e_steel1[3]
         s1n1, s2n1, s3n1, s4n1, e1n1, e2n1, e3n1, e4n1 = s_steel1[4], s_steel1[5], s_steel1[6], s_steel1[7],e_steel1[4], e_steel1[5], e_steel1[6], e_steel1[7]
         if nps == 4:
-            uniaxialMaterial('HystereticSM',steeltag,'-posEnv',s1p1,e1p1,s2p1,e2p1,s3p1,e3p1,s4p1,e4p1,'-negEnv',s1n1,e1n1,s2n1,e2n1,s3n1,e3n1,s4n1,e4n1)
+            cmds.append(('uniaxialMaterial',('HystereticSM',steeltag,'-posEnv',s1p1,e1p1,s2p1,e2p1,s3p1,e3p1,s4p1,e4p1,'-negEnv',s1n1,e1n1,s2n1,e2n1,s3n1,e3n1,s4n1,e4n1)))
         else:
-            uniaxialMaterial('Hysteretic',steeltag,s1p1,e1p1,s3p1,e3p1,s4p1,e4p1,s1n1,e1n1,s2n1,e2n1,s4n1,e4n1,1.0,1.0,0.0,0.0)
+            cmds.append(('uniaxialMaterial',('Hysteretic',steeltag,s1p1,e1p1,s3p1,e3p1,s4p1,e4p1,s1n1,e1n1,s2n1,e2n1,s4n1,e4n1,1.0,1.0,0.0,0.0)))
         # Para el concreto confinado
         k=1.3
         fcc=fc*k
@@ -1182,13 +3307,13 @@ def col_materials(fcn=28,fy=420,detailing='DES',tension = 'tension',steeltag = i
         e20_cc = e20Lobatto2(2*fcn*k, 3000, 5, fcn*k, Ec/1000, ecc)
         eucc=e20_cc
         if tension == 'tension':
-            uniaxialMaterial('Concrete02', conftag, -fcc, -ecc, -fucc, -eucc, 0.1, 0.1*fcc,0.1*Ec)
+            cmds.append(('uniaxialMaterial',('Concrete02', conftag, -fcc, -ecc, -fucc, -eucc, 0.1, 0.1*fcc,0.1*Ec)))
         else:
-            uniaxialMaterial('Concrete01', conftag, fcc, ecc, fucc, eucc)
-    return [unctag,conftag,steeltag]
+            cmds.append(('uniaxialMaterial',('Concrete01', conftag, fcc, ecc, fucc, eucc)))
+    return cmds
 
 
-def create_elements(coordx,coordy,coltag,beamtag,dia = 1):
+def create_elements(coordx,coordy,coltag,beamtag,dia = 1,registry = None):
     '''
     Function to create columns and beam elements. By default it uses one column and one beam.
     
@@ -1204,6 +3329,8 @@ def create_elements(coordx,coordy,coltag,beamtag,dia = 1):
         tag of the beams.
     dia : integer, optional
         Use 1 if you want a rigid diaphragm, any number if you don't. The default is 1.
+    registry : dict, optional
+        registry from model_registry with the same coordinates. If given its numbering is used. The default is None.
 
     Returns
     -------
@@ -1219,7 +3346,6 @@ def create_elements(coordx,coordy,coltag,beamtag,dia = 1):
     geomTransf('PDelta',pdelta)
     nx = len(coordx)
     ny = len(coordy)
-    TagColumns = []
     
     # Check type of coltag and create coltag2
     if isinstance(coltag, int):
@@ -1231,27 +3357,27 @@ def create_elements(coordx,coordy,coltag,beamtag,dia = 1):
     if len(coltag2) < (ny - 1):
         raise ValueError(f"coltag must have at least {ny - 1} elements for {ny - 1} column levels, but got {len(coltag2)} elements")
     
-    for i in range(ny-1):
-        for j in range(nx):
-            nodeI = 1000*(j+1)+i
-            nodeJ = 1000*(j+1)+(i+1)
-            eltag = 100*(j+1) + i
-            TagColumns.append(eltag)
-            element('forceBeamColumn',eltag,nodeI,nodeJ,pdelta,coltag2[i])
-    TagVigas = []
-    for i in range(1,ny):
-        for j in range(nx-1):
-            nodeI = 1000*(j+1)+i
-            nodeJ = 1000*(j+2)+i
-            eltag = 10000*(j+1) + i
-            TagVigas.append(eltag)
-            element('forceBeamColumn',eltag,nodeI,nodeJ,lineal,beamtag)
+    # primero se calculan y validan todos los tags y conectividades, luego se crean los elementos
+    if registry is None:
+        elems = frame_connectivity(nx,ny)
+        nodes = grid_nodes(coordx,coordy)
+    else:
+        elems = _registry_for(registry,(nx,ny))
+        nodes = registry['nodes']
+    cols, beams = elems['columns'], elems['beams']
+    check_model(nodes['tag'],cols,beams)
+    for eltag, (nodeI, nodeJ), i in zip(cols['tag'].tolist(),cols['nodes'].tolist(),cols['iy'].tolist()):
+        element('forceBeamColumn',eltag,nodeI,nodeJ,pdelta,coltag2[i])
+    TagColumns = cols['tag'].tolist()
+    for eltag, (nodeI, nodeJ) in zip(beams['tag'].tolist(),beams['nodes'].tolist()):
+        element('forceBeamColumn',eltag,nodeI,nodeJ,lineal,beamtag)
+    TagVigas = beams['tag'].tolist()
     if dia == 1:
+        # el nodo maestro de cada piso es el del primer eje
+        tags = nodes['tag'].reshape(nx,ny)
         for j in range(1,ny):
             for i in range(1,nx):
-                masternode = 1000 + j
-                slavenode = 1000*(i+1) + j
-                equalDOF(masternode,slavenode,1)
+                equalDOF(int(tags[0,j]),int(tags[i,j]),1)
                     
     return TagColumns, TagVigas
 
@@ -1280,6 +3406,7 @@ def create_elements2(coordx,coordy,coltag,beamtag,output = 0):
         list with the tags of the beams.
 
     '''
+    import pandas as pd
     lineal = 1
     geomTransf('Linear',lineal)
     pdelta = 2
@@ -1416,7 +3543,7 @@ def create_elements3D(coordx,coordy,coordz,coltag,beamtagX,beamtagY,dia = 1):
     
     return TagColumns, TagVigasX, TagVigasY, sectag
 
-def create_elements3D2(coordx,coordy,coordz,coltag,beamtagX,beamtagY,dia = 1):
+def create_elements3D2(coordx,coordy,coordz,coltag,beamtagX,beamtagY,dia = 1,registry = None):
     '''
     Function to create columns and beam elements. By default it uses one column and one beam.
     
@@ -1434,6 +3561,8 @@ def create_elements3D2(coordx,coordy,coordz,coltag,beamtagX,beamtagY,dia = 1):
         tag of the beams in X direction.
     beamtagY : integer
         tag of the beams in X direction.
+    registry : dict, optional
+        registry from model_registry with the same coordinates. If given its numbering is used. The default is None.
 
 
     Returns
@@ -1460,56 +3589,39 @@ def create_elements3D2(coordx,coordy,coordz,coltag,beamtagX,beamtagY,dia = 1):
         if len(coltag) != nz-1:
             print('ERROR: Number of column tags does not match number of floors')
         
-    TagColumns = []
+    # primero se calculan y validan todos los tags y conectividades, luego se crean los elementos
+    if registry is None:
+        elems = frame_connectivity(nx,ny,nz)
+        nodes = grid_nodes(coordx,coordy,coordz)
+    else:
+        elems = _registry_for(registry,(nx,ny,nz))
+        nodes = registry['nodes']
+    cols, bX, bY = elems['columns'], elems['beamsX'], elems['beamsY']
+    check_model(nodes['tag'],cols,bX,bY)
     sectag = []
-    for i in range(nx):
-        for j in range(ny):
-            for z in range(nz-1):
-                nodeI = 10000*(i+1)+100*j+z
-                nodeJ = 10000*(i+1)+100*j+(z+1)
-                eltag = 10000*(z+1) + 100*i + j
-                TagColumns.append(eltag)
-                if type(coltag) == list:
-                    element('forceBeamColumn',eltag,nodeI,nodeJ,coltrans,coltag[z][i][j])
-                    sectag.append(coltag[z])    
-                else:    
-                    element('forceBeamColumn',eltag,nodeI,nodeJ,coltrans,coltag)
-    # print(TagColumns)
-    TagVigasX,secVX = [],[]
-    for z in range(1,nz):
-        for i in range(nx-1):
-            for j in range(ny): 
-                nodeI = 10000*(i+1)+100*j+z
-                nodeJ = 10000*(i+2)+100*j+z
-                eltag = -(1000000*z + 10000*(j+1) + 100*i)
-                TagVigasX.append(eltag)
-                if type(beamtagX) == list:
-                    element('forceBeamColumn',eltag,*[nodeI,nodeJ],vigXtrans,beamtagX[z-1][i][j])
-                    secVX.append(beamtagX[z-1][i][j])
-                else:
-                    element('forceBeamColumn',eltag,*[nodeI,nodeJ],vigXtrans,beamtagX)
-                    secVX.append(beamtagX)
-                # print(nodeI,nodeJ,':',eltag)
-                # print('viga ok')
-    TagVigasY,secVY = [],[]
-    for z in range(1,nz):
-        for i in range(nx):
-            for j in range(ny-1): 
-                nodeI = 10000*(i+1)+100*j+z
-                nodeJ = 10000*(i+1)+100*(j+1)+z
-                eltag = 10000000*z + 10000*(i+1) + 100*j
-                TagVigasY.append(eltag)
-                if type(beamtagY) == list:
-                    element('forceBeamColumn',eltag,*[nodeI,nodeJ],vigYtrans,beamtagY[z-1][i][j])
-                    secVY.append(beamtagY[z-1][i][j])
-                else:
-                    element('forceBeamColumn',eltag,*[nodeI,nodeJ],vigYtrans,beamtagY)
-                    secVY.append(beamtagY)
-                # print(nodeI,nodeJ,':',eltag)
+    for eltag, (nodeI, nodeJ), i, j, z in zip(cols['tag'].tolist(),cols['nodes'].tolist(),cols['ix'].tolist(),cols['iy'].tolist(),cols['iz'].tolist()):
+        if type(coltag) == list:
+            element('forceBeamColumn',eltag,nodeI,nodeJ,coltrans,coltag[z][i][j])
+            sectag.append(coltag[z])    
+        else:    
+            element('forceBeamColumn',eltag,nodeI,nodeJ,coltrans,coltag)
+    TagColumns = cols['tag'].tolist()
+    secVX = []
+    for eltag, (nodeI, nodeJ), i, j, z in zip(bX['tag'].tolist(),bX['nodes'].tolist(),bX['ix'].tolist(),bX['iy'].tolist(),bX['iz'].tolist()):
+        sec = beamtagX[z-1][i][j] if type(beamtagX) == list else beamtagX
+        element('forceBeamColumn',eltag,nodeI,nodeJ,vigXtrans,sec)
+        secVX.append(sec)
+    TagVigasX = bX['tag'].tolist()
+    secVY = []
+    for eltag, (nodeI, nodeJ), i, j, z in zip(bY['tag'].tolist(),bY['nodes'].tolist(),bY['ix'].tolist(),bY['iy'].tolist(),bY['iz'].tolist()):
+        sec = beamtagY[z-1][i][j] if type(beamtagY) == list else beamtagY
+        element('forceBeamColumn',eltag,nodeI,nodeJ,vigYtrans,sec)
+        secVY.append(sec)
+    TagVigasY = bY['tag'].tolist()
     
     return TagColumns, TagVigasX, TagVigasY, sectag, secVX, secVY
 
-def load_beams(floor_load,roof_load,tagbeams,tag = 1):
+def load_beams(floor_load,roof_load,tagbeams,tag = 1,registry = None):
     '''
     Loads the beams of the model
 
@@ -1523,15 +3635,21 @@ def load_beams(floor_load,roof_load,tagbeams,tag = 1):
         tags of the beams. If you want it to work properly use the same tags generated by the create_elements function.
     tag : integer, optional
         Integer to assign to the tag of the load pattern. The default is 1.
+    registry : dict, optional
+        registry from model_registry used to create the beams. Needed if the beams were not numbered by create_elements. The default is None.
 
     Returns
     -------
     None.
 
     '''
-    spans = int(str(tagbeams[-1])[0])
-    roof_tags = tagbeams[-spans:]
-    floor_tags = tagbeams[:-spans]
+    tagbeams = np.asarray(tagbeams)
+    if registry is None:
+        floors = tagbeams % 10000 # piso de las vigas de create_elements
+    else:
+        floors = np.array([registry_position(registry,int(t))['floor'] for t in tagbeams])
+    roof_tags = tagbeams[floors == floors.max()].tolist()
+    floor_tags = tagbeams[floors != floors.max()].tolist()
     timeSeries('Linear', tag)
     pattern('Plain',tag,tag)
     eleLoad('-ele',*floor_tags,'-type','beamUniform',floor_load)
@@ -1624,31 +3742,149 @@ def load_beams3D(floor_load_x, roof_load_x, floor_load_y, roof_load_y, tagbeamsX
     eleLoad('-ele',*roofx,'-type','beamUniform',roof_load_x,0.0)
     eleLoad('-ele',*roofy,'-type','beamUniform',roof_load_y,0.0)
 
-def apply_diaphragms(floor_diaphragms,output=0):
+def _nearest_level(z, levels, tol):
+    # posición del nivel más cercano a cada coordenada (búsqueda binaria, sin matrices nodos x pisos)
+    order = np.argsort(levels)
+    sl = np.concatenate(([-np.inf], np.asarray(levels, dtype=float)[order], [np.inf]))
+    pos = np.searchsorted(sl, z)
+    pos = pos - ((z - sl[pos-1]) <= (sl[pos] - z))
+    ok = np.abs(sl[pos] - z) <= tol
+    return order[np.clip(pos-1, 0, len(order)-1)], ok
+
+def floor_nodes(coordz=None, nodes=None, tol=1e-6):
+    '''
+    Groups the nodes of the model by floor using their vertical coordinate (Y in 2D models, Z in 3D models). The nodes are read once, so the cost is linear in the number of nodes and does not depend on the node numbering.
+
+    Parameters
+    ----------
+    coordz : list, optional
+        List with the floor coordinates including the base coordinate. If not given, the levels are the different vertical coordinates of the nodes, so a node between floors (e.g. a mid-height joint) becomes a level and shifts the number of the floors above it. The default is None.
+    nodes : list, optional
+        Node tags to group. The default is None, which uses all the nodes of the model.
+    tol : float, optional
+        Tolerance to assign a node to a level. The default is 1e-6.
+
+    Returns
+    -------
+    floors : dict
+        {floor number: array with the node tags of the floor}. The floor number is the position of the level in coordz (0 is the base). The tags of each floor are sorted by their X coordinate (then Y in 3D models and then tag), so the first one is the leftmost node.
+
+    '''
+    if nodes is None:
+        nodes = getNodeTags()
+    tags = np.asarray(nodes, dtype=int)
+    if len(tags) == 0:
+        return {}
+    coords = np.array([nodeCoord(int(tag)) for tag in tags], dtype=float)
+    z = coords[:,-1]
+    if coordz is None:
+        zs = np.sort(z)
+        coordz = zs[np.concatenate(([True], np.diff(zs) > tol))]
+    floor, ok = _nearest_level(z, coordz, tol)
+    # orden por piso, luego por X (y Y en 3D) y finalmente por tag
+    keys = (tags,) + tuple(coords[:,k] for k in reversed(range(coords.shape[1]-1))) + (floor,)
+    order = np.lexsort(keys)
+    order = order[ok[order]]
+    tags, floor = tags[order], floor[order]
+    cuts = np.flatnonzero(np.diff(floor)) + 1
+    return {int(group_floor[0]): group for group_floor, group in zip(np.split(floor, cuts), np.split(tags, cuts))}
+
+def apply_diaphragms(floor_diaphragms,output=0,dofs=1,constraint='equalDOF',coordz=None,masters=None,tol=1e-6):
+    '''
+    Creates the floor diaphragms of the model. The nodes are grouped by their vertical coordinate in a single pass (see floor_nodes), so it works with any node numbering and in 2D or 3D models.
+
+    Parameters
+    ----------
+    floor_diaphragms : list
+        List with 1 for the floors with diaphragm and 0 for the floors without it, starting from the first floor above the base. It can be shorter than the number of floors, the floors above its last entry get no diaphragm.
+    output : int, optional
+        Use 1 to print the master and slave nodes. The default is 0.
+    dofs : int or list, optional
+        DOF or list of DOFs constrained with equalDOF. The default is 1.
+    constraint : string, optional
+        'equalDOF' or 'rigidDiaphragm'. rigidDiaphragm is only available in 3D models and uses Z as the perpendicular direction. The default is 'equalDOF'.
+    coordz : list, optional
+        List with the floor coordinates including the base coordinate. If not given, the floors are the different vertical coordinates of the nodes, so a node between floors would shift the floors above it (a warning is shown when a level has a single node); give coordz when there are nodes between floors. The default is None.
+    masters : list, optional
+        Master node of each floor in floor_diaphragms. The default is None, which uses the leftmost node of each floor.
+    tol : float, optional
+        Tolerance to assign a node to a floor. The default is 1e-6.
+
+    Returns
+    -------
+    diaphragms : dict
+        {floor number: (master node, list of slave nodes)}.
+
+    '''
+    if constraint not in ('equalDOF','rigidDiaphragm'):
+        raise ValueError(f"constraint must be 'equalDOF' or 'rigidDiaphragm', got '{constraint}'")
+    dofs = [int(dof) for dof in np.atleast_1d(dofs)]
+    floors = floor_nodes(coordz, tol=tol)
+    # sin coordz un nodo entre pisos cambiaría la numeración de los pisos de arriba
+    if coordz is None and floors:
+        if len(floors)-1 < len(floor_diaphragms):
+            raise ValueError(f'floor_diaphragms has {len(floor_diaphragms)} floors but the nodes are only at {len(floors)-1} levels above the base')
+        lone = [floor for floor,group in floors.items() if floor > 0 and len(group) == 1]
+        if lone:
+            import warnings
+            warnings.warn(f'levels {lone} have a single node, usually a node between floors that shifts the numbering of the floors above it; give the floor coordinates with coordz')
+    diaphragms = {}
     for index,diaf in enumerate(floor_diaphragms):
-        model_nodes_updated = np.array(getNodeTags())
-        if diaf == 1:
-            print('Creating diaphragm for floor: ', index+1)
-            floor_number = index+1
-            index_np1 = model_nodes_updated%(1000)==floor_number
-            nodes_floor = list(model_nodes_updated[index_np1])
-            for i in range(1,len(nodes_floor)):
-                equalDOF(int(nodes_floor[0]),int(nodes_floor[i]),1)
-                if output != 0:
-                    print('master node: ',nodes_floor[0], 'slave node: ',nodes_floor[i])
+        if diaf != 1:
+            continue
+        floor_number = index+1
+        print('Creating diaphragm for floor: ', floor_number)
+        nodes_floor = floors.get(floor_number, np.zeros(0, dtype=int))
+        if masters is None:
+            if len(nodes_floor) == 0:
+                continue
+            master = int(nodes_floor[0])
+        else:
+            master = int(masters[index])
+        slaves = [int(node) for node in nodes_floor if node != master]
+        if len(slaves) == 0:
+            continue
+        if constraint == 'rigidDiaphragm':
+            if len(nodeCoord(master)) != 3:
+                raise ValueError('rigidDiaphragm is only available in 3D models')
+            rigidDiaphragm(3,master,*slaves)
+        else:
+            for node in slaves:
+                equalDOF(master,node,*dofs)
+        if output != 0:
+            for node in slaves:
+                print('master node: ',master, 'slave node: ',node)
+        diaphragms[floor_number] = (master, slaves)
+    return diaphragms
+
+def find_leftmost_nodes(coordy, tol=1e-6):
+    '''
+    Returns the leftmost node of each floor (lowest X coordinate, then lowest Y in 3D models), grouping the nodes by their vertical coordinate in a single pass.
+
+    Parameters
+    ----------
+    coordy : list
+        List with the floor coordinates including the base coordinate.
+    tol : float, optional
+        Tolerance to assign a node to a floor. The default is 1e-6.
+
+    Returns
+    -------
+    leftmost_nodes : list
+        List with the leftmost node of each floor above the base.
 
-def find_leftmost_nodes(coordy):
+    '''
+    floors = floor_nodes(coordy, tol=tol)
     leftmost_nodes = []
-    model_nodes_updated = np.array(getNodeTags())
     for index in range(len(coordy)-1):
         floor_number = index+1
-        index_np1 = model_nodes_updated%(1000)==floor_number
-        nodes_floor = list(model_nodes_updated[index_np1])
-        leftmost_nodes.append(nodes_floor[0])  
+        if floor_number not in floors:
+            raise ValueError(f'floor {floor_number} has no nodes')
+        leftmost_nodes.append(int(floors[floor_number][0]))
     return leftmost_nodes
 
     
-def pushover_loads(coordy, tag_pattern = 1001, nodes = 0):
+def pushover_loads(coordy, tag_pattern = 1001, nodes = 0, registry = None):
     '''
     Generates a pushover pattern proportional to the each floor height. Works in combination with the creategrid command. 
 
@@ -1660,6 +3896,8 @@ def pushover_loads(coordy, tag_pattern = 1001, nodes = 0):
         Integer with the pattern tag for the pushover. The default is 1001.
     nodes : list, optional
         List with the node tags where to create the pushover. The default is 0. If you create the nodes using the creategrid command, you shouldn't change it.
+    registry : dict, optional
+        registry from model_registry used to create the nodes. If given, the loads are applied to the nodes of the first axis. The default is None.
         
             
     Returns
@@ -1667,6 +3905,8 @@ def pushover_loads(coordy, tag_pattern = 1001, nodes = 0):
     None. It creates the pattern.
 
     '''
+    if registry is not None and nodes == 0:
+        nodes = [int(registry_tags(registry,'nodes',floor=i+1,ix=0)[0]) for i in range(len(coordy)-1)]
     puntos = len(coordy)-1
     suma = np.sum(coordy)
     timeSeries('Linear', tag_pattern)
@@ -1721,7 +3961,7 @@ def create_circ_RC_section(ID,radius,cover,nbars,abar,coreID,coverID,steelID,pin
     BuildRCCircSection(ID, radius, cover, nbars, abar, coreID, coverID, steelID)
     beamIntegration('Lobatto',ID,ID,pint)
     
-def create_slabs(coordx, coordy, coordz, hslab, Eslab, pois, seclosa = 12345, dens = 0.0, starttag = 0):
+def create_slabs(coordx, coordy, coordz, hslab, Eslab, pois, seclosa = 12345, dens = 0.0, starttag = 0, registry = None):
     '''
     create_slabs create a solid slab in the area of the model specified by the coordinates. It uses an ElasticMembratePlateSection formulation and the Shell DKGQ. 
 
@@ -1745,6 +3985,8 @@ def create_slabs(coordx, coordy, coordz, hslab, Eslab, pois, seclosa = 12345, de
         Density of the slab. The default is 0.0.
     starttag: integer, optional
         Integer to use to start in another numbering scheme. Useful when you want to call the function several times. You enter the last integer of the previous call and it works.
+    registry : dict, optional
+        registry from model_registry created with slabs=True. If given its numbering is used (starttag is ignored). The default is None.
     Returns
     -------
     slabtags : list
@@ -1755,19 +3997,17 @@ def create_slabs(coordx, coordy, coordz, hslab, Eslab, pois, seclosa = 12345, de
     nx = len(coordx)
     ny = len(coordy)
     nz = len(coordz)
-    slabtags = []
-    for z in range(1,nz):
-        tag = -(1045*z + starttag)
-        for i in range(nx - 1):
-            for j in range(ny - 1):
-                n1 = 10000*(i+1) + 100*j + z
-                n2 = 10000*(i+2) + 100*j + z
-                n3 = 10000*(i+2) + 100*(j+1) + z
-                n4 = 10000*(i+1) + 100*(j+1) + z
-                nodoslosa = [n1,n2,n3,n4]
-                element('ShellDKGQ', tag, *nodoslosa, seclosa)
-                slabtags.append(tag)
-                tag = tag + 1
+    if registry is None:
+        slabs = slab_connectivity(nx,ny,nz,starttag)
+        nodes = grid_nodes(coordx,coordy,coordz)
+    else:
+        if 'slabs' not in _registry_for(registry,(nx,ny,nz)):
+            raise ValueError('the registry has no slabs, create it with slabs=True')
+        slabs, nodes = registry['slabs'], registry['nodes']
+    check_model(nodes['tag'],slabs)
+    for tag, nodoslosa in zip(slabs['tag'].tolist(),slabs['nodes'].tolist()):
+        element('ShellDKGQ', tag, *nodoslosa, seclosa)
+    slabtags = slabs['tag'].tolist()
     return slabtags           
 
 def create_slabs_NL(coordx, coordy, coordz, hslab, Eslab, pois, seclosa = 12345, dens = 0.0, starttag = 0):
@@ -1861,39 +4101,301 @@ def create_slabs_NL(coordx, coordy, coordz, hslab, Eslab, pois, seclosa = 12345,
                 tag = tag + 1
     return slabtags   
 
-def espectroNSR(Aa,Av,Fa,Fv,I):
+# Generador de arquetipos
+# =============================
+
+# parámetros por defecto de build_archetype (unidades en kN, m, t y MPa como en col_materials)
+_ARCHETYPE_DEFAULTS = {'nfloors':3, 'nx':3, 'ny':3, 'bay_x':6.0, 'bay_y':6.0, 'h':3.0, 'h1':None,
+                       'mass_area':0.8, 'fc':28.0, 'fy':420.0, 'detailing':'DES', 'nps':4,
+                       'col_b':0.5, 'col_h':0.5, 'col_cover':0.05, 'col_nbars':4, 'col_abar':0.000387, 'col_nint':2,
+                       'beam_b':0.3, 'beam_h':0.5, 'beam_cover':0.05, 'beam_ntop':3, 'beam_nbot':3, 'beam_abar':0.000286,
+                       'hslab':0.0, 'pois':0.3, 'floor_load':-30.0, 'roof_load':-20.0}
+
+def archetype_table(**values):
+    '''
+    Creates the parameter table of an archetype study with all the combinations of the given values (full factorial design)
+
+    Parameters
+    ----------
+    **values :
+        parameter name = value or list of values, e.g. nfloors=[3,5,8], nx=[2,3], col_h=[0.5,0.6]. See build_archetype for the parameters.
+
+    Returns
+    -------
+    table : DataFrame
+        one row per archetype and one column per parameter.
+
+    '''
+    import pandas as pd
+    names = list(values)
+    levels = [v if isinstance(v,(list,tuple,np.ndarray)) else [v] for v in values.values()]
+    return pd.DataFrame(list(itertools.product(*levels)),columns=names)
+
+def build_archetype(params):
+    '''
+    Builds a 3D RC frame archetype with creategrid3D, col_materials, create_rect_RC_section, create_elements3D2, create_slabs and load_beams3D. The model is wiped first.
+
+    Parameters
+    ----------
+    params : dict
+        archetype parameters. The missing ones take the default value:
+            nfloors, nx, ny : number of floors and of spans in X and Y (3, 3, 3).
+            bay_x, bay_y : span lengths in m (6.0, 6.0).
+            h, h1 : storey height and first storey height in m (3.0, None uses h).
+            mass_area : floor mass per unit area in t/m2 (0.8).
+            fc, fy, detailing, nps : material parameters of col_materials (28, 420, 'DES', 4).
+            col_b, col_h, col_cover, col_nbars, col_abar, col_nint : column width, depth, cover, bars in each face, bar area and intermediate bars (0.5, 0.5, 0.05, 4, 0.000387, 2).
+            beam_b, beam_h, beam_cover, beam_ntop, beam_nbot, beam_abar : beam width, depth, cover, top and bottom bars and bar area (0.3, 0.5, 0.05, 3, 3, 0.000286).
+            hslab, pois : slab thickness (0 creates no slabs) and Poisson ratio (0.0, 0.3).
+            floor_load, roof_load : distributed load on the floor and roof beams in kN/m (-30, -20).
+        A 'name' key is accepted as a label.
+
+    Returns
+    -------
+    archetype : dict
+        coordx, coordy, coordz, mass (per floor), weight, columns, beamsX, beamsY, slabs, roof_node (diaphragm master node of the roof) and params.
+
+    '''
+    unknown = set(params) - set(_ARCHETYPE_DEFAULTS) - {'name'}
+    if unknown:
+        raise ValueError(f'unknown archetype parameters: {sorted(unknown)}')
+    p = dict(_ARCHETYPE_DEFAULTS)
+    p.update(params)
+    nfloors, nx, ny = int(p['nfloors']), int(p['nx']), int(p['ny'])
+    h1 = p['h'] if p['h1'] is None else p['h1']
+    coordx = [p['bay_x']*i for i in range(nx+1)]
+    coordy = [p['bay_y']*i for i in range(ny+1)]
+    coordz = [0.0] + [h1 + p['h']*i for i in range(nfloors)]
+    mass = [p['mass_area']*coordx[-1]*coordy[-1]]*nfloors
+    
+    wipe()
+    model('basic','-ndm',3,'-ndf',6)
+    creategrid3D(coordx,coordy,coordz,1,mass)
+    fixZ(0.0,1,1,1,1,1,1)
+    noconf, conf, acero = col_materials(p['fc'],p['fy'],p['detailing'],nps=int(p['nps']))
+    coltag, beamtag = 101, 201 # tags de las secciones
+    create_rect_RC_section(coltag,p['col_h'],p['col_b'],p['col_cover'],conf,noconf,acero,int(p['col_nbars']),p['col_abar'],int(p['col_nbars']),p['col_abar'],int(p['col_nint']),p['col_abar'])
+    create_rect_RC_section(beamtag,p['beam_h'],p['beam_b'],p['beam_cover'],conf,noconf,acero,int(p['beam_ntop']),p['beam_abar'],int(p['beam_nbot']),p['beam_abar'])
+    columns, beamsX, beamsY, *_ = create_elements3D2(coordx,coordy,coordz,coltag,beamtag,beamtag)
+    slabs = []
+    if p['hslab'] > 0:
+        slabs = create_slabs(coordx,coordy,coordz,p['hslab'],4400*np.sqrt(p['fc'])*1000,p['pois'])
+    load_beams3D(p['floor_load'],p['roof_load'],p['floor_load'],p['roof_load'],beamsX,beamsY,coordx,coordy)
+    return {'coordx':coordx, 'coordy':coordy, 'coordz':coordz, 'mass':mass, 'weight':np.sum(mass)*9.81,
+            'columns':columns, 'beamsX':beamsX, 'beamsY':beamsY, 'slabs':slabs, 'roof_node':nfloors, 'params':p}
+
+def archetype_modal(archetype,nmodes=3):
+    '''
+    Archetype analysis that returns the first periods of the model
+
+    Parameters
+    ----------
+    archetype : dict
+        archetype returned by build_archetype.
+    nmodes : int, optional
+        number of periods. The default is 3.
+
+    Returns
+    -------
+    results : dict
+        T1, T2, ... in seconds.
+
+    '''
+    eig = np.array(eigen(nmodes))
+    T = 2*np.pi/np.sqrt(eig)
+    return {f'T{i+1}':T[i] for i in range(nmodes)}
+
+def archetype_pushover(archetype,drift=0.03,dincr=0.002,pushdir='x',Tol=1e-3):
+    '''
+    Archetype analysis that runs the gravity loads and a pushover proportional to the floor heights (pushover_loads3D and analisis3D.pushover2)
+
+    Parameters
+    ----------
+    archetype : dict
+        archetype returned by build_archetype.
+    drift : float, optional
+        target roof drift. The default is 0.03.
+    dincr : float, optional
+        roof displacement increment in m. The default is 0.002.
+    pushdir : string, optional
+        'x' or 'y'. The default is 'x'.
+    Tol : float, optional
+        tolerance of the analysis. The default is 1e-3.
+
+    Returns
+    -------
+    results : dict
+        Vmax (maximum base shear), Vmax_W (Vmax over the weight), drift_Vmax (roof drift at Vmax) and drift_max (roof drift reached).
+
+    '''
+    import opseestools.analisis3D as an
+    coordz = archetype['coordz']
+    an.gravedad()
+    loadConst('-time',0.0)
+    pushover_loads3D(coordz,pushdir)
+    # el patrón es unitario, así que el factor de carga es el corte basal
+    techo, V = an.pushover2(drift*coordz[-1],dincr,archetype['roof_node'],1 if pushdir == 'x' else 2,Tol=Tol)
+    imax = np.argmax(V)
+    return {'Vmax':V[imax], 'Vmax_W':V[imax]/archetype['weight'],
+            'drift_Vmax':techo[imax]/coordz[-1], 'drift_max':techo[-1]/coordz[-1]}
+
+_ARCHETYPE_ANALYSES = {'modal':archetype_modal, 'pushover':archetype_pushover}
+
+def _run_archetype(params,builder,analysis,options,quiet):
+    # construye y analiza un arquetipo; los errores se devuelven para no detener el estudio
+    import io
+    from contextlib import redirect_stdout, nullcontext
+    if isinstance(analysis,str):
+        analysis = _ARCHETYPE_ANALYSES[analysis]
+    try:
+        with pl.plot_mode('off'), (redirect_stdout(io.StringIO()) if quiet else nullcontext()):
+            results = dict(analysis(builder(params),**options))
+        results['error'] = ''
+    except (Exception, SystemExit) as e: # gravedad llama sys.exit cuando no converge
+        results = {'error':f'{type(e).__name__}: {e}'}
+    wipe()
+    return results
+
+def run_archetypes(table,analysis='modal',builder=build_archetype,nworkers=1,quiet=True,**options):
+    '''
+    Builds and analyzes a family of archetypes, each one in a clean OpenSees model, and collects the results in one table.
+    With nworkers > 1 the archetypes run in parallel processes; the workers import the calling script again on Windows
+    and macOS, so the call must be under if __name__ == '__main__':, e.g.:
+
+        if __name__ == '__main__':
+            table = ut.archetype_table(nfloors=[3,5,8],bay_x=[5.0,6.0])
+            results = ut.run_archetypes(table,'pushover',nworkers=4,drift=0.04)
+
+    Parameters
+    ----------
+    table : DataFrame or list
+        parameters of the archetypes, one row (or dictionary) per archetype. See archetype_table and build_archetype.
+    analysis : string or callable, optional
+        'modal' (archetype_modal), 'pushover' (archetype_pushover) or a function analysis(archetype,**options) that returns a dictionary of results. With nworkers > 1 the function must be defined at module level. The default is 'modal'.
+    builder : callable, optional
+        function builder(params) that creates the model and returns the archetype dictionary passed to the analysis. The default is build_archetype.
+    nworkers : int, optional
+        number of processes. The default is 1.
+    quiet : bool, optional
+        hides the messages printed during the build and the analysis. The default is True.
+    **options :
+        options of the analysis (e.g. nmodes=6, or drift=0.04 for the pushover).
+
+    Returns
+    -------
+    results : DataFrame
+        the parameter table with the results of each archetype. The 'error' column is empty when the archetype ran without errors.
+
+    '''
+    import pandas as pd
+    if isinstance(analysis,str) and analysis not in _ARCHETYPE_ANALYSES:
+        raise ValueError(f'analysis must be one of {list(_ARCHETYPE_ANALYSES)} or a function, got {analysis}')
+    table = pd.DataFrame(table).reset_index(drop=True)
+    # las celdas vacías (NaN) toman el valor por defecto
+    rows = [{k:v for k,v in row.items() if not (isinstance(v,float) and np.isnan(v))} for row in table.to_dict('records')]
+    if nworkers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        n = len(rows)
+        with ProcessPoolExecutor(nworkers) as executor:
+            results = list(executor.map(_run_archetype,rows,[builder]*n,[analysis]*n,[options]*n,[quiet]*n))
+    else:
+        results = [_run_archetype(row,builder,analysis,options,quiet) for row in rows]
+    return pd.concat([table,pd.DataFrame(results)],axis=1)
+
+def espectroNSR(Aa,Av,Fa,Fv,I,T=None):
     '''
     Creates the design spectrum per the Colombian NSR-10
     
+    The parameters can be arrays (e.g. one value per site) that broadcast against each other,
+    in which case a spectrum is computed for each combination in one vectorized call.
+
     Parameters
     ----------
-    Aa : Float
+    Aa : Float or array
         Aa per NSR-10.
-    Av : Float
+    Av : Float or array
         Av per NSR-10.
-    Fa : Float
-        Fa per NSR-10.
-    Fv : Float
-        Fv per NSR-10.
-    I : Float
+    Fa : Float or array
+        Fa per NSR-10 (see site_coefficients_NSR).
+    Fv : Float or array
+        Fv per NSR-10 (see site_coefficients_NSR).
+    I : Float or array
         I per NSR-10.
+    T : Numpy Array, optional
+        Periods where the spectrum is evaluated. The default is None (500 points between 0 and 4 s).
 
     Returns
     -------
     T : Numpy Array
         Array with the periods.
     Sa : Numpy Array
-        Array with pseudo-acceleration.
+        Array with pseudo-acceleration. If the parameters are arrays its shape is the shape
+        of the parameters plus one dimension for the periods (e.g. sites x periods).
 
     '''
     
-    T = np.linspace(0,4,500)
+    if T is None:
+        T = np.linspace(0,4,500)
+    T = np.asarray(T,dtype=float)
+    # los parámetros llevan una dimensión adicional para los periodos
+    Aa, Av, Fa, Fv, I = [np.asarray(x,dtype=float)[...,None] for x in (Aa,Av,Fa,Fv,I)]
     T0 = 0.1*(Av*Fv)/(Aa*Fa)
     Tc = 0.48*(Av*Fv)/(Aa*Fa)
     Tl = 2.4*Fv
-    Sa = (T < T0)*2.5*Aa*Fa*I*(0.4+0.6*T/T0) + ((T0 < T) & (T < Tc))*2.5*Aa*Fa*I + ((Tc < T) & (T < Tl))*1.2*Av*Fv*I/T + (Tl < T)*1.2*Av*Fv*I*Tl/T**2
+    Ts = np.where(T > 0,T,1.0) # evita la división por cero en T = 0
+    Sa = np.where(T < T0,2.5*Aa*Fa*I*(0.4+0.6*T/T0),
+         np.where(T <= Tc,2.5*Aa*Fa*I,
+         np.where(T <= Tl,1.2*Av*Fv*I/Ts,1.2*Av*Fv*I*Tl/Ts**2)))
     return T,Sa
 
+# coeficientes de sitio de NSR-10 (tablas A.2.4-3 y A.2.4-4) para Aa o Av = 0.1, 0.2, 0.3, 0.4 y 0.5
+_NSR_soils = {'A':0,'B':1,'C':2,'D':3,'E':4}
+_NSR_Fa = np.array([[0.8,0.8,0.8,0.8,0.8],
+                    [1.0,1.0,1.0,1.0,1.0],
+                    [1.2,1.2,1.1,1.0,1.0],
+                    [1.6,1.4,1.2,1.1,1.0],
+                    [2.5,1.7,1.2,0.9,0.9]])
+_NSR_Fv = np.array([[0.8,0.8,0.8,0.8,0.8],
+                    [1.0,1.0,1.0,1.0,1.0],
+                    [1.7,1.6,1.5,1.4,1.3],
+                    [2.4,2.0,1.8,1.6,1.5],
+                    [3.5,3.2,2.8,2.4,2.4]])
+
+def site_coefficients_NSR(soil,Aa,Av):
+    '''
+    Site coefficients Fa and Fv per NSR-10, interpolating linearly between the levels of
+    Aa and Av of the tables. soil, Aa and Av can be arrays (e.g. one value per site).
+
+    Parameters
+    ----------
+    soil : string or array of strings
+        soil profile type 'A' to 'E'. Type F requires a site-specific study.
+    Aa : Float or array
+        Aa per NSR-10.
+    Av : Float or array
+        Av per NSR-10.
+
+    Returns
+    -------
+    Fa : Numpy Array
+        Fa coefficient.
+    Fv : Numpy Array
+        Fv coefficient.
+
+    '''
+    soil = np.asarray(soil)
+    labels, inv = np.unique(soil,return_inverse=True)
+    for lab in labels:
+        if str(lab).upper() not in _NSR_soils:
+            raise ValueError(f"soil type must be one of {list(_NSR_soils)}, got '{lab}'")
+    rows = np.array([_NSR_soils[str(lab).upper()] for lab in labels])[inv].reshape(soil.shape)
+    def table(tab,level):
+        pos = np.clip((np.asarray(level,dtype=float)-0.1)/0.1,0,4)
+        i0 = np.minimum(np.floor(pos).astype(int),3)
+        frac = pos-i0
+        return tab[rows,i0]*(1-frac)+tab[rows,i0+1]*frac
+    return table(_NSR_Fa,Aa), table(_NSR_Fv,Av)
+
 def coefmander(Rmin, Rmax):
     '''
     Function that returns the effective k for a confined section based on Mander model
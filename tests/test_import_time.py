@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Import-time budget of opseestools.
+
+Every parallel worker (IDA, archetypes, records) imports the modules again, so the heavy
+dependencies must be loaded on first use and not at import time. The imports run in a clean
+subprocess so the modules already loaded by pytest do not hide a regression.
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# dependencias que solo se deben cargar cuando una función las usa
+HEAVY = ('scipy', 'pandas', 'matplotlib.pyplot', 'opstool')
+
+# límite amplio para el tiempo de importación (el valor medido es ~0.2 s, casi todo openseespy)
+IMPORT_BUDGET = 5.0
+
+_SCRIPT = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'time': elapsed, 'loaded': sorted(m for m in {watch!r} if m in sys.modules)}}))
+'''
+
+def _import_in_subprocess(modules, watch):
+    script = _SCRIPT.format(root=ROOT, modules=list(modules), watch=list(watch))
+    env = dict(os.environ, OPSEESTOOLS_PLOTS='off')
+    out = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, env=env, check=True).stdout
+    # openseespy escribe mensajes en stdout, el resultado es la línea JSON
+    line = [l for l in out.splitlines() if l.startswith('{')][-1]
+    return json.loads(line)
+
+def test_analysis_modules_import_lazily():
+    result = _import_in_subprocess(['opseestools.analisis', 'opseestools.analisis3D', 'opseestools.Lib_frag'],
+                                   HEAVY + ('opseestools.utilidades',))
+    assert result['loaded'] == []
+    assert result['time'] < IMPORT_BUDGET
+
+def test_utilidades_imports_lazily():
+    result = _import_in_subprocess(['opseestools.utilidades'], HEAVY)
+    assert result['loaded'] == []
+    assert result['time'] < IMPORT_BUDGET